@@ -0,0 +1,183 @@
+import bpy
+from bpy_extras.io_utils import ExportHelper
+from . import level, runtime_assets, car
+
+# See container.CODECS
+COMPRESSION_ITEMS = [
+	('none', "None", "Uncompressed", 0),
+	('zlib', "zlib", "Each section compressed with zlib", 1)
+]
+
+class KartGuysLevelExporter(bpy.types.Operator, ExportHelper):
+	bl_idname = "level.kgl"
+	bl_label = "Export"
+
+	filename_ext = ".kgl"
+	filter_glob: bpy.props.StringProperty(default="*.kgl", options={'HIDDEN'}, maxlen=255)
+	use_cache: bpy.props.BoolProperty(name="Use mesh cache", description="Reuse the encoded meshes that haven't changed since the last export", default=True)
+	use_parallel: bpy.props.BoolProperty(name="Parallel encoding", description="Encode the meshes in worker processes, turn off to encode them one at a time in Blender", default=True)
+	optimize_vertex_cache: bpy.props.BoolProperty(name="Optimize vertex cache", description="Reorder the triangles and vertices of each geometry for the GPU vertex cache and vertex fetch", default=False)
+	vertex_format: bpy.props.EnumProperty(name="Vertex format", description="How the geometry vertices are stored in the file", items=[
+		('full', "Full", "Positions, normals and colors as f32", 0),
+		('compact', "Compact", "Octahedral snorm16 normals and RGBA8 colors", 1),
+		('compact_quantized', "Compact quantized", "Compact, with the positions also quantized to u16 within each mesh's bounding box", 2)
+	], default='full')
+	lod_levels: bpy.props.IntProperty(name="LOD levels", description="Simplified levels of detail to generate for each geometry", default=0, min=0, max=3)
+	static_batching: bpy.props.BoolProperty(name="Static batching", description="Merge the inanimate objects without hulls into one world space geometry per area of the track", default=False)
+	array_alignment: bpy.props.IntProperty(name="Array alignment", description="Pad the file so every index, vertex and other array starts at a multiple of this many bytes, a power of 2 or 0 for no padding", default=0, min=0, max=4096)
+	compression: bpy.props.EnumProperty(name="Compression", description="Compress the file's sections", items=COMPRESSION_ITEMS, default='none')
+	profile: bpy.props.BoolProperty(name="Profile", description="Write a JSON report of where the export's time and file size went next to the file", default=False)
+
+	def execute(self, context):
+		return level.export(self, context)
+
+class KartGuysRuntimeAssetsExporter(bpy.types.Operator, ExportHelper):
+	bl_idname = "level.kga"
+	bl_label = "Export"
+
+	filename_ext = ".kga"
+	filter_glob: bpy.props.StringProperty(default="*.kga", options={'HIDDEN'}, maxlen=255)
+	compression: bpy.props.EnumProperty(name="Compression", description="Compress the file's sections", items=COMPRESSION_ITEMS, default='none')
+	profile: bpy.props.BoolProperty(name="Profile", description="Write a JSON report of where the export's time and file size went next to the file", default=False)
+
+	def execute(self, context):
+		return runtime_assets.export(self, context)
+
+class KartGuysCarExporter(bpy.types.Operator, ExportHelper):
+	bl_idname = "level.kgc"
+	bl_label = "Export"
+
+	filename_ext = ".kgc"
+	filter_glob: bpy.props.StringProperty(default="*.kgc", options={'HIDDEN'}, maxlen=255)
+	optimize_vertex_cache: bpy.props.BoolProperty(name="Optimize vertex cache", description="Reorder the triangles and vertices of the car and wheel for the GPU vertex cache and vertex fetch", default=False)
+	compression: bpy.props.EnumProperty(name="Compression", description="Compress the file's sections", items=COMPRESSION_ITEMS, default='none')
+	profile: bpy.props.BoolProperty(name="Profile", description="Write a JSON report of where the export's time and file size went next to the file", default=False)
+
+	def execute(self, context):
+		return car.export(self, context)
+
+class KartGuysObjectPanel(bpy.types.Panel):
+	bl_idname = 'PROPERTIES_PT_kart_guys_object_panel'
+	bl_label = 'Kart Guys Properties'
+	bl_space_type = 'PROPERTIES'
+	bl_region_type = 'WINDOW'
+	bl_context = "object"
+
+	def draw(self, context):
+		self.layout.prop(context.object, "kg_shared_ignore", text="Ignore")
+		self.layout.prop(context.object, "kg_type", text="Type")
+
+		kg_type = context.object.kg_type
+
+		if kg_type == 'rigid_body':
+			self.layout.prop(context.object, "kg_rigid_body_mass", text="Mass")
+			self.layout.prop(context.object, "kg_rigid_body_collision_exclude", text="Collision exclude")
+			self.layout.prop(context.object, "kg_rigid_body_status_effect", text="Status effect")
+		elif kg_type == 'hull':
+			self.layout.prop(context.object, "kg_hull_type", text="Hull type")
+		elif kg_type == 'oil_slick':
+			self.layout.prop(context.object, "kg_oil_slick_particles_count", text="Particles")
+
+class KartGuysRuntimeAssetsPanel(bpy.types.Panel):
+	bl_idname = 'PROPERTIES_PT_kart_guys_runtime_assets_panel'
+	bl_label = 'Kart Guys Runtime Assets Properties'
+	bl_space_type = 'PROPERTIES'
+	bl_region_type = 'WINDOW'
+	bl_context = "object"
+
+	def draw(self, context):
+		self.layout.prop(context.object, "kg_shared_ignore", text="Ignore")
+		self.layout.prop(context.object, "kg_rta_type", text="Type")
+
+def level_exporter_menu_item(self, context):
+	self.layout.operator(KartGuysLevelExporter.bl_idname, text="Kart Guys level (.kgl)")
+
+def runtime_assets_exporter_menu_item(self, context):
+	self.layout.operator(KartGuysRuntimeAssetsExporter.bl_idname, text="Kart Guys runtime assets (.kga)")
+
+def car_exporter_menu_item(self, context):
+	self.layout.operator(KartGuysCarExporter.bl_idname, text="Kart Guys car (.kgc)")
+
+def register():
+	# Level
+	bpy.utils.register_class(KartGuysLevelExporter)
+	bpy.types.TOPBAR_MT_file_export.append(level_exporter_menu_item)
+
+	bpy.utils.register_class(KartGuysObjectPanel)
+
+	bpy.types.Object.kg_type = bpy.props.EnumProperty(items=[
+		('none', "None", "", 0),
+		('spawn_point', "Spawn point", "", 1),
+		('ground_collision_mesh', "Ground collision mesh", "", 2),
+		('inanimate', "Inanimate", "", 3),
+		('rigid_body_island', "Rigid body island", "", 4),
+		('rigid_body', "Rigid body", "", 5),
+		('hull', "Hull", "", 6),
+		('oil_slick', "Oil slick", "", 7),
+		('bumper', "Bumpler", "", 8),
+		('boost_jet', "Boost jet", "", 9),
+		('ground_collision_mesh_and_inanimate', "Ground collision mesh and inanimate", "", 10),
+		('removed', "REMOVED", "", 11),
+		('ai_spawn_point', "AI spawn point", "", 12),
+		('ai_path_left', "AI path left", "", 13),
+		('ai_path_right', "AI path right", "", 14),
+	])
+	bpy.types.Object.kg_hull_type = bpy.props.EnumProperty(items=[
+		('box', "Box", "", 0),
+		('cylinder', "Cylinder", "", 1),
+		('mesh', "Mesh", "", 2)
+	])
+	bpy.types.Object.kg_rigid_body_mass = bpy.props.FloatProperty(default = 1.0)
+	bpy.types.Object.kg_rigid_body_collision_exclude = bpy.props.BoolProperty()
+	bpy.types.Object.kg_rigid_body_status_effect = bpy.props.EnumProperty(items=[
+		('none', "None", "", 0),
+		('shock', "Shock", "", 1),
+		('fire', "Fire", "", 2),
+		('exploding_shock_barrel', "Exploding shock barrel", "", 3),
+		('exploding_fire_barrel', "Exploding fire barrel", "", 4)
+	])
+	bpy.types.Object.kg_oil_slick_particles_count = bpy.props.IntProperty(default=10)
+
+	# Runtime assets
+	bpy.utils.register_class(KartGuysRuntimeAssetsExporter)
+	bpy.types.TOPBAR_MT_file_export.append(runtime_assets_exporter_menu_item)
+	
+	bpy.utils.register_class(KartGuysRuntimeAssetsPanel)
+
+	bpy.types.Object.kg_shared_ignore = bpy.props.BoolProperty()
+	bpy.types.Object.kg_rta_type = bpy.props.EnumProperty(items=[
+		('none', "None", "", 0),
+		('shock_barrel_shrapnel', "Shock barrel shrapnel", "", 1),
+		('hull', "Hull", "", 2),
+		('oil_slick', "Oil slick", "", 3)
+	])
+
+	# Car
+	bpy.utils.register_class(KartGuysCarExporter)
+	bpy.types.TOPBAR_MT_file_export.append(car_exporter_menu_item)
+
+def unregister():
+	# Level
+	bpy.utils.unregister_class(KartGuysLevelExporter)
+	bpy.types.TOPBAR_MT_file_export.remove(level_exporter_menu_item)
+
+	bpy.utils.unregister_class(KartGuysObjectPanel)
+
+	del bpy.types.Object.kg_type
+	del bpy.types.Object.kg_hull_type
+	del bpy.types.Object.kg_rigid_body_mass
+	del bpy.types.Object.kg_rigid_body_collision_exclude
+	del bpy.types.Object.kg_rigid_body_status_effect
+
+	# Runtime assets
+	bpy.utils.unregister_class(KartGuysRuntimeAssetsExporter)
+	bpy.types.TOPBAR_MT_file_export.remove(runtime_assets_exporter_menu_item)
+	
+	bpy.utils.unregister_class(KartGuysRuntimeAssetsPanel)
+
+	del bpy.types.Object.kg_shared_ignore
+	del bpy.types.Object.kg_rta_type
+
+	# Car
+	bpy.utils.unregister_class(KartGuysCarExporter)
+	bpy.types.TOPBAR_MT_file_export.remove(car_exporter_menu_item)
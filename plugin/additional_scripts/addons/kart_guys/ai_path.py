@@ -0,0 +1,208 @@
+import numpy as np
+from . import binary
+
+# Arc length tables of the AI paths. curves is (n, 4, 3) control points in game space, sample k of a path is at
+# u = k / SAMPLES_PER_CURVE where u = curve index + t
+
+SAMPLES_PER_CURVE = 64
+
+# 5 point Gauss-Legendre quadrature on [0, 1], used to integrate the speed between samples
+GAUSS_NODES = (np.array([-0.9061798459386640, -0.5384693101056831, 0.0, 0.5384693101056831, 0.9061798459386640]) + 1) / 2
+GAUSS_WEIGHTS = np.array([0.2369268850561891, 0.4786286704993665, 0.5688888888888889, 0.4786286704993665, 0.2369268850561891]) / 2
+
+def evaluate(curves, t):
+	# Position and first derivative of each curve at its t, curves is (m, 4, 3) and t is (m)
+	p0, p1, p2, p3 = curves[:, 0], curves[:, 1], curves[:, 2], curves[:, 3]
+	t = t[:, None]
+	c = 1 - t
+
+	position = c * c * c * p0 + 3 * c * c * t * p1 + 3 * c * t * t * p2 + t * t * t * p3
+	first = 3 * c * c * (p1 - p0) + 6 * c * t * (p2 - p1) + 3 * t * t * (p3 - p2)
+
+	return position, first
+
+def sample_path(curves, samples_per_curve=SAMPLES_PER_CURVE):
+	# Returns the path length at each sample along with the position there
+	curves = np.asarray(curves, dtype=np.float64).reshape(-1, 4, 3)
+	curves_count = len(curves)
+
+	if curves_count == 0:
+		return np.zeros(0, dtype=np.float32), np.zeros((0, 3), dtype=np.float32)
+
+	k = np.arange(curves_count * samples_per_curve + 1)
+	sample_curves = np.minimum(k // samples_per_curve, curves_count - 1)
+	sample_t = (k - sample_curves * samples_per_curve) / samples_per_curve
+	position, _ = evaluate(curves[sample_curves], sample_t)
+
+	# Length of each interval between two samples
+	interval_curves = sample_curves[:-1]
+	interval_t = sample_t[:-1]
+	step = 1 / samples_per_curve
+	interval_lengths = np.zeros(len(interval_t))
+
+	for node, weight in zip(GAUSS_NODES, GAUSS_WEIGHTS):
+		_, node_first = evaluate(curves[interval_curves], interval_t + node * step)
+		interval_lengths += weight * step * np.linalg.norm(node_first, axis=1)
+
+	lengths = np.concatenate(([0.0], np.cumsum(interval_lengths)))
+
+	return lengths.astype(np.float32), position.astype(np.float32)
+
+def curve_lengths(lengths, samples_per_curve=SAMPLES_PER_CURVE):
+	return np.diff(np.asarray(lengths)[::samples_per_curve])
+
+def param_to_length(lengths, u, samples_per_curve=SAMPLES_PER_CURVE):
+	# u = curve index + t -> length along the path, interpolating between the samples like the game does
+	lengths = np.asarray(lengths, dtype=np.float32)
+	k = np.clip(np.asarray(u, dtype=np.float32) * np.float32(samples_per_curve), 0, len(lengths) - 1)
+	i = np.minimum(np.floor(k).astype(np.int64), len(lengths) - 2)
+	fraction = k - i
+
+	return lengths[i] + (lengths[i + 1] - lengths[i]) * fraction
+
+def length_to_param(lengths, s, samples_per_curve=SAMPLES_PER_CURVE):
+	# Length along the path -> u = curve index + t with a binary search, like the game does. The path is a closed loop so
+	# s wraps around.
+	lengths = np.asarray(lengths, dtype=np.float32)
+	total = lengths[-1]
+	s = np.mod(np.asarray(s, dtype=np.float32), total)
+
+	i = np.clip(np.searchsorted(lengths, s, side='right') - 1, 0, len(lengths) - 2)
+	interval = lengths[i + 1] - lengths[i]
+	fraction = np.where(interval > 0, (s - lengths[i]) / np.where(interval > 0, interval, 1), 0)
+
+	return (i + fraction) / np.float32(samples_per_curve)
+
+def write_path_table(file, curves, alignment=0):
+	lengths, positions = sample_path(curves)
+
+	binary.write_u32(file, SAMPLES_PER_CURVE)
+	binary.write_f32_array(file, lengths, alignment)
+	binary.write_f32_array(file, positions, alignment)
+	write_segment_grid(file, positions, alignment)
+
+	return lengths
+
+# 2D uniform grid over the xz bounds of the segments between the samples so the game can find the nearest segment to
+# any point without knowing where it was before. Segment k goes from sample k to sample k + 1. Each segment is put in
+# every cell its padded bounds overlap, in compressed sparse row form like the ground grid: the segments in cell (x, z)
+# are cell_segments[cell_offsets[c]:cell_offsets[c + 1]] where c = z * cells_x + x.
+GRID_CELL_SIZE = 10.0
+GRID_MAX_CELLS = 256 # Per axis, the cells get bigger for huge tracks
+SEGMENT_PADDING = 1.0
+
+class SegmentGrid:
+	def __init__(self):
+		self.origin = np.zeros(2, dtype=np.float32) # Min x and z
+		self.cell_size = np.float32(GRID_CELL_SIZE)
+		self.cells_x = 0
+		self.cells_z = 0
+		self.cell_offsets = np.zeros(1, dtype=np.uint32)
+		self.cell_segments = np.zeros(0, dtype=np.uint32)
+
+def build_segment_grid(positions, cell_size=GRID_CELL_SIZE, padding=SEGMENT_PADDING):
+	positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+	grid = SegmentGrid()
+
+	if len(positions) < 2:
+		return grid
+
+	a = positions[:-1][:, 0::2]
+	b = positions[1:][:, 0::2]
+	bounds_min = np.minimum(a, b) - np.float32(padding)
+	bounds_max = np.maximum(a, b) + np.float32(padding)
+
+	origin = bounds_min.min(axis=0)
+	extent = bounds_max.max(axis=0) - origin
+	cell_size = np.float32(max(cell_size, float(extent.max()) / GRID_MAX_CELLS))
+	cells = np.maximum(np.ceil(extent / cell_size).astype(np.int64), 1)
+
+	min_cell = np.clip(np.floor((bounds_min - origin) / cell_size).astype(np.int64), 0, cells - 1)
+	max_cell = np.clip(np.floor((bounds_max - origin) / cell_size).astype(np.int64), 0, cells - 1)
+
+	# Every (segment, cell) pair, like ground.bin_triangles
+	widths = max_cell[:, 0] - min_cell[:, 0] + 1
+	heights = max_cell[:, 1] - min_cell[:, 1] + 1
+	counts = widths * heights
+	entry_segments = np.repeat(np.arange(len(counts)), counts)
+	local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+	x = min_cell[entry_segments, 0] + local % widths[entry_segments]
+	z = min_cell[entry_segments, 1] + local // widths[entry_segments]
+	entry_cells = z * cells[0] + x
+
+	order = np.argsort(entry_cells, kind='stable')
+	grid.origin = origin.astype(np.float32)
+	grid.cell_size = cell_size
+	grid.cells_x = int(cells[0])
+	grid.cells_z = int(cells[1])
+	grid.cell_segments = entry_segments[order].astype(np.uint32)
+	grid.cell_offsets = np.zeros(grid.cells_x * grid.cells_z + 1, dtype=np.uint32)
+	np.cumsum(np.bincount(entry_cells, minlength=grid.cells_x * grid.cells_z), out=grid.cell_offsets[1:])
+
+	return grid
+
+def closest_points_on_segments(positions, segments, point):
+	# Fraction along and squared distance to each segment's closest point
+	positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+	a = positions[segments]
+	ab = positions[np.asarray(segments) + 1] - a
+	length_sq = (ab * ab).sum(axis=1)
+	fraction = np.clip(((point - a) * ab).sum(axis=1) / np.where(length_sq > 0, length_sq, 1), 0, 1)
+	closest = a + ab * fraction[:, None]
+
+	return fraction, ((closest - point) ** 2).sum(axis=1)
+
+def nearest_segment(grid: SegmentGrid, positions, point):
+	# Same search as the game: look through rings of cells around the point's cell until the closest segment found is
+	# nearer than any cell that hasn't been looked at. Returns the segment, the fraction along it and the squared distance.
+	point = np.asarray(point, dtype=np.float32)
+	cell_x = int(np.clip(np.floor((point[0] - grid.origin[0]) / grid.cell_size), 0, grid.cells_x - 1))
+	cell_z = int(np.clip(np.floor((point[2] - grid.origin[1]) / grid.cell_size), 0, grid.cells_z - 1))
+
+	best = (-1, 0.0, np.inf)
+
+	for ring in range(max(grid.cells_x, grid.cells_z)):
+		candidates = []
+
+		for z in range(cell_z - ring, cell_z + ring + 1):
+			for x in range(cell_x - ring, cell_x + ring + 1):
+				on_ring = abs(x - cell_x) == ring or abs(z - cell_z) == ring
+
+				if on_ring and 0 <= x < grid.cells_x and 0 <= z < grid.cells_z:
+					c = z * grid.cells_x + x
+					candidates.extend(grid.cell_segments[grid.cell_offsets[c] : grid.cell_offsets[c + 1]].tolist())
+
+		if candidates:
+			fractions, distances_sq = closest_points_on_segments(positions, candidates, point)
+			i = int(np.argmin(distances_sq))
+
+			if distances_sq[i] < best[2]:
+				best = (candidates[i], float(fractions[i]), float(distances_sq[i]))
+
+		# Anything in the cells further out is at least this far away
+		reach = ring * float(grid.cell_size)
+
+		if best[0] >= 0 and best[2] <= reach * reach:
+			break
+
+	return best
+
+def brute_force_nearest_segment(positions, point):
+	segments = np.arange(len(np.asarray(positions).reshape(-1, 3)) - 1)
+	fractions, distances_sq = closest_points_on_segments(positions, segments, np.asarray(point, dtype=np.float32))
+	i = int(np.argmin(distances_sq))
+	return i, float(fractions[i]), float(distances_sq[i])
+
+def write_segment_grid(file, positions, alignment=0):
+	grid = build_segment_grid(positions)
+
+	binary.write_f32(file, grid.origin[0])
+	binary.write_f32(file, grid.origin[1])
+	binary.write_f32(file, grid.cell_size)
+	binary.write_u32(file, grid.cells_x)
+	binary.write_u32(file, grid.cells_z)
+	binary.write_u32_array(file, grid.cell_offsets, alignment)
+	binary.write_u32_array(file, grid.cell_segments, alignment)
+
+	return grid
@@ -0,0 +1,151 @@
+import numpy as np
+from . import weld, ground
+
+# Static batching: the inanimate objects without hulls are moved into world space and merged into one mesh per cell
+
+# Batch cells are a whole number of ground grid cells
+CELL_SIZE = ground.CELL_SIZE * 4
+
+# Batches are drawn out of the game's 5 MB per frame indices and attributes block when they aren't uploaded, so a cell
+# with more than this is split into several batches. Counted for the worst case where welding keeps every corner.
+MAX_BATCH_BYTES = 1_000_000
+TRIANGLE_BYTES = 3 * 2 + 3 * 9 * 4 # u16 indices and 9 float attributes per vertex
+
+def transform_mesh_arrays(mesh_arrays: weld.MeshArrays, matrix):
+	# Returns a copy of mesh_arrays with the positions and normals moved by the 4x4 matrix
+	matrix = np.asarray(matrix, dtype=np.float32)
+	transformed = weld.MeshArrays()
+	transformed.name = mesh_arrays.name
+	transformed.vertex_positions = weld.transform_positions(matrix, np.asarray(mesh_arrays.vertex_positions).reshape(-1, 3))
+	transformed.corner_colors = mesh_arrays.corner_colors
+	transformed.triangle_emissive = mesh_arrays.triangle_emissive
+
+	normal_matrix = np.linalg.inv(matrix[:3, :3].astype(np.float64)).T
+	normals = np.asarray(mesh_arrays.triangle_normals, dtype=np.float64).reshape(-1, 3) @ normal_matrix.T
+	lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+	transformed.triangle_normals = (normals / np.where(lengths > 0, lengths, 1)).astype(np.float32)
+
+	triangle_vertices = np.asarray(mesh_arrays.triangle_vertices).reshape(-1, 3)
+	triangle_loops = np.asarray(mesh_arrays.triangle_loops).reshape(-1, 3)
+
+	# A mirroring matrix turns the triangles inside out, flip their winding back
+	if np.linalg.det(matrix[:3, :3].astype(np.float64)) < 0:
+		triangle_vertices = triangle_vertices[:, [0, 2, 1]]
+		triangle_loops = triangle_loops[:, [0, 2, 1]]
+
+	transformed.triangle_vertices = triangle_vertices.reshape(-1)
+	transformed.triangle_loops = triangle_loops.reshape(-1)
+
+	return transformed
+
+def merge_mesh_arrays(name: str, meshes):
+	# Joins the meshes into one. Meshes without vertex colors get the default color so they look the same as before.
+	merged = weld.MeshArrays()
+	merged.name = name
+
+	vertex_positions = []
+	triangle_vertices = []
+	triangle_loops = []
+	triangle_normals = []
+	corner_colors = []
+	triangle_emissive = []
+	vertices_count = 0
+	loops_count = 0
+
+	for mesh_arrays in meshes:
+		positions = np.asarray(mesh_arrays.vertex_positions, dtype=np.float32).reshape(-1, 3)
+		normals = np.asarray(mesh_arrays.triangle_normals, dtype=np.float32).reshape(-1, 3)
+		triangles_count = len(normals)
+
+		vertex_positions.append(positions)
+		triangle_vertices.append(np.asarray(mesh_arrays.triangle_vertices, dtype=np.int64).reshape(-1) + vertices_count)
+		triangle_normals.append(normals)
+		vertices_count += len(positions)
+
+		if mesh_arrays.corner_colors is None:
+			colors = np.append(weld.DEFAULT_COLOR, np.float32(1)).reshape(1, 4)
+			loops = np.zeros(triangles_count * 3, dtype=np.int64)
+		else:
+			colors = np.asarray(mesh_arrays.corner_colors, dtype=np.float32).reshape(-1, 4)
+			loops = np.asarray(mesh_arrays.triangle_loops, dtype=np.int64).reshape(-1)
+
+		corner_colors.append(colors)
+		triangle_loops.append(loops + loops_count)
+		loops_count += len(colors)
+
+		if mesh_arrays.triangle_emissive is None:
+			triangle_emissive.append(np.zeros(triangles_count, dtype=bool))
+		else:
+			triangle_emissive.append(np.asarray(mesh_arrays.triangle_emissive, dtype=bool))
+
+	merged.vertex_positions = np.concatenate(vertex_positions) if meshes else np.empty((0, 3), dtype=np.float32)
+	merged.triangle_vertices = np.concatenate(triangle_vertices).astype(np.int32) if meshes else np.empty(0, dtype=np.int32)
+	merged.triangle_loops = np.concatenate(triangle_loops).astype(np.int32) if meshes else np.empty(0, dtype=np.int32)
+	merged.triangle_normals = np.concatenate(triangle_normals) if meshes else np.empty((0, 3), dtype=np.float32)
+	merged.corner_colors = np.concatenate(corner_colors) if meshes else None
+	merged.triangle_emissive = np.concatenate(triangle_emissive) if meshes else None
+
+	return merged
+
+def batch_cells(centers, cell_size=CELL_SIZE):
+	# Groups the Blender space centers by the batch cell they're in, on the ground plane. Returns a list of (cell x,
+	# cell y, indices into centers) sorted by cell.
+	centers = np.asarray(centers, dtype=np.float32).reshape(-1, 3)
+	cells = np.floor(centers[:, :2] / np.float32(cell_size)).astype(np.int64)
+	groups = {}
+
+	for i, (x, y) in enumerate(cells.tolist()):
+		groups.setdefault((x, y), []).append(i)
+
+	return [(x, y, indices) for (x, y), indices in sorted(groups.items())]
+
+def build_batches(meshes, matrices, cell_size=CELL_SIZE, max_bytes=MAX_BATCH_BYTES):
+	# meshes[i] is drawn with matrices[i], the same mesh arrays can be used by many instances. Returns merged world space
+	# MeshArrays for each batch cell, more than one when the cell's meshes add up to more than max_bytes.
+	transformed = [transform_mesh_arrays(mesh_arrays, matrix) for mesh_arrays, matrix in zip(meshes, matrices)]
+	centers = []
+
+	for mesh_arrays in transformed:
+		positions = np.asarray(mesh_arrays.vertex_positions).reshape(-1, 3)
+
+		if len(positions) == 0:
+			centers.append(np.zeros(3, dtype=np.float32))
+		else:
+			centers.append((positions.min(axis=0) + positions.max(axis=0)) / 2)
+
+	batches = []
+
+	for x, y, indices in batch_cells(centers, cell_size):
+		name = "static batch " + str(x) + " " + str(y)
+		cell_meshes = [transformed[i] for i in indices]
+
+		for part, run in enumerate(split_by_size(cell_meshes, max_bytes)):
+			batches.append(merge_mesh_arrays(name if part == 0 else name + " " + str(part), [cell_meshes[i] for i in run]))
+
+	return batches
+
+def batch_bytes(mesh_arrays: weld.MeshArrays):
+	return len(np.asarray(mesh_arrays.triangle_normals).reshape(-1, 3)) * TRIANGLE_BYTES
+
+def split_by_size(meshes, max_bytes=MAX_BATCH_BYTES):
+	# Splits the meshes into runs of indices into meshes that stay under max_bytes. A mesh bigger than that on its own
+	# gets a run to itself.
+	runs = []
+	run = []
+	run_bytes = 0
+
+	for i, mesh_arrays in enumerate(meshes):
+		mesh_bytes = batch_bytes(mesh_arrays)
+
+		if run and run_bytes + mesh_bytes > max_bytes:
+			runs.append(run)
+			run = []
+			run_bytes = 0
+
+		run.append(i)
+		run_bytes += mesh_bytes
+
+	if run:
+		runs.append(run)
+
+	return runs
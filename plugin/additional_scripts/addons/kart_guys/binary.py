@@ -0,0 +1,87 @@
+import struct
+import numpy as np
+
+# Little endian writers for the .kgl/.kga/.kgc formats. The arrays are written with one call each, alignment pads
+# with zeros after the count so the array starts at a multiple of it from the start of the section
+
+POSITION_CHECK = 0b10101010_10101010_10101010_10101010
+U16_MAX = 0xFFFF
+
+B8 = struct.Struct("<?")
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+F32 = struct.Struct("<f")
+VEC3 = struct.Struct("<3f")
+QUAT = struct.Struct("<4f")
+POS_ORI_SCALE = struct.Struct("<3f4f3f")
+
+CURSOR_CHECK_BYTES = U32.pack(POSITION_CHECK)
+
+def write_b8(file, v):
+	file.write(B8.pack(v))
+
+def write_u16(file, v):
+	file.write(U16.pack(v))
+
+def write_u32(file, v):
+	file.write(U32.pack(v))
+
+def write_f32(file, v):
+	file.write(F32.pack(v))
+
+def write_string(file, v):
+	s = bytes(v, 'utf-8')
+	file.write(U32.pack(len(s)))
+	file.write(s)
+
+def write_cursor_check(file):
+	file.write(CURSOR_CHECK_BYTES)
+
+def write_vec3(file, vec):
+	file.write(VEC3.pack(vec[0], vec[1], vec[2]))
+
+def write_quat(file, quat):
+	file.write(QUAT.pack(quat[0], quat[1], quat[2], quat[3]))
+
+def write_pos_ori_scale(file, pos, ori, scale):
+	file.write(POS_ORI_SCALE.pack(pos[0], pos[1], pos[2], ori[0], ori[1], ori[2], ori[3], scale[0], scale[1], scale[2]))
+
+def u16_array(values):
+	values = np.asarray(values)
+
+	if len(values) > 0:
+		assert values.min() >= 0 and values.max() <= U16_MAX, "Index " + str(values.max()) + " does not fit in a u16"
+
+	return np.ascontiguousarray(values, dtype='<u2')
+
+def f32_array(values):
+	return np.ascontiguousarray(values, dtype='<f4')
+
+def write_padding(file, alignment: int):
+	if alignment > 1:
+		file.write(bytes(-file.tell() % alignment))
+
+def write_bytes(file, values, alignment=0):
+	# Flattened first, memoryview can't cast an empty (0, n) array
+	write_padding(file, alignment)
+	file.write(memoryview(np.ascontiguousarray(values).reshape(-1)).cast('B'))
+
+def write_f32_array(file, values, alignment=0):
+	values = f32_array(values)
+	file.write(U32.pack(len(values)))
+	write_bytes(file, values, alignment)
+
+def write_u32_array(file, values, alignment=0):
+	values = np.ascontiguousarray(values, dtype='<u4')
+	file.write(U32.pack(len(values)))
+	write_bytes(file, values, alignment)
+
+# Takes lists, arrays or NumPy arrays
+def write_indices_attributes(file, indices, attributes, alignment=0):
+	indices = u16_array(indices)
+	attributes = f32_array(attributes)
+
+	file.write(U32.pack(len(indices)))
+	write_bytes(file, indices, alignment)
+	file.write(U32.pack(len(attributes)))
+	write_bytes(file, attributes, alignment)
@@ -1,56 +1,82 @@
+import os
 from bpy.types import Context, Depsgraph
-from . import util
-from .util import WObject
+from . import util, optimize, container, profiling
+from .util import SceneGraph
 
 VERSION = 2
 
+# Everything export reads off the operator, see level.ExportOptions
+class ExportOptions:
+	def __init__(self, filepath, **options):
+		self.filepath = filepath
+		self.optimize_vertex_cache = False
+		self.compression = 'none'
+		self.profile = False
+
+		for name, value in options.items():
+			assert hasattr(self, name), "Unknown car export option " + name
+			setattr(self, name, value)
+
 def export(operator, context: Context):
 	depsgraph: Depsgraph = context.evaluated_depsgraph_get()
 	graph = util.create_scene_graph(depsgraph)
-	file = open(operator.filepath, 'wb')
+	profiler = profiling.create_profiler(operator.profile)
+	file = container.SectionedFile(profiler)
 
+	file.begin_section("version")
 	util.write_u32(file, VERSION)
-	export_geometry(depsgraph, graph, file)
+	file.begin_section("geometry")
+	export_geometry(depsgraph, graph, file, operator.optimize_vertex_cache)
+	file.begin_section("bottom_hull")
 	export_bottom_hull(graph, file)
-	export_wheel(depsgraph, graph, file)
+	file.begin_section("wheel")
+	export_wheel(depsgraph, graph, file, operator.optimize_vertex_cache)
 	util.write_cursor_check(file)
 	
-	file.close()
+	profiler.finish(file)
+
+	with profiler.stage("save"):
+		file.save(operator.filepath, container.CODECS[operator.compression])
+
 	print("Exported", operator.filepath)
+	profiler.write_report(operator.filepath, os.path.getsize(operator.filepath))
 	return {'FINISHED'}
 
-def export_geometry(depsgraph: Depsgraph, graph, file):
-	def compare(w_object: WObject):
-		return w_object.object.name == "car"
-
-	car_w_object = util.search_graph_one(graph, compare)
+def export_geometry(depsgraph: Depsgraph, graph: SceneGraph, file, optimize_vertex_cache: bool):
+	car_w_object = graph.by_name.get("car")
 	assert(car_w_object is not None)
 
 	indices, attributes = util.calculate_indices_local_positions_normals_colors(depsgraph, car_w_object.object)
+
+	if optimize_vertex_cache:
+		indices, attributes = optimize_attributes("car", indices, attributes)
+
 	util.write_indices_attributes(file, indices, attributes)
 
 	util.write_cursor_check(file)
 
-def export_bottom_hull(graph, file):
-	def compare(w_object: WObject):
-		return w_object.object.name == "bottom_hull"
-
-	hull_w_object = util.search_graph_one(graph, compare)
+def export_bottom_hull(graph: SceneGraph, file):
+	hull_w_object = graph.by_name.get("bottom_hull")
 	assert(hull_w_object is not None)
 
 	util.write_game_pos_ori_scale_from_blender_matrix(file, hull_w_object.object.matrix_local)
 
-def export_wheel(depsgraph: Depsgraph, graph, file):
-	def compare(w_object: WObject):
-		return w_object.object.name == "wheel"
-
-	wheel_w_object = util.search_graph_one(graph, compare)
+def export_wheel(depsgraph: Depsgraph, graph: SceneGraph, file, optimize_vertex_cache: bool):
+	wheel_w_object = graph.by_name.get("wheel")
 	assert(wheel_w_object is not None)
 
 	indices, attributes = util.calculate_indices_local_positions_normals_colors(depsgraph, wheel_w_object.object)
+
+	if optimize_vertex_cache:
+		indices, attributes = optimize_attributes("wheel", indices, attributes)
+
 	util.write_indices_attributes(file, indices, attributes)
 
 	radius = wheel_w_object.object.dimensions.z / 2
 	util.write_f32(file, radius)
 
-	util.write_cursor_check(file)
\ No newline at end of file
+	util.write_cursor_check(file)
+
+def optimize_attributes(name, indices, attributes):
+	indices, rows = optimize.optimize_mesh(name, indices, attributes.reshape(-1, 9))
+	return indices, rows.reshape(-1)
\ No newline at end of file
@@ -0,0 +1,245 @@
+import io
+import zlib
+import lzma
+import struct
+
+# The optional compressed container for the .kgl/.kga/.kgc files, see format_container.txt. Uncompressed, a
+# SectionedFile is just its sections one after the other
+
+MAGIC = b"KGZC"
+VERSION = 1
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2 # Smaller but slower, the game can only load zlib
+
+# The exporters' compression option -> codec, only the ones the game can load
+CODECS = {
+	'none': CODEC_NONE,
+	'zlib': CODEC_ZLIB
+}
+
+# LZMA is only for archiving the files with the recode command below
+RECODE_CODECS = dict(CODECS, lzma=CODEC_LZMA)
+
+U32 = struct.Struct("<I")
+
+def compress(codec: int, data: bytes):
+	if codec == CODEC_ZLIB:
+		return zlib.compress(data, 9)
+	elif codec == CODEC_LZMA:
+		return lzma.compress(data, format=lzma.FORMAT_XZ)
+
+	assert codec == CODEC_NONE, "Unknown codec " + str(codec)
+	return data
+
+def decompress(codec: int, data: bytes):
+	if codec == CODEC_ZLIB:
+		return zlib.decompress(data)
+	elif codec == CODEC_LZMA:
+		return lzma.decompress(data, format=lzma.FORMAT_XZ)
+
+	assert codec == CODEC_NONE, "Unknown codec " + str(codec)
+	return data
+
+# A file like object the exporters write into. Everything written after begin_section(name) goes into that section.
+# The profiler, if there is one, times the sections.
+class SectionedFile:
+	def __init__(self, profiler=None):
+		self.sections = []
+		self.profiler = profiler
+		self.toc_index = None
+		self.toc_alignment = 0
+
+	def begin_section(self, name: str):
+		self.sections.append((name, io.BytesIO()))
+
+		if self.profiler is not None:
+			self.profiler.begin_section(name)
+
+	def begin_toc_section(self, name: str, alignment=0):
+		# A table of contents of the sections that come after it, see toc_bytes. It's left empty and filled in once all
+		# the sections are written, so nothing can be written into it. With an alignment the table of contents and each
+		# section after it but the last are padded with zeros so the sections start at multiples of the alignment.
+		assert self.toc_index is None, "Only one table of contents"
+		self.toc_index = len(self.sections)
+		self.toc_alignment = alignment
+		self.begin_section(name)
+
+	def write(self, data):
+		assert len(self.sections) > 0, "Nothing can be written before the first section"
+		assert len(self.sections) - 1 != self.toc_index, "The table of contents is written by the SectionedFile"
+		return self.sections[-1][1].write(data)
+
+	def tell(self):
+		# From the start of the current section
+		return self.sections[-1][1].tell()
+
+	def section_bytes(self):
+		sections = [(name, section.getvalue()) for name, section in self.sections]
+
+		if self.toc_index is not None:
+			start = sum(len(data) for _, data in sections[: self.toc_index])
+			sections[self.toc_index] = (sections[self.toc_index][0], toc_bytes(sections[self.toc_index + 1 :], start, self.toc_alignment))
+			offset = start
+
+			for i in range(self.toc_index, len(sections) - 1):
+				name, data = sections[i]
+				padding = align(offset + len(data), self.toc_alignment) - offset - len(data)
+				sections[i] = (name, data + bytes(padding))
+				offset += len(sections[i][1])
+				assert self.toc_alignment <= 1 or offset % self.toc_alignment == 0
+
+		return sections
+
+	def getvalue(self):
+		# The uncompressed file
+		return b"".join(data for _, data in self.section_bytes())
+
+	def save(self, filepath: str, codec: int):
+		with open(filepath, 'wb') as file:
+			if codec == CODEC_NONE:
+				file.write(self.getvalue())
+			else:
+				file.write(encode(self.section_bytes(), codec))
+
+def align(offset: int, alignment: int):
+	# Rounds offset up to a multiple of alignment, 0 and 1 leave it as it is
+	return offset + -offset % alignment if alignment > 1 else offset
+
+def toc_size(names):
+	return U32.size * 2 + sum(U32.size + len(name.encode('utf-8')) + U32.size * 3 for name in names)
+
+def toc_bytes(sections, start: int, alignment=0):
+	# The table of contents for sections, a list of (name, bytes), when it starts at byte start of the uncompressed file
+	# and they come right after it, each one at the next multiple of alignment. The offsets are from the start of the
+	# uncompressed file, so they stay the same when the file is saved compressed. The sizes and checksums don't include
+	# the padding.
+	#
+	# Alignment:      u32 (0 if the sections aren't aligned)
+	# Sections count: u32
+	#	name:   string
+	#	offset: u32
+	#	size:   u32
+	#	crc32:  u32 (zlib.crc32 of the section's bytes)
+	#	...
+	toc = io.BytesIO()
+	toc.write(U32.pack(alignment))
+	toc.write(U32.pack(len(sections)))
+	offset = align(start + toc_size([name for name, _ in sections]), alignment)
+
+	for name, data in sections:
+		encoded_name = name.encode('utf-8')
+		toc.write(U32.pack(len(encoded_name)))
+		toc.write(encoded_name)
+		toc.write(U32.pack(offset))
+		toc.write(U32.pack(len(data)))
+		toc.write(U32.pack(zlib.crc32(data)))
+		offset = align(offset + len(data), alignment)
+
+	assert offset <= 0xFFFFFFFF, "The file is too big for u32 offsets"
+	return toc.getvalue()
+
+def encode(sections, codec: int):
+	# sections is a list of (name, bytes)
+	compressed = [(name, compress(codec, data), len(data)) for name, data in sections]
+	names = [name.encode('utf-8') for name, _, _ in compressed]
+
+	header_size = len(MAGIC) + U32.size * 3
+	header_size += sum(U32.size + len(name) + U32.size * 3 for name in names)
+
+	header = io.BytesIO()
+	header.write(MAGIC)
+	header.write(U32.pack(VERSION))
+	header.write(U32.pack(codec))
+	header.write(U32.pack(len(compressed)))
+	offset = header_size
+
+	for name, (_, data, size) in zip(names, compressed):
+		header.write(U32.pack(len(name)))
+		header.write(name)
+		header.write(U32.pack(offset))
+		header.write(U32.pack(len(data)))
+		header.write(U32.pack(size))
+		offset += len(data)
+
+	assert header.tell() == header_size
+	return header.getvalue() + b"".join(data for _, data, _ in compressed)
+
+def is_container(data: bytes):
+	return data[:len(MAGIC)] == MAGIC
+
+# Section of a container that hasn't been decompressed yet
+class Section:
+	def __init__(self, name: str, codec: int, offset: int, compressed_size: int, size: int):
+		self.name = name
+		self.codec = codec
+		self.offset = offset
+		self.compressed_size = compressed_size
+		self.size = size
+
+	def decode(self, data: bytes):
+		decoded = decompress(self.codec, data[self.offset : self.offset + self.compressed_size])
+		assert len(decoded) == self.size, "Section " + self.name + " decompressed to the wrong size"
+		return decoded
+
+def read_sections(data: bytes):
+	# Reads the section table of a container without decompressing anything
+	assert is_container(data), "Not a compressed container"
+	pos = len(MAGIC)
+
+	def read_u32():
+		nonlocal pos
+		value = U32.unpack_from(data, pos)[0]
+		pos += U32.size
+		return value
+
+	version = read_u32()
+	assert version == VERSION, "Required container version " + str(VERSION) + " but found " + str(version)
+	codec = read_u32()
+	sections = []
+
+	for _ in range(read_u32()):
+		name_length = read_u32()
+		name = bytes(data[pos : pos + name_length]).decode('utf-8')
+		pos += name_length
+		offset = read_u32()
+		compressed_size = read_u32()
+		size = read_u32()
+		sections.append(Section(name, codec, offset, compressed_size, size))
+
+	return sections
+
+def decode(data: bytes):
+	# Returns the uncompressed file, whether data is compressed or not
+	if not is_container(data):
+		return data
+
+	return b"".join(section.decode(data) for section in read_sections(data))
+
+def read_file(filepath: str):
+	with open(filepath, 'rb') as file:
+		return decode(file.read())
+
+def recode(data: bytes, codec: int):
+	# Re-encodes a file with another codec. An uncompressed file doesn't know where its sections are so it becomes a
+	# single section.
+	if is_container(data):
+		sections = [(section.name, section.decode(data)) for section in read_sections(data)]
+	else:
+		sections = [("file", bytes(data))]
+
+	if codec == CODEC_NONE:
+		return b"".join(section for _, section in sections)
+
+	return encode(sections, codec)
+
+if __name__ == '__main__':
+	# python container.py <input> <output> none|zlib|lzma
+	import sys
+
+	with open(sys.argv[1], 'rb') as file:
+		data = file.read()
+
+	with open(sys.argv[2], 'wb') as file:
+		file.write(recode(data, RECODE_CODECS[sys.argv[3]]))
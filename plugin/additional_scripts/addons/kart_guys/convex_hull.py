@@ -0,0 +1,292 @@
+import numpy as np
+from . import binary
+
+# Quickhull of the mesh hulls, coplanar triangles merged into faces, with each vertex's neighbours for hill climbing
+
+# Points closer than this to a plane, relative to the size of the hull, count as on it
+RELATIVE_TOLERANCE = 1e-5
+
+class ConvexHull:
+	def __init__(self):
+		self.vertices = np.zeros((0, 3), dtype=np.float32)
+		self.planes = np.zeros((0, 4), dtype=np.float32) # Normal and offset, a point p is inside when normal . p <= offset
+		self.face_offsets = np.zeros(1, dtype=np.uint32) # Face i is face_vertices[face_offsets[i]:face_offsets[i + 1]]
+		self.face_vertices = np.zeros(0, dtype=np.uint32) # Counter clockwise looking at the outside of the face
+		self.adjacency_offsets = np.zeros(1, dtype=np.uint32) # Vertex i's neighbours are adjacency[adjacency_offsets[i]:adjacency_offsets[i + 1]]
+		self.adjacency = np.zeros(0, dtype=np.uint32)
+
+class Triangle:
+	__slots__ = ('vertices', 'normal', 'offset', 'outside', 'alive')
+
+	def __init__(self, points, a, b, c):
+		self.vertices = (a, b, c)
+		normal = np.cross(points[b] - points[a], points[c] - points[a])
+		self.normal = normal / np.linalg.norm(normal)
+		self.offset = float(self.normal @ points[a])
+		self.outside = [] # Points in front of this triangle that aren't in the hull yet
+		self.alive = True
+
+	def edges(self):
+		a, b, c = self.vertices
+		return ((a, b), (b, c), (c, a))
+
+def initial_simplex(points, tolerance):
+	# Four points far apart that make a tetrahedron with some volume
+	extremes = np.concatenate((points.argmin(axis=0), points.argmax(axis=0)))
+	spreads = [np.linalg.norm(points[i] - points[j]) for i in extremes for j in extremes]
+	best = int(np.argmax(spreads))
+	a, b = int(extremes[best // len(extremes)]), int(extremes[best % len(extremes)])
+	assert spreads[best] > tolerance, "The hull has no size"
+
+	ab = points[b] - points[a]
+	distances = np.linalg.norm(np.cross(points - points[a], ab), axis=1) / np.linalg.norm(ab)
+	c = int(np.argmax(distances))
+	assert distances[c] > tolerance, "The hull is a line"
+
+	normal = np.cross(ab, points[c] - points[a])
+	normal /= np.linalg.norm(normal)
+	distances = (points - points[a]) @ normal
+	d = int(np.argmax(np.abs(distances)))
+	assert abs(distances[d]) > tolerance, "The hull is flat"
+
+	# Wind the triangles so they face away from d
+	if distances[d] > 0:
+		b, c = c, b
+
+	return a, b, c, d
+
+def quickhull(points, tolerance):
+	# Returns the alive triangles of the hull, each wound counter clockwise looking at it from outside
+	a, b, c, d = initial_simplex(points, tolerance)
+	triangles = [Triangle(points, a, b, c), Triangle(points, a, d, b), Triangle(points, b, d, c), Triangle(points, c, d, a)]
+	edge_triangles = {} # Directed edge -> the triangle it belongs to
+
+	for triangle in triangles:
+		for edge in triangle.edges():
+			edge_triangles[edge] = triangle
+
+	simplex = {a, b, c, d}
+	assign_outside(points, triangles, [i for i in range(len(points)) if i not in simplex], tolerance)
+	pending = [triangle for triangle in triangles if triangle.outside]
+
+	while pending:
+		triangle = pending.pop()
+
+		if not triangle.alive or not triangle.outside:
+			continue
+
+		# The furthest point in front of the triangle is certainly on the hull
+		outside = triangle.outside
+		eye = max(outside, key=lambda i: points[i] @ triangle.normal)
+		eye_point = points[eye]
+
+		# Every triangle the eye can see gets replaced, the edges between the seen and unseen triangles make the horizon
+		visible = [triangle]
+		visible_set = {id(triangle)}
+		horizon = []
+		i = 0
+
+		while i < len(visible):
+			for a, b in visible[i].edges():
+				neighbour = edge_triangles[(b, a)]
+
+				if id(neighbour) in visible_set:
+					continue
+
+				if neighbour.normal @ eye_point - neighbour.offset > tolerance:
+					visible.append(neighbour)
+					visible_set.add(id(neighbour))
+				else:
+					horizon.append((a, b))
+
+			i += 1
+
+		# The horizon edges of a visible triangle that was visited late can still turn out to be between two visible triangles
+		horizon = [(a, b) for a, b in horizon if id(edge_triangles[(b, a)]) not in visible_set]
+		orphans = []
+
+		for seen in visible:
+			seen.alive = False
+			orphans.extend(i for i in seen.outside if i != eye)
+
+			for edge in seen.edges():
+				if edge_triangles.get(edge) is seen:
+					del edge_triangles[edge]
+
+		new_triangles = []
+
+		for a, b in horizon:
+			new_triangle = Triangle(points, a, b, eye)
+			new_triangles.append(new_triangle)
+
+			for edge in new_triangle.edges():
+				edge_triangles[edge] = new_triangle
+
+		triangles.extend(new_triangles)
+		assign_outside(points, new_triangles, orphans, tolerance)
+		pending.extend(new_triangle for new_triangle in new_triangles if new_triangle.outside)
+
+	return [triangle for triangle in triangles if triangle.alive]
+
+def assign_outside(points, triangles, candidates, tolerance):
+	# Returns the candidates that aren't in front of any of the triangles
+	if not candidates or not triangles:
+		return candidates
+
+	candidates = np.asarray(candidates, dtype=np.int64)
+	normals = np.array([triangle.normal for triangle in triangles])
+	offsets = np.array([triangle.offset for triangle in triangles])
+	distances = points[candidates] @ normals.T - offsets
+
+	# Each point goes to the first triangle it's in front of, the ones that aren't in front of any are inside
+	outside = distances > tolerance
+	owners = np.argmax(outside, axis=1)
+
+	in_front = outside.any(axis=1)
+
+	for i, owner in zip(candidates[in_front].tolist(), owners[in_front].tolist()):
+		triangles[owner].outside.append(i)
+
+	return candidates[~in_front].tolist()
+
+def merge_faces(points, triangles, tolerance):
+	# Floods out from each triangle over the neighbours that lie in its plane. The biggest triangles go first so the thin
+	# slivers quickhull leaves between nearly coplanar points, whose normals aren't worth much, get merged into them
+	# instead of starting faces of their own. Returns a list of (normal, offset, vertex loop).
+	edge_triangles = {}
+
+	for i, triangle in enumerate(triangles):
+		for edge in triangle.edges():
+			edge_triangles[edge] = i
+
+	areas = [np.linalg.norm(np.cross(points[t.vertices[1]] - points[t.vertices[0]], points[t.vertices[2]] - points[t.vertices[0]])) for t in triangles]
+	face_of = [-1] * len(triangles)
+	faces = []
+
+	for seed in sorted(range(len(triangles)), key=lambda i: -areas[i]):
+		if face_of[seed] >= 0:
+			continue
+
+		face = len(faces)
+		members = [seed]
+		face_of[seed] = face
+		seed_normal = triangles[seed].normal
+		seed_offset = triangles[seed].offset
+		i = 0
+
+		while i < len(members):
+			for a, b in triangles[members[i]].edges():
+				neighbour = edge_triangles[(b, a)]
+
+				if face_of[neighbour] >= 0 or triangles[neighbour].normal @ seed_normal <= 0:
+					continue
+
+				if all(abs(points[v] @ seed_normal - seed_offset) <= tolerance for v in triangles[neighbour].vertices):
+					face_of[neighbour] = face
+					members.append(neighbour)
+
+			i += 1
+
+		# The boundary of the merged triangles in the same direction as their edges
+		next_vertex = {}
+
+		for member in members:
+			for a, b in triangles[member].edges():
+				if face_of[edge_triangles[(b, a)]] != face:
+					next_vertex[a] = b
+
+		start = min(next_vertex)
+		loop = [start]
+
+		while next_vertex[loop[-1]] != start:
+			loop.append(next_vertex[loop[-1]])
+			assert len(loop) <= len(next_vertex), "The hull face isn't a single loop"
+
+		normal = sum(np.cross(points[t.vertices[1]] - points[t.vertices[0]], points[t.vertices[2]] - points[t.vertices[0]]) for t in (triangles[m] for m in members))
+		normal = normal / np.linalg.norm(normal)
+		faces.append((normal, loop))
+
+	# Vertices in the middle of a straight edge are in the loops of both faces along it, the same test drops them from both
+	corners = set()
+
+	for normal, loop in faces:
+		for i, v in enumerate(loop):
+			previous, next = points[loop[i - 1]], points[loop[(i + 1) % len(loop)]]
+			turn = np.linalg.norm(np.cross(points[v] - previous, next - points[v]))
+
+			if turn > tolerance * max(np.linalg.norm(points[v] - previous), np.linalg.norm(next - points[v])):
+				corners.add(v)
+
+	merged = []
+	normals = np.array([normal for normal, _ in faces])
+
+	# The planes are pushed out to the furthest point so the hull always holds every point, the faces merged around a
+	# sliver can lean a little past the tolerance
+	offsets = (points @ normals.T).max(axis=0)
+
+	for (normal, loop), offset in zip(faces, offsets.tolist()):
+		loop = [v for v in loop if v in corners]
+		assert len(loop) >= 3, "A hull face lost its corners"
+		merged.append((normal, offset, loop))
+
+	return merged
+
+def build_convex_hull(positions):
+	# positions is (n, 3) in the hull's local game space, usually the welded positions of the hull mesh
+	points = np.unique(np.asarray(positions, dtype=np.float64).reshape(-1, 3), axis=0)
+	assert len(points) >= 4, "A convex hull needs at least 4 points"
+
+	extent = points.max(axis=0) - points.min(axis=0)
+	tolerance = float(np.linalg.norm(extent)) * RELATIVE_TOLERANCE
+
+	triangles = quickhull(points, tolerance)
+	faces = merge_faces(points, triangles, tolerance)
+
+	# Renumber the vertices still used by the faces in the order they're first used
+	numbers = {}
+
+	for _, _, loop in faces:
+		for v in loop:
+			numbers.setdefault(v, len(numbers))
+
+	neighbours = [set() for _ in range(len(numbers))]
+
+	for _, _, loop in faces:
+		for i, v in enumerate(loop):
+			a, b = numbers[v], numbers[loop[(i + 1) % len(loop)]]
+			neighbours[a].add(b)
+			neighbours[b].add(a)
+
+	hull = ConvexHull()
+	hull.vertices = points[list(numbers)].astype(np.float32)
+	hull.planes = np.array([[normal[0], normal[1], normal[2], offset] for normal, offset, _ in faces], dtype=np.float32)
+	hull.face_offsets = np.concatenate(([0], np.cumsum([len(loop) for _, _, loop in faces]))).astype(np.uint32)
+	hull.face_vertices = np.array([numbers[v] for _, _, loop in faces for v in loop], dtype=np.uint32)
+	hull.adjacency_offsets = np.concatenate(([0], np.cumsum([len(n) for n in neighbours]))).astype(np.uint32)
+	hull.adjacency = np.array([w for n in neighbours for w in sorted(n)], dtype=np.uint32)
+
+	return hull
+
+def support(hull: ConvexHull, direction, start=0):
+	# The furthest vertex in the direction by hill climbing over the adjacency, like the game does
+	vertex = start
+	best = hull.vertices[vertex] @ direction
+
+	while True:
+		neighbours = hull.adjacency[hull.adjacency_offsets[vertex] : hull.adjacency_offsets[vertex + 1]]
+		dots = hull.vertices[neighbours] @ direction
+		i = int(np.argmax(dots))
+
+		if dots[i] <= best:
+			return vertex
+
+		vertex = int(neighbours[i])
+		best = dots[i]
+
+def write_convex_hull(file, hull: ConvexHull, alignment=0):
+	binary.write_f32_array(file, hull.vertices, alignment)
+	binary.write_f32_array(file, hull.planes, alignment)
+	binary.write_u32_array(file, hull.face_offsets, alignment)
+	binary.write_u32_array(file, hull.face_vertices, alignment)
+	binary.write_u32_array(file, hull.adjacency_offsets, alignment)
+	binary.write_u32_array(file, hull.adjacency, alignment)
@@ -0,0 +1,120 @@
+import io
+import time
+import multiprocessing
+import concurrent.futures
+import numpy as np
+from . import binary, weld, ground, optimize, vertex_format, lod
+
+# Turns the raw mesh arrays into the bytes that end up in the file, so they can be cached and run in worker processes
+
+def create_executor():
+	# Spawn instead of fork, forking all of Blender isn't safe. The workers import this package without bpy.
+	return concurrent.futures.ProcessPoolExecutor(mp_context=multiprocessing.get_context('spawn'))
+
+# Runs func(*job) for each job, in the worker processes if there's an executor. The results come back in the same order
+# as the jobs no matter which finishes first.
+def run_jobs(executor: concurrent.futures.Executor, func, jobs):
+	if executor is None or len(jobs) < 2:
+		return [func(*job) for job in jobs]
+	
+	futures = [executor.submit(func, *job) for job in jobs]
+	return [future.result() for future in futures]
+
+def timed_call(func, *args):
+	# func(*args) and how long it took, for the profiler. Runs in the worker processes like func would.
+	start = time.perf_counter()
+	result = func(*args)
+	return result, time.perf_counter() - start
+
+def weld_ground_collision_mesh(mesh_arrays: weld.MeshArrays, matrix):
+	return weld.weld_positions(mesh_arrays.vertex_positions, mesh_arrays.triangle_vertices, matrix)
+
+# All the ground collision meshes are merged into one so the ghost vertices can be found across the seams between them.
+# The triangles are binned into the ground grid cells here too so the game can copy the grid straight in.
+def encode_ground_collision_mesh(meshes, alignment=0):
+	positions, triangles = ground.build_triangles(meshes)
+	bounds_min, bounds_max = ground.triangle_bounds(positions, triangles)
+
+	half_size = ground.grid_half_size(positions)
+	half_cell_count = ground.half_cell_count(half_size)
+	cell_offsets, cell_triangles = ground.bin_triangles(half_cell_count, bounds_min, bounds_max)
+
+	# Each triangle is 6 u32 indices followed by the bounds min and max, the same layout as Ground_Grid_Triangle
+	triangle_records = np.concatenate((
+		np.ascontiguousarray(triangles, dtype='<u4'),
+		np.ascontiguousarray(bounds_min, dtype='<f4').view('<u4'),
+		np.ascontiguousarray(bounds_max, dtype='<f4').view('<u4')
+	), axis=1)
+
+	file = io.BytesIO()
+	binary.write_f32_array(file, positions, alignment)
+	binary.write_u32(file, len(triangle_records))
+	binary.write_bytes(file, triangle_records, alignment)
+	binary.write_u32(file, half_cell_count)
+	binary.write_u32_array(file, cell_offsets, alignment)
+	binary.write_u32_array(file, cell_triangles, alignment)
+	binary.write_cursor_check(file)
+
+	return half_size, file.getvalue(), len(triangles)
+
+# With an alignment the arrays are aligned from the start of the returned bytes, which have to be written at an aligned
+# offset
+def encode_geometry(mesh_arrays: weld.MeshArrays, optimize_vertex_cache: bool, vertex_flags: int, lod_levels: int, alignment=0):
+	chunks, emissive_chunks = encode_geometry_chunks(mesh_arrays, optimize_vertex_cache)
+
+	file = io.BytesIO()
+	binary.write_u32(file, vertex_flags)
+	write_chunks(file, chunks, vertex_flags, alignment)
+	write_chunks(file, emissive_chunks, vertex_flags, alignment)
+
+	# The LOD table, the simplified levels only have the non emissive triangles
+	levels = lod.build_levels(mesh_arrays, lod_levels)
+	binary.write_u32(file, len(levels))
+	triangles_count = len(mesh_arrays.triangle_normals)
+
+	if levels:
+		binary.write_vec3(file, lod.lod_center(mesh_arrays))
+
+	for i, level in enumerate(levels):
+		print(mesh_arrays.name, "LOD" + str(i + 1) + ":", triangles_count, "->", level.triangles_count, "triangles (%.1f%%), error %.4f, switch at %.1f" % (100 * level.triangles_count / triangles_count, level.error, level.switch_distance))
+		level_chunks, _ = encode_geometry_chunks(level.mesh_arrays, optimize_vertex_cache)
+		binary.write_f32(file, level.switch_distance)
+		write_chunks(file, level_chunks, vertex_flags, alignment)
+
+	binary.write_cursor_check(file)
+
+	return file.getvalue()
+
+def encode_geometry_chunks(mesh_arrays: weld.MeshArrays, optimize_vertex_cache: bool):
+	indices, attributes, emissive_indices, emissive_attributes = weld.weld_positions_normals_colors(
+		mesh_arrays.vertex_positions,
+		mesh_arrays.triangle_vertices,
+		mesh_arrays.triangle_loops,
+		mesh_arrays.triangle_normals,
+		mesh_arrays.corner_colors,
+		mesh_arrays.triangle_emissive
+	)
+
+	# Meshes with too many vertices for u16 indices are split into chunks the game draws separately
+	chunks = weld.split_into_u16_chunks(indices, attributes.reshape(-1, 9))
+	emissive_chunks = weld.split_into_u16_chunks(emissive_indices, emissive_attributes.reshape(-1, 3))
+
+	if len(chunks) > 1 or len(emissive_chunks) > 1:
+		print(mesh_arrays.name, "split into", len(chunks), "chunks and", len(emissive_chunks), "emissive chunks")
+
+	if optimize_vertex_cache:
+		chunks = [optimize.optimize_mesh(mesh_arrays.name, indices, rows) for indices, rows in chunks]
+		emissive_chunks = [optimize.optimize_mesh(mesh_arrays.name + " (emissive)", indices, rows) for indices, rows in emissive_chunks]
+
+	return chunks, emissive_chunks
+
+def write_chunks(file, chunks, vertex_flags: int, alignment=0):
+	binary.write_u32(file, len(chunks))
+
+	for indices, rows in chunks:
+		if vertex_flags == vertex_format.FULL:
+			binary.write_indices_attributes(file, indices, rows.reshape(-1), alignment)
+		else:
+			binary.write_u32(file, len(indices))
+			binary.write_bytes(file, binary.u16_array(indices), alignment)
+			vertex_format.write_vertices(file, rows, vertex_flags, alignment)
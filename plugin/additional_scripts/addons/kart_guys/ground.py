@@ -0,0 +1,142 @@
+import numpy as np
+from . import weld
+
+# The single merged ground collision mesh the game loads straight into its ground grid
+
+NO_GHOST_VERTEX = 0
+
+def merge_meshes(meshes):
+	# meshes is a list of (indices, positions) welded per mesh. Welds all the positions into one pool and returns the
+	# (t, 3) vertex indices into it along with the positions. The first vertex of the pool is a dummy so that an index of
+	# 0 can mean "no ghost vertex", like the game expects.
+	corner_positions = [np.empty((0, 3), dtype=np.float32)]
+
+	for indices, positions in meshes:
+		positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+		corner_positions.append(positions[np.asarray(indices, dtype=np.int64)])
+
+	merged_indices, merged_positions = weld.weld(np.concatenate(corner_positions))
+	merged_indices = merged_indices.astype(np.int64) + 1
+	merged_positions = np.concatenate((np.zeros((1, 3), dtype=np.float32), merged_positions))
+
+	return merged_indices.reshape(-1, 3), merged_positions.reshape(-1)
+
+def find_ghost_vertices(triangles):
+	# For each edge of each triangle, finds the vertex opposite of that edge in the neighbouring triangle. This is the same
+	# as the edge -> vertex map the game used to build on load: each triangle registers its edges reversed (to keep the
+	# winding order) and if multiple triangles register the same edge, the last one wins. Returns (t, 3) g1, g2, g3.
+	triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+
+	if len(triangles) == 0:
+		return np.empty((0, 3), dtype=np.int64)
+
+	a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+
+	# Registered edges, in the order the game inserted them: (b, a) -> c, (c, b) -> a, (a, c) -> b
+	registered_keys = np.stack(((b << 32) | a, (c << 32) | b, (a << 32) | c), axis=1).reshape(-1)
+	registered_vertices = np.stack((c, a, b), axis=1).reshape(-1)
+
+	# Keep the last registration of each edge
+	reversed_keys = registered_keys[::-1]
+	unique_keys, first_in_reversed = np.unique(reversed_keys, return_index=True)
+	unique_vertices = registered_vertices[::-1][first_in_reversed]
+
+	# Look up (a, b), (b, c) and (c, a)
+	query_keys = np.stack(((a << 32) | b, (b << 32) | c, (c << 32) | a), axis=1).reshape(-1)
+	found = np.searchsorted(unique_keys, query_keys)
+	found = np.minimum(found, len(unique_keys) - 1)
+
+	ghosts = np.where(unique_keys[found] == query_keys, unique_vertices[found], NO_GHOST_VERTEX)
+	return ghosts.reshape(-1, 3)
+
+def build_triangles(meshes):
+	# Returns the merged positions and (t, 6) u32 triangles: a, b, c, g1, g2, g3
+	triangles, positions = merge_meshes(meshes)
+	ghosts = find_ghost_vertices(triangles)
+
+	return positions, np.concatenate((triangles, ghosts), axis=1).astype(np.uint32)
+
+# Same as CELL_SIZE in ground_grid.odin. The math below is done in single precision like the game does it.
+CELL_SIZE = np.float32(20.0)
+MIN_HALF_CELL_COUNT = np.float32(5.0)
+
+def grid_half_size(positions):
+	# Largest x or z extent, used to size the grids
+	positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+
+	if len(positions) == 0:
+		return np.float32(0.0)
+	
+	return np.abs(positions[:, 0::2]).max()
+
+def half_cell_count(half_size):
+	# ground_grid_reset
+	return int(max(np.ceil(np.float32(half_size) / CELL_SIZE), MIN_HALF_CELL_COUNT))
+
+def bounds_to_grid_cells(half_cell_count, cell_size, bounds_min, bounds_max):
+	# Vectorized copy of bounds_to_grid_cells in common.odin, bounds_min and bounds_max are (n, 3)
+	half_cell_count_f32 = np.float32(half_cell_count)
+	cell_count = half_cell_count * 2
+	cell_count_f32 = np.float32(cell_count)
+	bounds_min = np.asarray(bounds_min, dtype=np.float32).reshape(-1, 3)
+	bounds_max = np.asarray(bounds_max, dtype=np.float32).reshape(-1, 3)
+
+	min_x = np.maximum(np.floor(bounds_min[:, 0] / cell_size + half_cell_count_f32), 0).astype(np.int64)
+	min_y = np.maximum(np.floor(bounds_min[:, 2] / cell_size + half_cell_count_f32), 0).astype(np.int64)
+	max_x = np.minimum(np.ceil(bounds_max[:, 0] / cell_size + half_cell_count_f32), cell_count_f32).astype(np.int64)
+	max_y = np.minimum(np.ceil(bounds_max[:, 2] / cell_size + half_cell_count_f32), cell_count_f32).astype(np.int64)
+
+	ok = ~((max_x < 0) | (max_y < 0) | (min_x >= cell_count) | (min_y >= cell_count))
+
+	# A vertical wall lined up with a cell boundary has the same min and max
+	same_x = min_x == max_x
+	same_x_at_end = same_x & (max_x == cell_count - 1)
+	min_x = np.where(same_x_at_end, min_x - 1, min_x)
+	max_x = np.where(same_x & ~same_x_at_end, max_x + 1, max_x)
+
+	same_y = min_y == max_y
+	same_y_at_end = same_y & (max_y == cell_count - 1)
+	min_y = np.where(same_y_at_end, min_y - 1, min_y)
+	max_y = np.where(same_y & ~same_y_at_end, max_y + 1, max_y)
+
+	return min_x, min_y, max_x, max_y, ok
+
+def triangle_bounds(positions, triangles):
+	# Returns (t, 3) mins and maxes of the a, b, c vertices of each triangle
+	positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+	triangles = np.asarray(triangles).reshape(-1, 6)
+
+	a = positions[triangles[:, 0]]
+	b = positions[triangles[:, 1]]
+	c = positions[triangles[:, 2]]
+
+	return np.minimum(np.minimum(a, b), c), np.maximum(np.maximum(a, b), c)
+
+def bin_triangles(half_cell_count, bounds_min, bounds_max):
+	# Puts each triangle in every cell its bounds span, like the game used to on load. Returned in compressed sparse row
+	# form: the triangles in cell (x, y) are cell_triangles[cell_offsets[c]:cell_offsets[c + 1]] where
+	# c = x * cell_count + y. The triangles in each cell are in increasing order.
+	cell_count = half_cell_count * 2
+	min_x, min_y, max_x, max_y, ok = bounds_to_grid_cells(half_cell_count, CELL_SIZE, bounds_min, bounds_max)
+	assert ok.all(), "Ground collision triangle is off the ground grid"
+
+	heights = max_y - min_y
+	counts = (max_x - min_x) * heights
+	total = int(counts.sum())
+
+	entry_triangles = np.repeat(np.arange(len(counts)), counts)
+	entry_starts = np.repeat(np.cumsum(counts) - counts, counts)
+	local = np.arange(total) - entry_starts
+	entry_heights = heights[entry_triangles]
+
+	x = min_x[entry_triangles] + local // np.maximum(entry_heights, 1)
+	y = min_y[entry_triangles] + local % np.maximum(entry_heights, 1)
+	cells = x * cell_count + y
+
+	order = np.argsort(cells, kind='stable')
+	cell_triangles = entry_triangles[order].astype(np.uint32)
+
+	cell_offsets = np.zeros(cell_count * cell_count + 1, dtype=np.uint32)
+	np.cumsum(np.bincount(cells, minlength=cell_count * cell_count), out=cell_offsets[1:])
+
+	return cell_offsets, cell_triangles
@@ -1,48 +1,117 @@
+import os
+import time
+import numpy as np
 from bpy.types import Context, Depsgraph, Object, Mesh, Curve, Spline
-from . import util
-from .util import WObject
-
-VERSION = 8
+from . import util, encode, mesh_cache, vertex_format, container, reader, profiling, ai_path, batch, convex_hull, mass_properties
+from .util import WObject, SceneGraph
+
+VERSION = 22
+
+# The exporter's vertex format option -> the vertex format flags written with each geometry
+VERTEX_FORMATS = {
+	'full': vertex_format.FULL,
+	'compact': vertex_format.COMPACT,
+	'compact_quantized': vertex_format.COMPACT_QUANTIZED
+}
+
+# Everything export reads off the operator, with the operator's defaults. The headless exporter passes one of these
+# instead of an operator.
+class ExportOptions:
+	def __init__(self, filepath, **options):
+		self.filepath = filepath
+		self.use_cache = True
+		self.use_parallel = True
+		self.optimize_vertex_cache = False
+		self.vertex_format = 'full'
+		self.lod_levels = 0
+		self.static_batching = False
+		self.compression = 'none'
+		self.array_alignment = 0
+		self.profile = False
+
+		for name, value in options.items():
+			assert hasattr(self, name), "Unknown level export option " + name
+			setattr(self, name, value)
 
 def export(operator, context: Context):
+	alignment = operator.array_alignment
+	assert alignment >= 0 and alignment & (alignment - 1) == 0, "The array alignment has to be 0 or a power of 2"
+	profiler = profiling.create_profiler(operator.profile)
 	depsgraph: Depsgraph = context.evaluated_depsgraph_get()
-	graph = util.create_scene_graph(depsgraph)
-	util.print_graph(graph, 0)
-	util.debug_export_graph(graph, operator.filepath)
-	file = open(operator.filepath, 'wb')
 
+	with profiler.stage("scene graph"):
+		graph = util.create_scene_graph(depsgraph)
+
+	with profiler.stage("print graph"):
+		util.print_graph(graph, 0)
+		util.debug_export_graph(graph, operator.filepath)
+
+	file = container.SectionedFile(profiler)
+
+	cache = None
+	if operator.use_cache:
+		cache = mesh_cache.MeshCache(operator.filepath + ".cache")
+
+	file.begin_section("version")
 	util.write_u32(file, VERSION)
 
+	# Where every section after it is and its CRC32, filled in when the file is saved. With an array alignment the
+	# sections after it start at aligned offsets.
+	file.begin_toc_section("toc", alignment)
+
+	file.begin_section("spawn_point")
 	export_spawn_point(graph, file)
-	export_ground_collision_meshes(depsgraph, graph, file)
-	mesh_name_to_index_max = export_geometries(depsgraph, graph, file)
-	export_inanimate_entities(graph, file, mesh_name_to_index_max)
-	export_rigid_bodies(graph, file, mesh_name_to_index_max)
-	export_oil_slicks(depsgraph, graph, file, mesh_name_to_index_max)
+	executor = None
+	if operator.use_parallel:
+		executor = encode.create_executor()
+
+	# The workers are shut down even if the export fails, otherwise they're left running in the background
+	try:
+		file.begin_section("ground_collision_mesh")
+		export_ground_collision_meshes(depsgraph, graph, file, cache, executor, alignment, profiler)
+		file.begin_section("geometries")
+		mesh_name_to_index_max, batch_indices, batched = export_geometries(depsgraph, graph, file, cache, executor, operator.optimize_vertex_cache, VERTEX_FORMATS[operator.vertex_format], operator.static_batching, operator.lod_levels, alignment, profiler)
+	finally:
+		if executor is not None:
+			executor.shutdown(cancel_futures=True)
+
+	file.begin_section("inanimate_entities")
+	export_inanimate_entities(depsgraph, graph, file, mesh_name_to_index_max, alignment, profiler)
+	file.begin_section("static_instances")
+	export_static_instances(graph, file, mesh_name_to_index_max, batch_indices, batched, alignment)
+	file.begin_section("rigid_bodies")
+	export_rigid_bodies(depsgraph, graph, file, mesh_name_to_index_max, alignment, profiler)
+	file.begin_section("oil_slicks")
+	export_oil_slicks(depsgraph, graph, file, mesh_name_to_index_max, alignment)
+	file.begin_section("bumpers")
 	export_bumpers(depsgraph, graph, file, mesh_name_to_index_max)
+	file.begin_section("boost_jets")
 	export_boost_jets(depsgraph, graph, file, mesh_name_to_index_max)
-	export_ai_paths(depsgraph, graph, file)
+	file.begin_section("ai_paths")
+	export_ai_paths(depsgraph, graph, file, alignment)
 	util.write_cursor_check(file)
+	file.begin_section("ai_spawn_points")
 	export_ai_spawn_points(depsgraph, graph, file)
+	profiler.finish(file)
+
+	with profiler.stage("save"):
+		file.save(operator.filepath, container.CODECS[operator.compression])
 
-	file.close()
 	print("Exported", operator.filepath)
 
-	write_reload_trigger_file(operator.filepath)
+	if cache is not None:
+		with profiler.stage("cache eviction"):
+			cache.evict()
 
-	return {'FINISHED'}
+		print("Mesh cache hits:", cache.hits, "misses:", cache.misses)
 
-def export_spawn_point(graph, file):
-	spawn_point_w_object = None
-	to_visit = graph.copy()
+	write_reload_trigger_file(operator.filepath)
+	profiler.write_report(operator.filepath, os.path.getsize(operator.filepath))
 
-	while to_visit:
-		w_object: WObject = to_visit.pop(0)
-		to_visit.extend(w_object.children_w_objects)
+	return {'FINISHED'}
 
-		if w_object.object.kg_type == 'spawn_point':
-			spawn_point_w_object = w_object
-			break
+def export_spawn_point(graph: SceneGraph, file):
+	spawn_point_w_object = graph.first_of_kg_type('spawn_point')
 	
 	position_game = [0.0, 5.0, 0.0]
 	orientation_game = [0.0, 0.0, 0.0, 1.0]
@@ -60,111 +129,238 @@ def export_spawn_point(graph, file):
 	util.write_vec3(file, position_game)
 	util.write_quat(file, orientation_game)
 
-def export_ground_collision_meshes(depsgraph: Depsgraph, graph, file):
+def export_ground_collision_meshes(depsgraph: Depsgraph, graph: SceneGraph, file, cache: mesh_cache.MeshCache, executor, alignment=0, profiler=profiling.DISABLED):
 	print("-- Ground collision meshes ---")
 
-	w_objects = []
-	to_visit = graph.copy()
-
-	while to_visit:
-		w_object: WObject = to_visit.pop(0)
-		to_visit.extend(w_object.children_w_objects)
+	w_objects = graph.of_kg_types('ground_collision_mesh', 'ground_collision_mesh_and_inanimate')
 
-		kg_type = w_object.object.kg_type
-		if kg_type == 'ground_collision_mesh' or kg_type == 'ground_collision_mesh_and_inanimate':
-			print(w_object.unique_name)
-			w_objects.append(w_object)
+	for w_object in w_objects:
+		print(w_object.unique_name)
 	
 	print()
-	meshes_data = []
-	size = 0
+	jobs = []
+	extract_times = []
 	
-	for w_object in w_objects:
-		indices, positions = util.calculate_indices_global_positions(w_object.final_world_matrix, depsgraph, w_object.object) # Have this (and other) procs just take in the non-eval'd object?
-		meshes_data.append((indices, positions))
-
-		for i in range(int(len(positions) / 3)):
-			x = positions[i * 3]
-			z = positions[i * 3 + 2]
-
-			size = max(size, abs(x))
-			size = max(size, abs(z))
+	with profiler.stage("extract mesh arrays"):
+		for w_object in w_objects:
+			start = time.perf_counter()
+			mesh_arrays = util.extract_mesh_arrays(depsgraph, w_object.object, False) # Have this (and other) procs just take in the non-eval'd object?
+			matrix = np.array(w_object.final_world_matrix, dtype=np.float32)
+			jobs.append((mesh_arrays, matrix))
+			extract_times.append(time.perf_counter() - start)
 	
+	encode_times = [] if profiler.enabled else None
+	meshes = encode_meshes(cache, executor, encode.weld_ground_collision_mesh, jobs, encode_times)
+
+	with profiler.stage("ground grid"):
+		size, blob, triangles_count = encode.encode_ground_collision_mesh(meshes, alignment)
+
+	if profiler.enabled:
+		for w_object, (mesh_arrays, _), (_, positions), extract_time, encode_time in zip(w_objects, jobs, meshes, extract_times, encode_times):
+			profiler.item('ground_meshes', w_object.unique_name, extract_time + (encode_time or 0.0),
+				extract_seconds=extract_time,
+				weld_seconds=encode_time,
+				cached=encode_time is None,
+				triangles=len(mesh_arrays.triangle_vertices) // 3,
+				vertices=len(mesh_arrays.vertex_positions),
+				welded_vertices=len(positions) // 3
+			)
+
 	print("Grid size:", size)
+	print("Triangles:", triangles_count)
 	print()
 
 	util.write_f32(file, size)
-	util.write_u32(file, len(meshes_data))
-
-	for mesh_data in meshes_data:
-		indices, positions = mesh_data
-		util.write_indices_attributes(file, indices, positions)
-		util.write_cursor_check(file)
+	util.write_padding(file, alignment) # The blob's arrays are aligned from its start
+	file.write(blob)
 
-def export_geometries(depsgraph: Depsgraph, graph, file):
+# Returns the mesh name -> geometry index map and, with static batching, the geometry indices of the batches and the set
+# of batched objects
+def export_geometries(depsgraph: Depsgraph, graph: SceneGraph, file, cache: mesh_cache.MeshCache, executor, optimize_vertex_cache: bool, vertex_flags: int, static_batching: bool, lod_levels: int, alignment=0, profiler=profiling.DISABLED):
 	print("-- Meshes ---")
 
 	w_objects = []
 	mesh_name_to_index_map = {}
 	mesh_index = 0
-	to_visit = graph.copy()
-
-	while to_visit:
-		w_object: WObject = to_visit.pop(0)
-		to_visit.extend(w_object.children_w_objects)
-		object: Object = w_object.object
-
-		kg_types = [
-			'inanimate',
-			'rigid_body',
-			'oil_slick',
-			'bumper',
-			'boost_jet',
-			'ground_collision_mesh_and_inanimate'
-		]
-		
-		if object.kg_type in kg_types:
-			mesh: Mesh = object.data
 
-			if mesh.name_full in mesh_name_to_index_map:
-				continue
+	# Batched objects only need a geometry of their own if something that isn't batched uses the same mesh
+	batched_w_objects = []
+	mesh_arrays_map = {}
 
-			print(mesh.name_full)
+	if static_batching:
+		with profiler.stage("static batches"):
+			batched_w_objects, mesh_arrays_map = batched_static_instance_w_objects(depsgraph, graph)
 
-			# We save the w_object and not the mesh because I guess you need to evalutate the object first then get the evalutated mesh from that.
-			# So if multiple w_objects all have the same mesh, we just save the first w_object
-			w_objects.append(w_object)
+	batched = set(batched_w_objects)
+
+	kg_types = [
+		'inanimate',
+		'rigid_body',
+		'oil_slick',
+		'bumper',
+		'boost_jet',
+		'ground_collision_mesh_and_inanimate'
+	]
+
+	for w_object in graph.of_kg_types(*kg_types):
+		mesh: Mesh = w_object.object.data
+
+		if mesh.name_full in mesh_name_to_index_map or w_object in batched:
+			continue
+
+		print(mesh.name_full)
 
-			mesh_name_to_index_map[mesh.name_full] = mesh_index
-			mesh_index += 1
+		# We save the w_object and not the mesh because I guess you need to evalutate the object first then get the evalutated mesh from that.
+		# So if multiple w_objects all have the same mesh, we just save the first w_object
+		w_objects.append(w_object)
+
+		mesh_name_to_index_map[mesh.name_full] = mesh_index
+		mesh_index += 1
 	
 	print()
-	util.write_u32(file, len(w_objects))
+	jobs = []
+	extract_times = []
+
+	with profiler.stage("extract mesh arrays"):
+		for w_object in w_objects:
+			print(w_object.object.name_full)
+			start = time.perf_counter()
+			mesh_arrays = util.extract_mesh_arrays(depsgraph, w_object.object, True)
+			jobs.append((mesh_arrays, optimize_vertex_cache, vertex_flags, lod_levels, alignment))
+			extract_times.append(time.perf_counter() - start)
 	
-	for w_object in w_objects:
-		object: Object = w_object.object
-		util.write_string(file, object.data.name_full)
-		indices, attributes, emissive_indices, emissive_attributes = util.calculate_indices_local_positions_normals_colors_new_2(depsgraph, object)
-		util.write_indices_attributes(file, indices, attributes)
-		util.write_indices_attributes(file, emissive_indices, emissive_attributes)
-		util.write_cursor_check(file)
+	names = [w_object.object.data.name_full for w_object in w_objects]
+	batch_indices = None
 
-	return mesh_name_to_index_map
+	if static_batching:
+		with profiler.stage("static batches"):
+			batches = export_static_batches(batched_w_objects, mesh_arrays_map)
 
-def export_inanimate_entities(graph, file, mesh_name_to_index_map):
-	print("--- Inanimate entities ---")
+		batch_indices = list(range(len(names), len(names) + len(batches)))
+
+		for mesh_arrays in batches:
+			names.append(mesh_arrays.name)
+			jobs.append((mesh_arrays, optimize_vertex_cache, vertex_flags, lod_levels, alignment))
+			extract_times.append(0.0)
+
+	encode_times = [] if profiler.enabled else None
 
+	with profiler.stage("encode geometries"):
+		blobs = encode_meshes(cache, executor, encode.encode_geometry, jobs, encode_times)
+
+	util.write_u32(file, len(names))
+	
+	for name, blob in zip(names, blobs):
+		util.write_string(file, name)
+		util.write_padding(file, alignment) # The blob's arrays are aligned from its start
+		file.write(blob)
+
+	if profiler.enabled:
+		for name, (mesh_arrays, *_), blob, extract_time, encode_time in zip(names, jobs, blobs, extract_times, encode_times):
+			profile_geometry(profiler, name, mesh_arrays, blob, extract_time, encode_time, alignment)
+
+	return mesh_name_to_index_map, batch_indices, batched
+
+def profile_geometry(profiler: profiling.Profiler, name: str, mesh_arrays, blob: bytes, extract_time: float, encode_time, alignment: int):
+	# The welded counts come from reading the encoded geometry back, so they're there for cached geometries too
+	geometry = reader.read_geometry(reader.Cursor(blob, name, alignment=alignment), name)
+	chunks = geometry.chunks + geometry.emissive_chunks
+
+	profiler.item('geometries', name, extract_time + (encode_time or 0.0),
+		bytes=len(name.encode('utf-8')) + 4 + len(blob), # Not counting the padding before the blob
+		extract_seconds=extract_time,
+		encode_seconds=encode_time,
+		cached=encode_time is None,
+		triangles=len(mesh_arrays.triangle_normals),
+		vertices=len(np.asarray(mesh_arrays.vertex_positions).reshape(-1, 3)),
+		welded_vertices=sum(len(chunk.vertices.positions) for chunk in chunks),
+		emissive_triangles=sum(len(chunk.indices) for chunk in geometry.emissive_chunks) // 3,
+		chunks=len(chunks),
+		lods=len(geometry.lods)
+	)
+
+# The static instances that go into the batches, with the mesh arrays of their meshes. The ones with a mesh too big for
+# a batch on its own keep their geometry and stay plain static instances.
+def batched_static_instance_w_objects(depsgraph: Depsgraph, graph: SceneGraph):
 	w_objects = []
-	to_visit = graph.copy()
 
-	while to_visit:
-		w_object: WObject = to_visit.pop(0)
-		to_visit.extend(w_object.children_w_objects)
+	# Instanced meshes are only pulled out of Blender once
+	mesh_arrays_map = {}
+
+	for w_object in static_instance_w_objects(graph):
+		mesh_name = w_object.object.data.name_full
+
+		if mesh_name not in mesh_arrays_map:
+			mesh_arrays_map[mesh_name] = util.extract_mesh_arrays(depsgraph, w_object.object, True)
 
-		kg_type = w_object.object.kg_type
-		if kg_type == 'inanimate' or kg_type == 'ground_collision_mesh_and_inanimate':
-			print(w_object.unique_name)
+		if batch.batch_bytes(mesh_arrays_map[mesh_name]) <= batch.MAX_BATCH_BYTES:
 			w_objects.append(w_object)
+
+	return w_objects, mesh_arrays_map
+
+def export_static_batches(w_objects, mesh_arrays_map):
+	print("-- Static batches ---")
+
+	meshes = [mesh_arrays_map[w_object.object.data.name_full] for w_object in w_objects]
+	matrices = [np.array(w_object.final_world_matrix, dtype=np.float32) for w_object in w_objects]
+	batches = batch.build_batches(meshes, matrices)
+
+	for mesh_arrays in batches:
+		print(mesh_arrays.name + ":", len(mesh_arrays.triangle_normals), "triangles")
+	
+	print(len(w_objects), "objects merged into", len(batches), "batches")
+	print()
+
+	return batches
+
+# Encodes each job's mesh with func(mesh_arrays, *args). Meshes that haven't changed since the last export come out of
+# the cache, the rest are encoded in parallel when there's an executor. The results are in the same order as the jobs.
+# If times is a list it's filled with how long each job took to encode, None for the ones that came out of the cache.
+def encode_meshes(cache: mesh_cache.MeshCache, executor, func, jobs, times=None):
+	results = [None] * len(jobs)
+	keys = [None] * len(jobs)
+
+	if cache is not None:
+		for i, job in enumerate(jobs):
+			mesh_arrays, *args = job
+			keys[i] = mesh_cache.hash_parts(str(VERSION), mesh_cache.source_hash(), func.__name__, mesh_cache.hash_mesh_arrays(mesh_arrays), *args)
+			results[i] = cache.get(keys[i])
+	
+	dirty = [i for i in range(len(jobs)) if results[i] is None]
+
+	if times is None:
+		dirty_results = encode.run_jobs(executor, func, [jobs[i] for i in dirty])
+	else:
+		timed_results = encode.run_jobs(executor, encode.timed_call, [(func, *jobs[i]) for i in dirty])
+		dirty_results = [result for result, _ in timed_results]
+		times[:] = [None] * len(jobs)
+
+		for i, (_, seconds) in zip(dirty, timed_results):
+			times[i] = seconds
+
+	for i, result in zip(dirty, dirty_results):
+		results[i] = result
+
+		if cache is not None:
+			cache.put(keys[i], result)
+	
+	return results
+
+# Inanimate objects without hulls never move and nothing collides with them so the game doesn't need an entity for each
+# one, they're written as static instances instead
+def is_static_instance(w_object: WObject):
+	return not w_object.hull_w_objects
+
+def static_instance_w_objects(graph: SceneGraph):
+	return [w_object for w_object in graph.of_kg_types('inanimate', 'ground_collision_mesh_and_inanimate') if is_static_instance(w_object)]
+
+def export_inanimate_entities(depsgraph: Depsgraph, graph: SceneGraph, file, mesh_name_to_index_map, alignment=0, profiler=profiling.DISABLED):
+	print("--- Inanimate entities ---")
+
+	w_objects = [w_object for w_object in graph.of_kg_types('inanimate', 'ground_collision_mesh_and_inanimate') if not is_static_instance(w_object)]
+
+	for w_object in w_objects:
+		print(w_object.unique_name)
 	
 	print()
 	util.write_u32(file, len(w_objects))
@@ -176,67 +372,116 @@ def export_inanimate_entities(graph, file, mesh_name_to_index_map):
 		mesh_index = mesh_name_to_index_map[w_object.object.data.name_full]
 		util.write_u32(file, mesh_index)
 
-		export_hulls(file, w_object)
+		export_hulls(file, collect_hulls(depsgraph, w_object, profiler), alignment)
 
 		util.write_cursor_check(file)
 
-def export_hulls(file, w_object: WObject):
-	hull_w_objects = []
+# Static inanimate objects grouped by geometry, one batch per geometry with the transforms of all its instances packed
+# into one array so the game can draw each batch with a single instanced draw. With static batching the batched objects
+# are already merged into the batch geometries, which each get a single identity transform.
+def export_static_instances(graph: SceneGraph, file, mesh_name_to_index_map, batch_indices, batched, alignment=0):
+	print("--- Static instances ---")
+
+	batch_indices = batch_indices or []
+	batches = {}
+
+	for w_object in static_instance_w_objects(graph):
+		if w_object in batched:
+			continue
+
+		mesh_index = mesh_name_to_index_map[w_object.object.data.name_full]
+		batches.setdefault(mesh_index, []).append(w_object)
+	
+	util.write_u32(file, len(batch_indices) + len(batches))
+
+	if batch_indices:
+		for geometry_index in batch_indices:
+			util.write_u32(file, geometry_index)
+			util.write_f32_array(file, [[0, 0, 0, 0, 0, 0, 1, 1, 1, 1]], alignment)
+
+		print(len(batch_indices), "static batches")
 
-	for child_w_object in w_object.children_w_objects:
-		if child_w_object.object.kg_type == 'hull':
-			hull_w_objects.append(child_w_object)
+	for mesh_index, w_objects in sorted(batches.items()):
+		print(w_objects[0].object.data.name_full, "x", len(w_objects))
+		transforms = np.zeros((len(w_objects), 10), dtype=np.float32)
+
+		for i, w_object in enumerate(w_objects):
+			matrix = w_object.final_world_matrix
+			transforms[i, 0:3] = util.blender_position_to_game_position(matrix.to_translation())
+			transforms[i, 3:7] = util.blender_orientation_to_game_orientation(matrix.to_quaternion())
+			transforms[i, 7:10] = util.blender_scale_to_game_scale(matrix.to_scale())
+
+		util.write_u32(file, mesh_index)
+		util.write_f32_array(file, transforms, alignment)
 	
-	util.write_u32(file, len(hull_w_objects))
+	util.write_cursor_check(file)
+	print()
+
+def collect_hulls(depsgraph: Depsgraph, w_object: WObject, profiler=profiling.DISABLED):
+	# The hulls in game space relative to w_object. Mesh hulls are exported as the convex hull of their vertices.
+	hulls = []
 
-	for hull_w_object in hull_w_objects:
+	for hull_w_object in w_object.hull_w_objects:
 		object = hull_w_object.object
-		util.write_game_pos_ori_scale_from_blender_matrix(file, object.matrix_local)
+		matrix = object.matrix_local
+
+		hull = mass_properties.Hull(
+			object.kg_hull_type,
+			util.blender_position_to_game_position(matrix.to_translation()),
+			util.blender_orientation_to_game_orientation(matrix.to_quaternion()),
+			util.blender_scale_to_game_scale(matrix.to_scale())
+		)
+
+		if object.kg_hull_type == 'mesh':
+			start = time.perf_counter()
+
+			with profiler.stage("convex hulls"):
+				_, positions = util.calculate_indices_local_positions(depsgraph, object)
+				hull.convex = convex_hull.build_convex_hull(positions)
+
+			print("Convex hull", hull_w_object.unique_name + ":", len(positions) // 3, "vertices ->", len(hull.convex.vertices), "vertices,", len(hull.convex.planes), "faces")
+			profiler.item('convex_hulls', hull_w_object.unique_name, time.perf_counter() - start, vertices=len(positions) // 3, hull_vertices=len(hull.convex.vertices), faces=len(hull.convex.planes))
+
+		hulls.append(hull)
+
+	return hulls
+
+def export_hulls(file, hulls, alignment=0):
+	util.write_u32(file, len(hulls))
+
+	for hull in hulls:
+		util.write_pos_ori_scale(file, hull.position, hull.orientation, hull.scale)
 
-		assert object.kg_hull_type != 'mesh'
 		hull_type = None
 
-		match object.kg_hull_type:
+		match hull.kind:
 			case 'box':
 				hull_type = 0
 			case 'cylinder':
 				hull_type = 1
 			case 'mesh':
-				hull_type = 2
+				hull_type = 4 # Convex, the game's Mesh hulls are the triangle soups of the oil slicks
 		
 		assert hull_type is not None
 		util.write_u32(file, hull_type)
 
-def export_rigid_bodies(graph, file, mesh_name_to_index_map):
+		if hull.convex is not None:
+			convex_hull.write_convex_hull(file, hull.convex, alignment)
+
+def export_rigid_bodies(depsgraph: Depsgraph, graph: SceneGraph, file, mesh_name_to_index_map, alignment=0, profiler=profiling.DISABLED):
 	print("--- Rigid body islands ---")
 	
 	islands = []
-	to_visit = graph.copy()
-
-	while to_visit:
-		w_object: WObject = to_visit.pop(0)
-		object: Object = w_object.object
-
-		if object.kg_type == 'rigid_body_island':
-			print(w_object.unique_name)
-
-			rigid_bodies = []
-			to_visit_in_island = w_object.children_w_objects.copy()
 
-			while to_visit_in_island:
-				w_object_in_island: WObject = to_visit_in_island.pop(0)
-				to_visit_in_island.extend(w_object_in_island.children_w_objects)
-				object_in_island: Object = w_object_in_island.object
-
-				if object_in_island.kg_type == 'rigid_body':
-					print("    " + w_object_in_island.unique_name)
-					rigid_bodies.append(w_object_in_island)
-			
-			assert len(rigid_bodies) > 0, "Rigid body island " + w_object.unique_name + " has no rigid bodies."
-			islands.append(rigid_bodies)
+	for w_object in graph.islands():
+		print(w_object.unique_name)
+		rigid_bodies = graph.island_rigid_bodies.get(w_object, [])
 
-		else:
-			to_visit.extend(w_object.children_w_objects)
+		for w_object_in_island in rigid_bodies:
+			print("    " + w_object_in_island.unique_name)
+		
+		assert len(rigid_bodies) > 0, "Rigid body island " + w_object.unique_name + " has no rigid bodies."
+		islands.append(rigid_bodies)
 	
 	print()
 	util.write_u32(file, len(islands))
@@ -264,30 +509,33 @@ def export_rigid_bodies(graph, file, mesh_name_to_index_map):
 			
 			assert(status_effect is not None)
 			
+			# The mass properties come from the hulls in the rigid body's space, which has its scale but not its orientation
+			hulls = collect_hulls(depsgraph, w_object, profiler)
+			game_scale = util.blender_scale_to_game_scale(w_object.final_world_matrix.to_scale())
+
+			with profiler.stage("mass properties"):
+				properties = mass_properties.calculate_mass_properties(hulls, game_scale, object.kg_rigid_body_mass, game_dimensions)
+			print(w_object.unique_name, "center of mass", properties.center_of_mass, "principal moments", properties.principal_moments)
+			
 			util.write_string(file, w_object.unique_name)
 			util.write_game_pos_ori_scale_from_blender_matrix(file, w_object.final_world_matrix)
 			util.write_u32(file, mesh_index)
 			util.write_f32(file, object.kg_rigid_body_mass)
-			util.write_vec3(file, game_dimensions)
+			util.write_vec3(file, properties.center_of_mass)
+			util.write_vec3(file, properties.principal_moments)
+			util.write_quat(file, properties.principal_orientation)
 			util.write_b8(file, object.kg_rigid_body_collision_exclude)
 			util.write_u32(file, status_effect)
-			export_hulls(file, w_object)
+			export_hulls(file, hulls, alignment)
 			util.write_cursor_check(file)
 
-def export_oil_slicks(depsgraph: Depsgraph, graph, file, mesh_name_to_index_map):
+def export_oil_slicks(depsgraph: Depsgraph, graph: SceneGraph, file, mesh_name_to_index_map, alignment=0):
 	print("--- Oil slicks ---")
 
-	w_objects = []
-	to_visit = graph.copy()
+	w_objects = graph.of_kg_types('oil_slick')
 
-	while to_visit:
-		w_object: WObject = to_visit.pop(0)
-		to_visit.extend(w_object.children_w_objects)
-		object: Object = w_object.object
-
-		if object.kg_type == 'oil_slick':
-			print(w_object.unique_name)
-			w_objects.append(w_object)
+	for w_object in w_objects:
+		print(w_object.unique_name)
 	
 	print()
 	util.write_u32(file, len(w_objects))
@@ -302,12 +550,7 @@ def export_oil_slicks(depsgraph: Depsgraph, graph, file, mesh_name_to_index_map)
 		util.write_u32(file, w_object.object.kg_oil_slick_particles_count)
 
 		# Find hull
-		hull_w_object = None
-
-		for child_w_object in w_object.children_w_objects:
-			if child_w_object.object.kg_type == 'hull':
-				hull_w_object = child_w_object
-				break
+		hull_w_object = w_object.hull_w_objects[0] if w_object.hull_w_objects else None
 		
 		# Export hull
 		hull_object = hull_w_object.object
@@ -315,17 +558,14 @@ def export_oil_slicks(depsgraph: Depsgraph, graph, file, mesh_name_to_index_map)
 		util.write_game_pos_ori_scale_from_blender_matrix(file, hull_object.matrix_local)
 
 		indices, positions = util.calculate_indices_local_positions(depsgraph, hull_object)
-		util.write_indices_attributes(file, indices, positions)
+		util.write_indices_attributes(file, indices, positions, alignment)
 
 		util.write_cursor_check(file)
 
-def export_bumpers(depsgraph: Depsgraph, graph, file, mesh_name_to_index_map):
+def export_bumpers(depsgraph: Depsgraph, graph: SceneGraph, file, mesh_name_to_index_map):
 	print("--- Bumpers ---")
 
-	def compare(w_object: WObject):
-		return w_object.object.kg_type == 'bumper'
-	
-	w_objects = util.search_graph_many(graph, compare)
+	w_objects = graph.of_kg_types('bumper')
 
 	util.write_u32(file, len(w_objects))
 
@@ -339,12 +579,7 @@ def export_bumpers(depsgraph: Depsgraph, graph, file, mesh_name_to_index_map):
 		util.write_u32(file, mesh_index)
 	
 		# Find hull
-		hull_w_object = None
-
-		for child_w_object in w_object.children_w_objects:
-			if child_w_object.object.kg_type == 'hull':
-				hull_w_object = child_w_object
-				break
+		hull_w_object = w_object.hull_w_objects[0] if w_object.hull_w_objects else None
 		
 		hull_object = hull_w_object.object
 		assert hull_object.kg_hull_type == 'cylinder'
@@ -354,13 +589,10 @@ def export_bumpers(depsgraph: Depsgraph, graph, file, mesh_name_to_index_map):
 	
 	print()
 
-def export_boost_jets(depsgraph: Depsgraph, graph, file, mesh_name_to_index_map):
+def export_boost_jets(depsgraph: Depsgraph, graph: SceneGraph, file, mesh_name_to_index_map):
 	print("--- Boost jets ---")
 
-	def compare(w_object: WObject):
-		return w_object.object.kg_type == 'boost_jet'
-	
-	w_objects = util.search_graph_many(graph, compare)
+	w_objects = graph.of_kg_types('boost_jet')
 
 	util.write_u32(file, len(w_objects))
 
@@ -374,12 +606,7 @@ def export_boost_jets(depsgraph: Depsgraph, graph, file, mesh_name_to_index_map)
 		util.write_u32(file, mesh_index)
 
 		# Find hull
-		hull_w_object = None
-
-		for child_w_object in w_object.children_w_objects:
-			if child_w_object.object.kg_type == 'hull':
-				hull_w_object = child_w_object
-				break
+		hull_w_object = w_object.hull_w_objects[0] if w_object.hull_w_objects else None
 		
 		hull_object = hull_w_object.object
 		assert hull_object.kg_hull_type == 'box'
@@ -396,31 +623,28 @@ def write_reload_trigger_file(filepath):
 	file.close()
 	print("Wrote reload trigger file ", trigger_filepath)
 
-def export_ai_paths(depsgraph: Depsgraph, graph, file):
+def export_ai_paths(depsgraph: Depsgraph, graph: SceneGraph, file, alignment=0):
 	print("--- AI paths ---")
 
-	def compare_left(w_object: WObject):
-		return w_object.object.kg_type == 'ai_path_left'
-
-	def compare_right(w_object: WObject):
-		return w_object.object.kg_type == 'ai_path_right'
-
-	w_object_left = util.search_graph_one(graph, compare_left)
-	w_object_right = util.search_graph_one(graph, compare_right)
+	w_object_left = graph.first_of_kg_type('ai_path_left')
+	w_object_right = graph.first_of_kg_type('ai_path_right')
 
 	def export_path(w_object: WObject):
 		if w_object == None:
 			# Write 0 for the curves count
 			util.write_u32(file, 0)
-			return
+			util.write_padding(file, alignment)
+			return []
 		
 		curve: Curve = w_object.object.data
 		spline: Spline = curve.splines[0]
 
 		curves_count = len(spline.bezier_points)
 		util.write_u32(file, curves_count)
+		util.write_padding(file, alignment)
 
 		global_matrix = w_object.object.matrix_world
+		curves = []
 
 		for i in range(curves_count):
 			handle_0 = spline.bezier_points[i]
@@ -435,6 +659,9 @@ def export_ai_paths(depsgraph: Depsgraph, graph, file):
 			util.write_vec3(file, p1)
 			util.write_vec3(file, p2)
 			util.write_vec3(file, p3)
+			curves.append((p0, p1, p2, p3))
+		
+		return curves
 
 	if w_object_left == None:
 		print("AI path left not found")
@@ -446,17 +673,25 @@ def export_ai_paths(depsgraph: Depsgraph, graph, file):
 	else:
 		print("Found AI path right:", w_object_right.unique_name)
 	
-	export_path(w_object_left)
-	export_path(w_object_right)
+	left_curves = export_path(w_object_left)
+	right_curves = export_path(w_object_right)
+
+	# The arc length tables and segment grids of the left and right paths
+	left_lengths = ai_path.write_path_table(file, left_curves, alignment)
+	right_lengths = ai_path.write_path_table(file, right_curves, alignment)
+
+	if len(left_lengths) > 0:
+		print("AI path left length:", left_lengths[-1])
+	
+	if len(right_lengths) > 0:
+		print("AI path right length:", right_lengths[-1])
+
 	print()
 
-def export_ai_spawn_points(depsgraph: Depsgraph, graph, file):
+def export_ai_spawn_points(depsgraph: Depsgraph, graph: SceneGraph, file):
 	print("--- AI spawn points ---")
 
-	def compare(w_object: WObject):
-		return w_object.object.kg_type == 'ai_spawn_point'
-	
-	w_objects = util.search_graph_many(graph, compare)
+	w_objects = graph.of_kg_types('ai_spawn_point')
 
 	util.write_u32(file, len(w_objects))
 
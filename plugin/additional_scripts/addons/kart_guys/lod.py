@@ -0,0 +1,278 @@
+import heapq
+import numpy as np
+from . import weld
+
+# Simplified detail levels of the geometries, quadric error edge collapses (Garland & Heckbert) onto existing vertices.
+# Open edges, color seams and the emissive triangles are left alone
+
+# Each level keeps about this fraction of the previous level's triangles
+LEVEL_RATIO = 0.5
+MAX_LEVELS = 3
+
+# A level that doesn't get rid of at least this fraction of the previous level's triangles isn't worth it
+MIN_REDUCTION = 0.1
+
+# A collapse can't turn a triangle further than this from where it was facing, cos of 60 degrees
+MIN_NORMAL_DOT = 0.5
+
+# Corners of the same vertex with colors further apart than this are a color seam
+COLOR_SEAM_TOLERANCE = 1.0 / 255
+
+# The switch distances are where a level's error would be PIXEL_ERROR pixels tall, with the game's 75 degree vertical
+# field of view at 720 pixels high. A level is never switched to closer than MIN_SWITCH_DISTANCE.
+PIXELS_PER_UNIT_AT_1M = 720 / (2 * np.tan(np.radians(75 / 2)))
+PIXEL_ERROR = 1.0
+MIN_SWITCH_DISTANCE = 10.0
+
+class Level:
+	def __init__(self):
+		self.mesh_arrays = None # Only the non emissive triangles
+		self.triangles_count = 0
+		self.error = 0.0 # Largest distance the surface was moved by, roughly
+		self.switch_distance = 0.0
+
+def plane_quadrics(positions, triangles):
+	# Fundamental error quadric of each triangle's plane as the 10 unique coefficients of the symmetric 4x4 matrix:
+	# aa ab ac ad bb bc bd cc cd dd for the plane ax + by + cz + d = 0, (t, 10)
+	positions = np.asarray(positions, dtype=np.float64)
+	a, b, c = positions[triangles[:, 0]], positions[triangles[:, 1]], positions[triangles[:, 2]]
+	normals = np.cross(b - a, c - a)
+	lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+	normals = normals / np.where(lengths > 0, lengths, 1)
+
+	planes = np.concatenate((normals, -(normals * a).sum(axis=1, keepdims=True)), axis=1)
+	rows, columns = np.triu_indices(4)
+	return planes[:, rows] * planes[:, columns]
+
+def quadric_error(q, p):
+	# p^T Q p for the point p = (x, y, z, 1)
+	x, y, z = p
+	return (
+		q[0] * x * x + 2 * q[1] * x * y + 2 * q[2] * x * z + 2 * q[3] * x +
+		q[4] * y * y + 2 * q[5] * y * z + 2 * q[6] * y +
+		q[7] * z * z + 2 * q[8] * z +
+		q[9]
+	)
+
+def cross(a, b):
+	return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+def triangle_normal(a, b, c):
+	return cross((b[0] - a[0], b[1] - a[1], b[2] - a[2]), (c[0] - a[0], c[1] - a[1], c[2] - a[2]))
+
+def locked_vertices(vertices_count, triangles, triangle_loops, corner_colors, emissive_triangles):
+	locked = np.zeros(vertices_count, dtype=bool)
+
+	# Open edges, only used by one triangle
+	edges = np.sort(np.concatenate((triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]])), axis=1)
+	unique_edges, counts = np.unique(edges, axis=0, return_counts=True)
+	locked[unique_edges[counts == 1].reshape(-1)] = True
+
+	# Color seams, the corners of a vertex don't all have the same color
+	if corner_colors is not None:
+		colors = np.asarray(corner_colors, dtype=np.float32).reshape(-1, 4)[triangle_loops.reshape(-1), :3]
+		corner_vertices = triangles.reshape(-1)
+		low = np.full((vertices_count, 3), np.inf, dtype=np.float32)
+		high = np.full((vertices_count, 3), -np.inf, dtype=np.float32)
+		np.minimum.at(low, corner_vertices, colors)
+		np.maximum.at(high, corner_vertices, colors)
+		locked |= ((high - low) > COLOR_SEAM_TOLERANCE).any(axis=1) & np.isfinite(low).all(axis=1)
+
+	# Touching the emissive triangles
+	locked[emissive_triangles.reshape(-1)] = True
+
+	return locked
+
+# The collapses are done one at a time in plain Python, the per call overhead of NumPy is far bigger than the work
+class Simplifier:
+	def __init__(self, positions, triangles, triangle_loops, locked):
+		self.positions = [tuple(p) for p in np.asarray(positions, dtype=np.float64).tolist()]
+		self.triangles = triangles.tolist()
+		self.triangle_loops = triangle_loops.tolist()
+		self.alive = [True] * len(self.triangles)
+		self.triangles_count = len(self.triangles)
+		self.locked = locked.tolist()
+		self.stamps = [0] * len(positions)
+		self.max_error_sq = 0.0
+
+		self.vertex_triangles = [set() for _ in range(len(positions))]
+
+		for t, triangle in enumerate(self.triangles):
+			for v in triangle:
+				self.vertex_triangles[v].add(t)
+
+		quadrics = np.zeros((len(positions), 10))
+
+		for corner in range(3):
+			np.add.at(quadrics, triangles[:, corner], plane_quadrics(positions, triangles))
+
+		self.quadrics = quadrics.tolist()
+		self.heap = []
+
+		for v in range(len(positions)):
+			for u in self.neighbours(v):
+				self.push_collapse(v, u)
+
+	def neighbours(self, v):
+		return {w for t in self.vertex_triangles[v] for w in self.triangles[t] if w != v}
+
+	def push_collapse(self, v, u):
+		# v collapsing onto u
+		if self.locked[v]:
+			return
+
+		q = [a + b for a, b in zip(self.quadrics[v], self.quadrics[u])]
+		cost = max(quadric_error(q, self.positions[u]), 0.0)
+		heapq.heappush(self.heap, (cost, v, u, self.stamps[v], self.stamps[u]))
+
+	def can_collapse(self, v, u):
+		shared = [t for t in self.vertex_triangles[v] if u in self.triangles[t]]
+
+		if not shared:
+			return False
+
+		# Link condition, otherwise the collapse pinches the surface into something that isn't a manifold
+		if len(self.neighbours(v) & self.neighbours(u)) != len(shared):
+			return False
+
+		positions = self.positions
+
+		for t in self.vertex_triangles[v]:
+			if t in shared:
+				continue
+
+			triangle = self.triangles[t]
+			old_normal = triangle_normal(*[positions[w] for w in triangle])
+			new_normal = triangle_normal(*[positions[u if w == v else w] for w in triangle])
+			old_length_sq = sum(n * n for n in old_normal)
+			new_length_sq = sum(n * n for n in new_normal)
+
+			if new_length_sq <= 1e-24 or old_length_sq <= 1e-24:
+				return False
+
+			dot = sum(a * b for a, b in zip(old_normal, new_normal))
+
+			if dot < MIN_NORMAL_DOT * (old_length_sq * new_length_sq) ** 0.5:
+				return False
+
+		return True
+
+	def collapse(self, v, u):
+		# The corners that move onto u take the color of u's corner in one of the triangles that go away
+		shared = [t for t in self.vertex_triangles[v] if u in self.triangles[t]]
+		u_loop = self.triangle_loops[shared[0]][self.triangles[shared[0]].index(u)]
+
+		for t in shared:
+			self.alive[t] = False
+			self.triangles_count -= 1
+
+			for w in self.triangles[t]:
+				self.vertex_triangles[w].discard(t)
+
+		for t in self.vertex_triangles[v]:
+			corner = self.triangles[t].index(v)
+			self.triangles[t][corner] = u
+			self.triangle_loops[t][corner] = u_loop
+			self.vertex_triangles[u].add(t)
+
+		self.vertex_triangles[v] = set()
+		self.quadrics[u] = [a + b for a, b in zip(self.quadrics[u], self.quadrics[v])]
+
+		# Only the collapses that involve u have a new cost, whether the others are still allowed is checked when they're
+		# popped
+		self.stamps[v] += 1
+		self.stamps[u] += 1
+
+		for w in self.neighbours(u):
+			self.push_collapse(u, w)
+			self.push_collapse(w, u)
+
+	def simplify(self, target_triangles_count):
+		while self.triangles_count > target_triangles_count and self.heap:
+			cost, v, u, stamp_v, stamp_u = heapq.heappop(self.heap)
+
+			# Something around v or u has changed since this was pushed, there's a newer entry for it
+			if stamp_v != self.stamps[v] or stamp_u != self.stamps[u]:
+				continue
+
+			if not self.can_collapse(v, u):
+				continue
+
+			self.collapse(v, u)
+			self.max_error_sq = max(self.max_error_sq, cost)
+
+		return self.triangles_count
+
+	def mesh_arrays(self, mesh_arrays: weld.MeshArrays, name: str):
+		alive = [t for t in range(len(self.triangles)) if self.alive[t]]
+		triangles = np.array([self.triangles[t] for t in alive], dtype=np.int32).reshape(-1, 3)
+
+		simplified = weld.MeshArrays()
+		simplified.name = name
+		simplified.vertex_positions = mesh_arrays.vertex_positions
+		simplified.triangle_vertices = triangles.reshape(-1)
+		simplified.triangle_loops = np.array([self.triangle_loops[t] for t in alive], dtype=np.int32).reshape(-1)
+		simplified.corner_colors = mesh_arrays.corner_colors
+
+		# The triangles that moved face a new way
+		positions = np.asarray(mesh_arrays.vertex_positions, dtype=np.float32).reshape(-1, 3)
+		normals = np.cross(positions[triangles[:, 1]] - positions[triangles[:, 0]], positions[triangles[:, 2]] - positions[triangles[:, 0]])
+		lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+		simplified.triangle_normals = (normals / np.where(lengths > 0, lengths, 1)).astype(np.float32)
+
+		return simplified
+
+def lod_center(mesh_arrays: weld.MeshArrays):
+	# The middle of the mesh's bounding box in game space, what the switch distances are measured from. The merged static
+	# batches are drawn with an identity transform so their origin is nowhere near them.
+	positions = np.asarray(mesh_arrays.vertex_positions, dtype=np.float32).reshape(-1, 3)
+	positions = positions[np.asarray(mesh_arrays.triangle_vertices, dtype=np.int64).reshape(-1)]
+
+	if len(positions) == 0:
+		return (0.0, 0.0, 0.0)
+
+	positions = weld.blender_positions_to_game_positions(positions)
+	return tuple(float(v) for v in (positions.min(axis=0) + positions.max(axis=0)) / 2)
+
+def build_levels(mesh_arrays: weld.MeshArrays, max_levels=MAX_LEVELS):
+	# Returns up to max_levels simplified levels, each one built on from the last
+	positions = np.asarray(mesh_arrays.vertex_positions, dtype=np.float32).reshape(-1, 3)
+	triangles = np.asarray(mesh_arrays.triangle_vertices, dtype=np.int64).reshape(-1, 3)
+	triangle_loops = np.asarray(mesh_arrays.triangle_loops, dtype=np.int64).reshape(-1, 3)
+
+	if mesh_arrays.triangle_emissive is None:
+		emissive = np.zeros(len(triangles), dtype=bool)
+	else:
+		emissive = np.asarray(mesh_arrays.triangle_emissive, dtype=bool)
+
+	if max_levels <= 0 or (~emissive).sum() < 16:
+		return []
+
+	locked = locked_vertices(len(positions), triangles[~emissive], triangle_loops[~emissive], mesh_arrays.corner_colors, triangles[emissive])
+	simplifier = Simplifier(positions, triangles[~emissive], triangle_loops[~emissive], locked)
+
+	levels = []
+	previous_count = simplifier.triangles_count
+
+	for i in range(max_levels):
+		count = simplifier.simplify(int(previous_count * LEVEL_RATIO))
+
+		if count > previous_count * (1 - MIN_REDUCTION):
+			break
+
+		level = Level()
+		level.triangles_count = count
+		level.error = float(np.sqrt(simplifier.max_error_sq))
+		level.switch_distance = max(level.error * PIXELS_PER_UNIT_AT_1M / PIXEL_ERROR, MIN_SWITCH_DISTANCE)
+
+		# Good enough from as close as the last level, which would never be drawn then. Small meshes often end up with
+		# every level at MIN_SWITCH_DISTANCE and only keep the last one.
+		if levels and level.switch_distance <= levels[-1].switch_distance:
+			levels.pop()
+
+		level.mesh_arrays = simplifier.mesh_arrays(mesh_arrays, mesh_arrays.name + " LOD" + str(len(levels) + 1))
+		levels.append(level)
+
+		previous_count = count
+
+	return levels
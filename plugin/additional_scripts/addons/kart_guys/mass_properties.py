@@ -0,0 +1,155 @@
+import numpy as np
+
+# Mass, center of mass and principal inertia of the rigid bodies, worked out from their hulls
+
+# A hull of a rigid body in game space, relative to the rigid body like the collision hulls in the game
+class Hull:
+	def __init__(self, kind, position, orientation, scale, convex=None):
+		self.kind = kind # kg_hull_type, 'box', 'cylinder' or 'mesh'
+		self.position = position
+		self.orientation = orientation # x, y, z, w
+		self.scale = scale
+		self.convex = convex # convex_hull.ConvexHull of a 'mesh' hull
+
+class MassProperties:
+	def __init__(self):
+		self.volume = 0.0
+		self.center_of_mass = np.zeros(3, dtype=np.float32) # In body space
+		self.principal_moments = np.zeros(3, dtype=np.float32)
+		self.principal_orientation = np.array([0, 0, 0, 1], dtype=np.float32) # x, y, z, w, turns the principal axes into body space
+
+# Volume, first moment and second moment matrix (integral of p p^T) of the unit shapes the game uses
+def box_moments():
+	# [-1, 1] on every axis
+	return 8.0, np.zeros(3), np.identity(3) * 8.0 / 3.0
+
+def cylinder_moments():
+	# Radius 1 around the y axis, y in [-1, 1]
+	return 2.0 * np.pi, np.zeros(3), np.diag([np.pi / 2.0, 2.0 * np.pi / 3.0, np.pi / 2.0])
+
+def convex_moments(convex):
+	# Sum over the tetrahedra made by joining every face triangle to a point inside the hull
+	vertices = np.asarray(convex.vertices, dtype=np.float64)
+	origin = vertices.mean(axis=0)
+	volume = 0.0
+	first = np.zeros(3)
+	second = np.zeros((3, 3))
+
+	for face in range(len(convex.face_offsets) - 1):
+		loop = convex.face_vertices[convex.face_offsets[face] : convex.face_offsets[face + 1]]
+
+		for i in range(1, len(loop) - 1):
+			tetrahedron = np.array([origin, vertices[loop[0]], vertices[loop[i]], vertices[loop[i + 1]]])
+			tetrahedron_volume = np.linalg.det(tetrahedron[1:] - origin) / 6.0
+			total = tetrahedron.sum(axis=0)
+
+			volume += tetrahedron_volume
+			first += tetrahedron_volume * total / 4.0
+			second += tetrahedron_volume / 20.0 * (tetrahedron.T @ tetrahedron + np.outer(total, total))
+
+	return volume, first, second
+
+def quaternion_to_matrix(q):
+	x, y, z, w = q
+
+	return np.array([
+		[1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+		[2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+		[2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)]
+	])
+
+def matrix_to_quaternion(m):
+	# m is a rotation matrix, returns x, y, z, w
+	trace = m[0, 0] + m[1, 1] + m[2, 2]
+
+	if trace > 0:
+		s = np.sqrt(trace + 1.0) * 2
+		q = ((m[2, 1] - m[1, 2]) / s, (m[0, 2] - m[2, 0]) / s, (m[1, 0] - m[0, 1]) / s, s / 4)
+	elif m[0, 0] > m[1, 1] and m[0, 0] > m[2, 2]:
+		s = np.sqrt(1.0 + m[0, 0] - m[1, 1] - m[2, 2]) * 2
+		q = (s / 4, (m[0, 1] + m[1, 0]) / s, (m[0, 2] + m[2, 0]) / s, (m[2, 1] - m[1, 2]) / s)
+	elif m[1, 1] > m[2, 2]:
+		s = np.sqrt(1.0 + m[1, 1] - m[0, 0] - m[2, 2]) * 2
+		q = ((m[0, 1] + m[1, 0]) / s, s / 4, (m[1, 2] + m[2, 1]) / s, (m[0, 2] - m[2, 0]) / s)
+	else:
+		s = np.sqrt(1.0 + m[2, 2] - m[0, 0] - m[1, 1]) * 2
+		q = ((m[0, 2] + m[2, 0]) / s, (m[1, 2] + m[2, 1]) / s, s / 4, (m[1, 0] - m[0, 1]) / s)
+
+	q = np.array(q)
+	return q / np.linalg.norm(q)
+
+def transform_moments(volume, first, second, matrix, translation):
+	# The moments of the shape after moving every point p to matrix p + translation
+	det = abs(np.linalg.det(matrix))
+	moved_first = matrix @ first
+	moved_second = matrix @ second @ matrix.T + np.outer(moved_first, translation) + np.outer(translation, moved_first) + volume * np.outer(translation, translation)
+
+	return det * volume, det * (moved_first + volume * translation), det * moved_second
+
+def hull_moments(hull: Hull, body_scale):
+	match hull.kind:
+		case 'box':
+			moments = box_moments()
+		case 'cylinder':
+			moments = cylinder_moments()
+		case 'mesh':
+			moments = convex_moments(hull.convex)
+		case _:
+			assert False, "Unknown hull type " + str(hull.kind)
+
+	# The hull's local transform followed by the rigid body's scale, like hull.global_transform in the game without the
+	# rigid body's orientation and position
+	body_scale = np.diag(np.asarray(body_scale, dtype=np.float64))
+	matrix = body_scale @ quaternion_to_matrix(np.asarray(hull.orientation, dtype=np.float64)) @ np.diag(np.asarray(hull.scale, dtype=np.float64))
+	translation = body_scale @ np.asarray(hull.position, dtype=np.float64)
+
+	return transform_moments(*moments, matrix, translation)
+
+def calculate_mass_properties(hulls, body_scale, mass, dimensions):
+	# dimensions is only used when there are no hulls, the game's old box of those dimensions around the origin
+	volume = 0.0
+	first = np.zeros(3)
+	second = np.zeros((3, 3))
+
+	for hull in hulls:
+		hull_volume, hull_first, hull_second = hull_moments(hull, body_scale)
+		volume += hull_volume
+		first += hull_first
+		second += hull_second
+
+	if volume <= 0:
+		half = np.asarray(dimensions, dtype=np.float64) / 2
+		volume, first, second = transform_moments(*box_moments(), np.diag(half), np.zeros(3))
+
+	center_of_mass = first / volume
+
+	# Moved to the center of mass with the parallel axis theorem, then scaled from volume to mass
+	second = (second - volume * np.outer(center_of_mass, center_of_mass)) * (mass / volume)
+	inertia = np.identity(3) * np.trace(second) - second
+
+	moments, axes = np.linalg.eigh(inertia)
+
+	# Line the principal axes up with the body axes they're closest to, so a body that's already lined up gets no rotation
+	remaining = [0, 1, 2]
+	order = []
+
+	for axis in range(3):
+		closest = max(remaining, key=lambda j: abs(axes[axis, j]))
+		remaining.remove(closest)
+		order.append(closest)
+
+	moments = moments[order]
+	axes = axes[:, order]
+	axes *= np.where(np.diag(axes) < 0, -1.0, 1.0)
+
+	# Which can leave a mirrored set of axes, which isn't a rotation
+	if np.linalg.det(axes) < 0:
+		axes[:, 2] = -axes[:, 2]
+
+	properties = MassProperties()
+	properties.volume = volume
+	properties.center_of_mass = center_of_mass.astype(np.float32)
+	properties.principal_moments = np.maximum(moments, 1e-6 * max(moments.max(), 1e-6)).astype(np.float32)
+	properties.principal_orientation = matrix_to_quaternion(axes).astype(np.float32)
+
+	return properties
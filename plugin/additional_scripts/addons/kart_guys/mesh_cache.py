@@ -0,0 +1,135 @@
+import os
+import hashlib
+import pickle
+import numpy as np
+
+# On disk cache of the encoded meshes, keyed on the hash of everything that went into them. Least recently used
+# entries are deleted once it's bigger than max_bytes
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+def hash_parts(*parts):
+	h = hashlib.blake2b(digest_size=20)
+
+	for part in parts:
+		# Tag each part with its type and length so different splits of the same bytes hash differently
+		if part is None:
+			data = b""
+		elif isinstance(part, str):
+			data = part.encode('utf-8')
+		elif isinstance(part, (bytes, bytearray, memoryview)):
+			data = bytes(part)
+		else:
+			array = np.ascontiguousarray(part)
+			h.update(array.dtype.str.encode('ascii') + str(array.shape).encode('ascii'))
+			data = array.tobytes()
+		
+		h.update(type(part).__name__.encode('ascii'))
+		h.update(len(data).to_bytes(8, 'little'))
+		h.update(data)
+	
+	return h.hexdigest()
+
+_source_hash = None
+
+def source_hash():
+	# Hash of every .py file of the exporter, worked out once per process like export_all.py's exporter_hash
+	global _source_hash
+
+	if _source_hash is None:
+		h = hashlib.blake2b(digest_size=20)
+		directory = os.path.dirname(os.path.abspath(__file__))
+
+		for name in sorted(os.listdir(directory)):
+			if name.endswith(".py"):
+				with open(os.path.join(directory, name), 'rb') as file:
+					h.update(name.encode('utf-8'))
+					h.update(hashlib.blake2b(file.read(), digest_size=20).digest())
+		
+		_source_hash = h.hexdigest()
+	
+	return _source_hash
+
+def hash_mesh_arrays(mesh_arrays):
+	return hash_parts(
+		mesh_arrays.vertex_positions,
+		mesh_arrays.triangle_vertices,
+		mesh_arrays.triangle_loops,
+		mesh_arrays.triangle_normals,
+		mesh_arrays.corner_colors,
+		mesh_arrays.triangle_emissive
+	)
+
+class MeshCache:
+	def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+		self.directory = directory
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+
+		os.makedirs(directory, exist_ok=True)
+
+	def entry_path(self, key):
+		return os.path.join(self.directory, key + ".bin")
+
+	def get(self, key):
+		path = self.entry_path(key)
+
+		try:
+			with open(path, 'rb') as file:
+				value = pickle.load(file)
+		except FileNotFoundError:
+			self.misses += 1
+			return None
+		except Exception:
+			# Truncated or otherwise unreadable, unpickling can raise just about anything. Delete it so it's made again
+			print("Deleting unreadable mesh cache entry", path)
+			self.misses += 1
+
+			try:
+				os.remove(path)
+			except OSError:
+				pass
+
+			return None
+
+		os.utime(path)
+		self.hits += 1
+		return value
+
+	def put(self, key, value):
+		path = self.entry_path(key)
+		temp_path = path + ".tmp"
+
+		try:
+			with open(temp_path, 'wb') as file:
+				pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+			
+			os.replace(temp_path, path)
+		finally:
+			if os.path.exists(temp_path):
+				os.remove(temp_path)
+
+	def evict(self):
+		entries = []
+		total_bytes = 0
+
+		for entry in os.scandir(self.directory):
+			# Left behind by an export that was killed in the middle of a put
+			if entry.is_file() and entry.name.endswith(".tmp"):
+				os.remove(entry.path)
+				continue
+
+			if entry.is_file() and entry.name.endswith(".bin"):
+				stat = entry.stat()
+				entries.append((stat.st_mtime, stat.st_size, entry.path))
+				total_bytes += stat.st_size
+		
+		entries.sort()
+
+		for _, size, path in entries:
+			if total_bytes <= self.max_bytes:
+				break
+
+			os.remove(path)
+			total_bytes -= size
@@ -0,0 +1,152 @@
+import collections
+import numpy as np
+
+# Reorders welded meshes for the GPU vertex cache (Forsyth) and then for vertex fetch, what's drawn doesn't change
+
+CACHE_SIZE = 32
+CACHE_DECAY_POWER = 1.5
+LAST_TRIANGLE_SCORE = 0.75
+VALENCE_BOOST_SCALE = 2.0
+VALENCE_BOOST_POWER = 0.5
+
+# Size of the FIFO cache simulated for the ACMR/ATVR stats
+STATS_CACHE_SIZE = 16
+
+def vertex_score(cache_position, remaining_triangles):
+	if remaining_triangles == 0:
+		return -1.0
+
+	score = 0.0
+
+	if cache_position >= 0:
+		if cache_position < 3:
+			# The vertices of the last triangle get a fixed score so the next triangle doesn't just reuse the same edge
+			score = LAST_TRIANGLE_SCORE
+		else:
+			score = (1.0 - (cache_position - 3) / (CACHE_SIZE - 3)) ** CACHE_DECAY_POWER
+
+	# Prefer vertices with few triangles left so they can be finished off and leave the cache
+	return score + VALENCE_BOOST_SCALE * remaining_triangles ** -VALENCE_BOOST_POWER
+
+def optimize_vertex_cache(indices, vertex_count):
+	triangles = np.asarray(indices, dtype=np.int64).reshape(-1, 3).tolist()
+	triangle_count = len(triangles)
+
+	if triangle_count == 0:
+		return np.asarray(indices, dtype=np.uint32)
+
+	vertex_triangles = [set() for _ in range(vertex_count)]
+
+	for triangle_index, triangle in enumerate(triangles):
+		for v in triangle:
+			vertex_triangles[v].add(triangle_index)
+
+	cache_positions = [-1] * vertex_count
+	vertex_scores = [vertex_score(-1, len(t)) for t in vertex_triangles]
+	triangle_scores = [sum(vertex_scores[v] for v in set(triangle)) for triangle in triangles]
+	emitted = [False] * triangle_count
+
+	output = []
+	cache = []
+	best_triangle = max(range(triangle_count), key=triangle_scores.__getitem__)
+	next_unemitted = 0
+
+	while len(output) < triangle_count:
+		if best_triangle < 0:
+			# Nothing in the cache has triangles left, carry on from the next triangle that hasn't been emitted
+			while emitted[next_unemitted]:
+				next_unemitted += 1
+
+			best_triangle = next_unemitted
+
+		triangle = triangles[best_triangle]
+		triangle_vertices = list(dict.fromkeys(triangle))
+		emitted[best_triangle] = True
+		output.append(triangle)
+
+		for v in triangle_vertices:
+			vertex_triangles[v].discard(best_triangle)
+
+		# Move the triangle's vertices to the front of the cache
+		new_cache = triangle_vertices + [v for v in cache if v not in triangle_vertices]
+		evicted = new_cache[CACHE_SIZE:]
+		cache = new_cache[:CACHE_SIZE]
+
+		for v in evicted:
+			cache_positions[v] = -1
+			vertex_scores[v] = vertex_score(-1, len(vertex_triangles[v]))
+
+		for position, v in enumerate(cache):
+			cache_positions[v] = position
+			vertex_scores[v] = vertex_score(position, len(vertex_triangles[v]))
+
+		# Rescore the triangles affected by the cache change and pick the best one that uses a cached vertex
+		best_triangle = -1
+		best_score = -1.0
+
+		for v in evicted:
+			for t in vertex_triangles[v]:
+				triangle_scores[t] = sum(vertex_scores[u] for u in set(triangles[t]))
+
+		for v in cache:
+			for t in vertex_triangles[v]:
+				score = sum(vertex_scores[u] for u in set(triangles[t]))
+				triangle_scores[t] = score
+
+				if score > best_score:
+					best_score = score
+					best_triangle = t
+
+	return np.array(output, dtype=np.uint32).reshape(-1)
+
+def optimize_vertex_fetch(indices, rows):
+	# Renumbers the vertices in the order the indices first use them
+	indices = np.asarray(indices, dtype=np.int64)
+	rows = np.asarray(rows)
+
+	if len(indices) == 0:
+		return indices.astype(np.uint32), rows
+
+	used, first_use = np.unique(indices, return_index=True)
+	order = used[np.argsort(first_use, kind='stable')]
+
+	remap = np.empty(len(rows), dtype=np.int64)
+	remap[order] = np.arange(len(order))
+
+	return remap[indices].astype(np.uint32), rows[order]
+
+def cache_stats(indices, vertex_count, cache_size=STATS_CACHE_SIZE):
+	# Average cache miss ratio (misses per triangle) and average transform to vertex ratio (misses per vertex) of a FIFO
+	# cache. The best possible ATVR is 1.
+	fifo = collections.deque()
+	cached = set()
+	misses = 0
+
+	for v in np.asarray(indices).tolist():
+		if v in cached:
+			continue
+
+		misses += 1
+		fifo.append(v)
+		cached.add(v)
+
+		if len(fifo) > cache_size:
+			cached.remove(fifo.popleft())
+
+	triangle_count = max(len(indices) // 3, 1)
+	return misses / triangle_count, misses / max(vertex_count, 1)
+
+def optimize_mesh(name, indices, rows):
+	# rows is (v, k), one row of attributes per vertex
+	rows = np.asarray(rows)
+
+	if len(indices) == 0:
+		return indices, rows
+
+	acmr_before, atvr_before = cache_stats(indices, len(rows))
+	indices = optimize_vertex_cache(indices, len(rows))
+	indices, rows = optimize_vertex_fetch(indices, rows)
+	acmr_after, atvr_after = cache_stats(indices, len(rows))
+
+	print("%s: ACMR %.3f -> %.3f, ATVR %.3f -> %.3f" % (name, acmr_before, acmr_after, atvr_before, atvr_after))
+	return indices, rows
@@ -0,0 +1,151 @@
+import json
+import time
+import contextlib
+
+# Optional profiling report of an export, DISABLED is handed around when it's off
+
+# How many of the worst offenders the summary lists for each table
+TOP_COUNT = 10
+
+class Timer:
+	# Adds the time between entering and leaving to a stat
+	__slots__ = ('stat', 'start')
+
+	def __init__(self, stat):
+		self.stat = stat
+
+	def __enter__(self):
+		self.start = time.perf_counter()
+		return self
+
+	def __exit__(self, *exception):
+		self.stat['seconds'] += time.perf_counter() - self.start
+		self.stat['calls'] += 1
+
+class Profiler:
+	enabled = True
+
+	def __init__(self):
+		self.start = time.perf_counter()
+		self.sections = {} # name -> { seconds, bytes }, in the order they're written
+		self.current_section = None
+		self.section_start = None
+		self.stages = {} # name -> { seconds, calls }
+		self.items = {} # kind -> list of { name, seconds, bytes, counts... }
+
+	def begin_section(self, name: str):
+		# Called by SectionedFile.begin_section, the section before it ends here
+		self.end_section()
+		self.current_section = self.sections.setdefault(name, { 'seconds': 0.0, 'bytes': 0 })
+		self.section_start = time.perf_counter()
+
+	def end_section(self):
+		if self.current_section is not None:
+			self.current_section['seconds'] += time.perf_counter() - self.section_start
+			self.current_section = None
+
+	def stage(self, name: str):
+		# Times some part of the export, the time adds up over every time it runs
+		stat = self.stages.setdefault(name, { 'seconds': 0.0, 'calls': 0 })
+		return Timer(stat)
+
+	def item(self, kind: str, name: str, seconds: float = 0.0, bytes: int = None, **counts):
+		entry = { 'name': name, 'seconds': seconds }
+
+		if bytes is not None:
+			entry['bytes'] = bytes
+
+		entry.update(counts)
+		self.items.setdefault(kind, []).append(entry)
+
+	def finish(self, file):
+		# Ends the last section and fills in the sizes of the sections of the SectionedFile, before it's saved
+		self.end_section()
+
+		for name, data in file.section_bytes():
+			self.sections.setdefault(name, { 'seconds': 0.0, 'bytes': 0 })['bytes'] += len(data)
+
+	def top_offenders(self, count=TOP_COUNT):
+		def top(entries, key):
+			return sorted((entry for entry in entries if key in entry), key=lambda entry: -entry[key])[:count]
+
+		sections = [dict(stat, name=name) for name, stat in self.sections.items()]
+		stages = [dict(stat, name=name) for name, stat in self.stages.items()]
+		offenders = {
+			'sections_by_seconds': top(sections, 'seconds'),
+			'sections_by_bytes': top(sections, 'bytes'),
+			'stages_by_seconds': top(stages, 'seconds')
+		}
+
+		for kind, entries in self.items.items():
+			offenders[kind + '_by_seconds'] = top(entries, 'seconds')
+
+			if any('bytes' in entry for entry in entries):
+				offenders[kind + '_by_bytes'] = top(entries, 'bytes')
+
+		return offenders
+
+	def report(self, filepath: str, file_bytes: int):
+		return {
+			'file': filepath,
+			'file_bytes': file_bytes,
+			'total_seconds': time.perf_counter() - self.start,
+			'sections': self.sections,
+			'stages': self.stages,
+			'items': self.items,
+			'top_offenders': self.top_offenders()
+		}
+
+	def write_report(self, filepath: str, file_bytes: int):
+		# Writes <filepath>.profile.json and prints the summary
+		report = self.report(filepath, file_bytes)
+
+		with open(filepath + ".profile.json", 'w') as file:
+			json.dump(report, file, indent='\t')
+
+		print_summary(report)
+		print("Wrote profile report", filepath + ".profile.json")
+
+class DisabledProfiler:
+	enabled = False
+
+	def begin_section(self, name: str):
+		pass
+
+	def stage(self, name: str):
+		return NULL_CONTEXT
+
+	def item(self, kind: str, name: str, seconds: float = 0.0, bytes: int = None, **counts):
+		pass
+
+	def finish(self, file):
+		pass
+
+	def write_report(self, filepath: str, file_bytes: int):
+		pass
+
+NULL_CONTEXT = contextlib.nullcontext()
+DISABLED = DisabledProfiler()
+
+def create_profiler(enabled: bool):
+	return Profiler() if enabled else DISABLED
+
+def format_value(value):
+	return "%.4f" % value if isinstance(value, float) else str(value)
+
+def print_summary(report, count=TOP_COUNT):
+	print("--- Profile ---")
+	print("Total %.3f s, %d bytes" % (report['total_seconds'], report['file_bytes']))
+
+	for table, entries in report['top_offenders'].items():
+		if not entries:
+			continue
+
+		print()
+		print(table.replace('_', ' ').capitalize() + ":")
+
+		for entry in entries[:count]:
+			counts = ", ".join(key + " " + format_value(value) for key, value in entry.items() if key not in ('name', 'seconds', 'bytes', 'calls'))
+			print("    %-40s %9.4f s %12s  %s" % (entry['name'][:40], entry['seconds'], str(entry['bytes']) + " bytes" if 'bytes' in entry else "", counts))
+
+	print()
@@ -0,0 +1,635 @@
+import os
+import zlib
+import mmap
+import numpy as np
+from . import binary, container, vertex_format
+
+# Reads the exported files back for inspecting and diffing, sections are parsed lazily from a memory map
+#
+#	python -m kart_guys.reader [--verify] <file> [file ...] (from the addons directory)
+
+# Same as VERSION in level.py, runtime_assets.py and car.py
+LEVEL_VERSION = 22
+RUNTIME_ASSETS_VERSION = 1
+CAR_VERSION = 2
+
+# The hull types in the hull lists, see export_hulls in level.py
+HULL_BOX = 0
+HULL_CYLINDER = 1
+HULL_CONVEX = 4
+
+# Ground_Grid_Triangle, 6 vertex indices (a, b, c and the 3 ghost vertices) followed by the bounds
+GROUND_TRIANGLE = np.dtype([('vertices', '<u4', (6,)), ('bounds_min', '<f4', (3,)), ('bounds_max', '<f4', (3,))])
+
+# A parsed record, the fields are attributes
+class Record:
+	def __init__(self, **fields):
+		self.__dict__.update(fields)
+
+	def __repr__(self):
+		def field(value):
+			if isinstance(value, np.ndarray):
+				return value.dtype.name + str(list(value.shape))
+			elif isinstance(value, list):
+				return "[" + str(len(value)) + " items]"
+
+			return repr(value)
+
+		return "Record(" + ", ".join(name + "=" + field(value) for name, value in self.__dict__.items()) + ")"
+
+class Cursor:
+	# base is where buffer starts in the uncompressed file. With an alignment every array has to start at a multiple of
+	# it in the file, after zero padding.
+	def __init__(self, buffer, section: str, pos=0, alignment=0, base=0):
+		self.buffer = buffer
+		self.section = section
+		self.pos = pos
+		self.alignment = alignment
+		self.base = base
+
+	def unpack(self, format):
+		assert self.pos + format.size <= len(self.buffer), "Ran off the end of the file in section " + self.section
+		values = format.unpack_from(self.buffer, self.pos)
+		self.pos += format.size
+		return values
+
+	def u32(self):
+		return self.unpack(binary.U32)[0]
+
+	def f32(self):
+		return self.unpack(binary.F32)[0]
+
+	def b8(self):
+		return self.unpack(binary.B8)[0]
+
+	def vec3(self):
+		return self.unpack(binary.VEC3)
+
+	def quat(self):
+		return self.unpack(binary.QUAT)
+
+	def pos_ori_scale(self):
+		values = self.unpack(binary.POS_ORI_SCALE)
+		return values[0:3], values[3:7], values[7:10]
+
+	def string(self):
+		length = self.u32()
+		assert self.pos + length <= len(self.buffer), "Ran off the end of the file in section " + self.section
+		value = bytes(self.buffer[self.pos : self.pos + length]).decode('utf-8')
+		self.pos += length
+		return value
+
+	def skip_padding(self):
+		padding = container.align(self.base + self.pos, self.alignment) - self.base - self.pos
+		assert self.pos + padding <= len(self.buffer), "Ran off the end of the file in section " + self.section
+		assert not any(bytes(self.buffer[self.pos : self.pos + padding])), "Padding that isn't zeros in section " + self.section + " at byte " + str(self.pos)
+		self.pos += padding
+
+	def array(self, dtype, count: int, shape=()):
+		# A view of count elements of the given shape, no copy
+		self.skip_padding()
+		dtype = np.dtype(dtype)
+		items = count * int(np.prod(shape, dtype=np.int64))
+		size = items * dtype.itemsize
+		assert self.pos + size <= len(self.buffer), "Ran off the end of the file in section " + self.section
+
+		if items == 0:
+			array = np.empty(0, dtype=dtype)
+		else:
+			array = np.frombuffer(self.buffer, dtype=dtype, count=items, offset=self.pos)
+
+		self.pos += size
+		return array.reshape((count,) + tuple(shape))
+
+	def counted_array(self, dtype, shape=()):
+		# A u32 count followed by that many elements, like binary.write_f32_array and write_u32_array
+		return self.array(dtype, self.u32(), shape)
+
+	def check(self):
+		pos = self.pos
+		value = self.u32()
+		assert value == binary.POSITION_CHECK, "Position check failed in section " + self.section + " at byte " + str(pos) + ", found " + hex(value)
+
+# Shared records
+
+def read_pos_ori_scale_record(cursor: Cursor):
+	position, orientation, scale = cursor.pos_ori_scale()
+	return Record(position=position, orientation=orientation, scale=scale)
+
+def read_indices_attributes(cursor: Cursor, vertex_size: int):
+	# binary.write_indices_attributes, the attributes are reshaped to a row per vertex
+	indices = cursor.counted_array('<u2')
+	attributes = cursor.counted_array('<f4')
+	return indices, attributes.reshape(-1, vertex_size)
+
+def read_vertices(cursor: Cursor, vertex_flags: int, emissive: bool):
+	# The vertices of a chunk, see vertex_format.write_vertices. positions are as stored, quantized ones need
+	# chunk_positions to decode them. normals and colors are None for emissive chunks.
+	vertices = Record(attributes=None, positions=None, normals=None, colors=None, bounds_min=None, bounds_max=None)
+
+	if vertex_flags == vertex_format.FULL:
+		vertices.attributes = cursor.counted_array('<f4').reshape(-1, 3 if emissive else 9)
+		vertices.positions = vertices.attributes[:, 0:3]
+
+		if not emissive:
+			vertices.normals = vertices.attributes[:, 3:6]
+			vertices.colors = vertices.attributes[:, 6:9]
+
+		return vertices
+
+	count = cursor.u32()
+
+	if vertex_flags & vertex_format.QUANTIZED_POSITIONS:
+		vertices.bounds_min = cursor.vec3()
+		vertices.bounds_max = cursor.vec3()
+		vertices.positions = cursor.array('<u2', count, (3,))
+	else:
+		vertices.positions = cursor.array('<f4', count, (3,))
+
+	if emissive:
+		return vertices
+
+	if vertex_flags & vertex_format.COMPACT_NORMALS_COLORS:
+		vertices.normals = cursor.array('<i2', count, (2,))
+		vertices.colors = cursor.array('<u1', count, (4,))
+	else:
+		rest = cursor.array('<f4', count, (6,))
+		vertices.normals = rest[:, 0:3]
+		vertices.colors = rest[:, 3:6]
+
+	return vertices
+
+def read_chunks(cursor: Cursor, vertex_flags: int, emissive: bool):
+	chunks = []
+
+	for _ in range(cursor.u32()):
+		indices = cursor.counted_array('<u2')
+		chunks.append(Record(indices=indices, vertices=read_vertices(cursor, vertex_flags, emissive)))
+
+	return chunks
+
+def chunk_positions(chunk):
+	# The chunk's (n, 3) float32 positions, decoded the same way as the game if they're quantized
+	vertices = chunk.vertices
+
+	if vertices.bounds_min is not None:
+		return vertex_format.dequantize_positions(vertices.bounds_min, vertices.bounds_max, vertices.positions)
+
+	return vertices.positions
+
+def read_convex_hull(cursor: Cursor):
+	return Record(
+		vertices=cursor.counted_array('<f4', (3,)),
+		planes=cursor.counted_array('<f4', (4,)),
+		face_offsets=cursor.counted_array('<u4'),
+		face_vertices=cursor.counted_array('<u4'),
+		adjacency_offsets=cursor.counted_array('<u4'),
+		adjacency=cursor.counted_array('<u4')
+	)
+
+def read_hulls(cursor: Cursor):
+	hulls = []
+
+	for _ in range(cursor.u32()):
+		hull = read_pos_ori_scale_record(cursor)
+		hull.kind = cursor.u32()
+		assert hull.kind in (HULL_BOX, HULL_CYLINDER, HULL_CONVEX), "Unknown hull type " + str(hull.kind) + " in section " + cursor.section
+		hull.convex = read_convex_hull(cursor) if hull.kind == HULL_CONVEX else None
+		hulls.append(hull)
+
+	return hulls
+
+def read_entity(cursor: Cursor):
+	# The name, transform and geometry index every level entity starts with
+	name = cursor.string()
+	entity = read_pos_ori_scale_record(cursor)
+	entity.name = name
+	entity.geometry_index = cursor.u32()
+	return entity
+
+def read_version(cursor: Cursor):
+	return cursor.u32()
+
+def read_toc(cursor: Cursor):
+	# container.toc_bytes
+	toc = Record(alignment=cursor.u32())
+	toc.sections = [Record(name=cursor.string(), offset=cursor.u32(), size=cursor.u32(), crc32=cursor.u32()) for _ in range(cursor.u32())]
+	return toc
+
+# Level sections
+
+def read_spawn_point(cursor: Cursor):
+	return Record(position=cursor.vec3(), orientation=cursor.quat())
+
+def read_ground_collision_mesh(cursor: Cursor):
+	ground = Record(half_size=cursor.f32())
+	cursor.skip_padding()
+	ground.positions = cursor.counted_array('<f4').reshape(-1, 3)
+	ground.triangles = cursor.counted_array(GROUND_TRIANGLE)
+	ground.half_cell_count = cursor.u32()
+	ground.cell_offsets = cursor.counted_array('<u4')
+	ground.cell_triangles = cursor.counted_array('<u4')
+	cursor.check()
+	return ground
+
+def read_geometry(cursor: Cursor, name: str):
+	# Everything after the name, the same bytes encode.encode_geometry makes
+	geometry = Record(name=name, vertex_format=cursor.u32())
+	geometry.chunks = read_chunks(cursor, geometry.vertex_format, False)
+	geometry.emissive_chunks = read_chunks(cursor, geometry.vertex_format, True)
+	geometry.lods = []
+	geometry.lod_center = None
+	lods_count = cursor.u32()
+
+	if lods_count > 0:
+		geometry.lod_center = cursor.vec3()
+
+	for _ in range(lods_count):
+		switch_distance = cursor.f32()
+		geometry.lods.append(Record(switch_distance=switch_distance, chunks=read_chunks(cursor, geometry.vertex_format, False)))
+
+	cursor.check()
+	return geometry
+
+def read_geometries(cursor: Cursor):
+	geometries = []
+
+	for _ in range(cursor.u32()):
+		name = cursor.string()
+		cursor.skip_padding()
+		geometries.append(read_geometry(cursor, name))
+
+	return geometries
+
+def read_inanimate_entities(cursor: Cursor):
+	entities = []
+
+	for _ in range(cursor.u32()):
+		entity = read_entity(cursor)
+		entity.hulls = read_hulls(cursor)
+		cursor.check()
+		entities.append(entity)
+
+	return entities
+
+def read_static_instances(cursor: Cursor):
+	batches = []
+
+	for _ in range(cursor.u32()):
+		geometry_index = cursor.u32()
+		batches.append(Record(geometry_index=geometry_index, transforms=cursor.counted_array('<f4', (10,))))
+
+	cursor.check()
+	return batches
+
+def read_rigid_bodies(cursor: Cursor):
+	islands = []
+
+	for _ in range(cursor.u32()):
+		island = []
+
+		for _ in range(cursor.u32()):
+			body = read_entity(cursor)
+			body.mass = cursor.f32()
+			body.center_of_mass = cursor.vec3()
+			body.principal_moments = cursor.vec3()
+			body.principal_orientation = cursor.quat()
+			body.collision_exclude = cursor.b8()
+			body.status_effect = cursor.u32()
+			body.hulls = read_hulls(cursor)
+			cursor.check()
+			island.append(body)
+
+		islands.append(island)
+
+	return islands
+
+def read_oil_slicks(cursor: Cursor):
+	oil_slicks = []
+
+	for _ in range(cursor.u32()):
+		oil_slick = read_entity(cursor)
+		oil_slick.particles_count = cursor.u32()
+		oil_slick.hull = read_pos_ori_scale_record(cursor)
+		oil_slick.hull.indices, oil_slick.hull.positions = read_indices_attributes(cursor, 3)
+		cursor.check()
+		oil_slicks.append(oil_slick)
+
+	return oil_slicks
+
+def read_hull_entities(cursor: Cursor):
+	# Bumpers and boost jets, an entity and one hull without a type
+	entities = []
+
+	for _ in range(cursor.u32()):
+		entity = read_entity(cursor)
+		entity.hull = read_pos_ori_scale_record(cursor)
+		cursor.check()
+		entities.append(entity)
+
+	return entities
+
+def read_path_table(cursor: Cursor):
+	table = Record(samples_per_curve=cursor.u32())
+	table.lengths = cursor.counted_array('<f4')
+	table.positions = cursor.counted_array('<f4', (3,))
+
+	origin_x = cursor.f32()
+	origin_z = cursor.f32()
+	table.grid = Record(origin=(origin_x, origin_z), cell_size=cursor.f32(), cells_x=cursor.u32(), cells_z=cursor.u32())
+	table.grid.cell_offsets = cursor.counted_array('<u4')
+	table.grid.cell_segments = cursor.counted_array('<u4')
+	return table
+
+def read_ai_paths(cursor: Cursor):
+	# Each curve is 4 control points
+	paths = Record(left=cursor.counted_array('<f4', (4, 3)))
+	paths.right = cursor.counted_array('<f4', (4, 3))
+	paths.left_table = read_path_table(cursor)
+	paths.right_table = read_path_table(cursor)
+	cursor.check()
+	return paths
+
+def read_ai_spawn_points(cursor: Cursor):
+	spawn_points = []
+
+	for _ in range(cursor.u32()):
+		name = cursor.string()
+		spawn_points.append(Record(name=name, position=cursor.vec3(), orientation=cursor.quat()))
+
+	return spawn_points
+
+LEVEL_SECTIONS = [
+	("version", read_version),
+	("toc", read_toc),
+	("spawn_point", read_spawn_point),
+	("ground_collision_mesh", read_ground_collision_mesh),
+	("geometries", read_geometries),
+	("inanimate_entities", read_inanimate_entities),
+	("static_instances", read_static_instances),
+	("rigid_bodies", read_rigid_bodies),
+	("oil_slicks", read_oil_slicks),
+	("bumpers", read_hull_entities),
+	("boost_jets", read_hull_entities),
+	("ai_paths", read_ai_paths),
+	("ai_spawn_points", read_ai_spawn_points)
+]
+
+# Runtime assets sections
+
+def read_shock_barrel_shrapnel(cursor: Cursor):
+	shrapnel = []
+
+	for _ in range(cursor.u32()):
+		indices, attributes = read_indices_attributes(cursor, 9)
+		piece = read_pos_ori_scale_record(cursor)
+		piece.indices = indices
+		piece.attributes = attributes
+		piece.dimensions = cursor.vec3()
+		piece.hull = read_pos_ori_scale_record(cursor)
+		cursor.check()
+		shrapnel.append(piece)
+
+	return shrapnel
+
+def read_runtime_oil_slicks(cursor: Cursor):
+	oil_slicks = []
+
+	for _ in range(cursor.u32()):
+		indices, attributes = read_indices_attributes(cursor, 9)
+		oil_slick = Record(indices=indices, attributes=attributes, hull=read_pos_ori_scale_record(cursor))
+		oil_slick.hull.indices, oil_slick.hull.positions = read_indices_attributes(cursor, 3)
+		cursor.check()
+		oil_slicks.append(oil_slick)
+
+	return oil_slicks
+
+RUNTIME_ASSETS_SECTIONS = [
+	("version", read_version),
+	("shock_barrel_shrapnel", read_shock_barrel_shrapnel),
+	("oil_slicks", read_runtime_oil_slicks)
+]
+
+# Car sections
+
+def read_car_geometry(cursor: Cursor):
+	indices, attributes = read_indices_attributes(cursor, 9)
+	cursor.check()
+	return Record(indices=indices, attributes=attributes)
+
+def read_wheel(cursor: Cursor):
+	indices, attributes = read_indices_attributes(cursor, 9)
+	wheel = Record(indices=indices, attributes=attributes, radius=cursor.f32())
+	cursor.check()
+
+	# The end of the file has a check of its own
+	cursor.check()
+	return wheel
+
+CAR_SECTIONS = [
+	("version", read_version),
+	("geometry", read_car_geometry),
+	("bottom_hull", read_pos_ori_scale_record),
+	("wheel", read_wheel)
+]
+
+# File extension -> (version, sections)
+FORMATS = {
+	'.kgl': (LEVEL_VERSION, LEVEL_SECTIONS),
+	'.kga': (RUNTIME_ASSETS_VERSION, RUNTIME_ASSETS_SECTIONS),
+	'.kgc': (CAR_VERSION, CAR_SECTIONS)
+}
+
+class ExportedFile:
+	# A memory mapped exported file. file.section(name) parses the section the first time and returns the same result
+	# after that. The arrays in the results point into the mapping so they keep it open for as long as they're around.
+	# With verify the CRC32 of each section in the table of contents is checked the first time it's parsed.
+	def __init__(self, filepath: str, version: int, sections, verify=False):
+		self.filepath = filepath
+		self.names = [name for name, _ in sections]
+		self.readers = dict(sections)
+		self.parsed = {}
+		self.verify = verify
+		self.toc = {} # name -> table of contents entry
+		self.alignment = 0
+
+		with open(filepath, 'rb') as file:
+			assert os.fstat(file.fileno()).st_size > 0, filepath + " is empty"
+			self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+		self.data = memoryview(self.mmap)
+
+		# Where each section is. A plain file without a table of contents only says where its first section starts, the
+		# others start where the one before them ended.
+		self.buffers = {}
+		self.starts = { self.names[0]: 0 }
+		self.ends = {}
+		self.compressed = False
+
+		if container.is_container(self.data):
+			container_sections = container.read_sections(self.data)
+			self.compressed = container_sections[0].codec != container.CODEC_NONE if container_sections else False
+
+			if [section.name for section in container_sections] == self.names:
+				for section in container_sections:
+					self.buffers[section.name] = section
+			else:
+				# Recoded from a plain file, its sections don't line up with ours
+				self.data = memoryview(b"".join(section.decode(self.data) for section in container_sections))
+
+		self.version = self.section("version")
+		assert self.version == version, "Required version " + str(version) + " but found " + str(self.version) + " in " + filepath
+
+		if "toc" in self.readers:
+			self.use_toc(self.section("toc"))
+
+	def use_toc(self, toc):
+		names = self.names[self.names.index("toc") + 1 :]
+		assert [entry.name for entry in toc.sections] == names, "The table of contents doesn't list the sections " + ", ".join(names)
+		self.alignment = toc.alignment
+		end = self.ends.get("toc")
+
+		for entry in toc.sections:
+			self.toc[entry.name] = entry
+			assert container.align(entry.offset, self.alignment) == entry.offset, "Section " + entry.name + " isn't aligned to " + str(self.alignment)
+
+			if entry.name in self.buffers:
+				# A container's own sections, the offsets are into the uncompressed file. All but the last one have the
+				# padding up to the next section at their end.
+				size = self.section_size(entry.name)
+				assert entry.size <= size < entry.size + max(self.alignment, 1), "Section " + entry.name + " isn't the size the table of contents says"
+				continue
+
+			# In a plain file the sections tile the file, with zeros between them when they're aligned
+			if end is not None:
+				assert entry.offset == container.align(end, self.alignment), "Section " + entry.name + " doesn't start where the one before it ends"
+				assert not any(bytes(self.data[end : entry.offset])), "Padding that isn't zeros before section " + entry.name
+
+			assert entry.offset + entry.size <= len(self.data), "Section " + entry.name + " runs off the end of the file"
+			self.buffers[entry.name] = self.data[entry.offset : entry.offset + entry.size]
+			end = entry.offset + entry.size
+
+		assert end is None or end == len(self.data), "The file has " + str(len(self.data) - end) + " bytes after its last section"
+
+	def section_buffer(self, name: str):
+		section = self.buffers[name]
+
+		if isinstance(section, container.Section):
+			if section.codec == container.CODEC_NONE:
+				buffer = self.data[section.offset : section.offset + section.size]
+			else:
+				buffer = memoryview(section.decode(self.data))
+
+			self.buffers[name] = buffer
+			return buffer
+
+		return section
+
+	def section(self, name: str):
+		assert name in self.readers, "No section " + name + " in " + self.filepath
+
+		if name in self.parsed:
+			return self.parsed[name]
+
+		if name in self.buffers:
+			buffer = self.section_buffer(name)
+			entry = self.toc.get(name)
+
+			if entry is None:
+				cursor = Cursor(buffer, name)
+			else:
+				buffer = buffer[: entry.size] # Without the padding at the end of a container's section
+				cursor = Cursor(buffer, name, alignment=self.alignment, base=entry.offset)
+
+				if self.verify:
+					assert zlib.crc32(buffer) == entry.crc32, "Checksum failed in section " + name
+
+			self.parsed[name] = self.readers[name](cursor)
+			left_over = bytes(buffer[cursor.pos :])
+
+			# Only the table of contents of a container can have padding left, the sections after it start aligned
+			if name == "toc":
+				assert len(left_over) < max(self.parsed[name].alignment, 1) and not any(left_over), "Section toc has " + str(len(left_over)) + " bytes left over"
+			else:
+				assert not left_over, "Section " + name + " has " + str(len(left_over)) + " bytes left over"
+
+			return self.parsed[name]
+
+		# The sections before this one have to be parsed to find where it starts
+		for earlier in self.names[: self.names.index(name) + 1]:
+			if earlier in self.parsed:
+				continue
+
+			cursor = Cursor(self.data, earlier, self.starts[earlier])
+			self.parsed[earlier] = self.readers[earlier](cursor)
+			i = self.names.index(earlier)
+
+			if i + 1 < len(self.names):
+				self.starts[self.names[i + 1]] = cursor.pos
+			else:
+				assert cursor.pos == len(self.data), "The file has " + str(len(self.data) - cursor.pos) + " bytes left over"
+
+			self.ends[earlier] = cursor.pos
+
+		return self.parsed[name]
+
+	def section_size(self, name: str):
+		# Uncompressed size in bytes, parses the sections up to it in a plain file
+		if name in self.buffers:
+			section = self.buffers[name]
+			return section.size if isinstance(section, container.Section) else len(section)
+
+		self.section(name)
+		return self.ends[name] - self.starts[name]
+
+	def read_all(self):
+		# Parses every section, which validates all the position checks. Returns name -> result.
+		return { name: self.section(name) for name in self.names }
+
+def open_file(filepath: str, verify=False):
+	# Picks the format from the extension
+	extension = os.path.splitext(filepath)[1].lower()
+	assert extension in FORMATS, "Don't know how to read " + filepath
+	version, sections = FORMATS[extension]
+	return ExportedFile(filepath, version, sections, verify)
+
+def read_level(filepath: str, verify=False):
+	return ExportedFile(filepath, LEVEL_VERSION, LEVEL_SECTIONS, verify)
+
+def read_runtime_assets(filepath: str):
+	return ExportedFile(filepath, RUNTIME_ASSETS_VERSION, RUNTIME_ASSETS_SECTIONS)
+
+def read_car(filepath: str):
+	return ExportedFile(filepath, CAR_VERSION, CAR_SECTIONS)
+
+def summary(value):
+	# A line about a section's result
+	if isinstance(value, list):
+		return str(len(value)) + " items"
+	elif isinstance(value, Record):
+		return ", ".join(name + " " + (str(len(field)) if isinstance(field, (np.ndarray, list)) else str(field)) for name, field in value.__dict__.items() if not isinstance(field, Record))
+
+	return str(value)
+
+if __name__ == '__main__':
+	import sys
+	import time
+
+	verify = "--verify" in sys.argv[1:]
+
+	for filepath in [argument for argument in sys.argv[1:] if argument != "--verify"]:
+		start = time.perf_counter()
+		file = open_file(filepath, verify)
+		sections = file.read_all()
+		parse_time = time.perf_counter() - start
+
+		print(filepath + ":", "version", file.version, "compressed" if file.compressed else "", "parsed in %.1f ms" % (parse_time * 1000))
+
+		for name in file.names:
+			print("    %-24s %10d bytes  %s" % (name, file.section_size(name), summary(sections[name])))
+
+		if 'geometries' in sections:
+			geometries = sections['geometries']
+			triangles = sum(len(chunk.indices) // 3 for geometry in geometries for chunk in geometry.chunks + geometry.emissive_chunks)
+			vertices = sum(len(chunk.vertices.positions) for geometry in geometries for chunk in geometry.chunks + geometry.emissive_chunks)
+			print("    geometry triangles:", triangles, "vertices:", vertices)
@@ -1,37 +1,52 @@
+import os
 from bpy.types import Context, Depsgraph
-from . import util
-from .util import WObject
+from . import util, container, profiling
+from .util import SceneGraph
 
 VERSION = 1
 
+# Everything export reads off the operator, see level.ExportOptions
+class ExportOptions:
+	def __init__(self, filepath, **options):
+		self.filepath = filepath
+		self.compression = 'none'
+		self.profile = False
+
+		for name, value in options.items():
+			assert hasattr(self, name), "Unknown runtime assets export option " + name
+			setattr(self, name, value)
+
 def export(operator, context: Context):
 	depsgraph: Depsgraph = context.evaluated_depsgraph_get()
 	graph = util.create_scene_graph(depsgraph)
 	util.print_graph(graph, 1)
-	file = open(operator.filepath, 'wb')
+	profiler = profiling.create_profiler(operator.profile)
+	file = container.SectionedFile(profiler)
 
+	file.begin_section("version")
 	util.write_u32(file, VERSION)
 
+	file.begin_section("shock_barrel_shrapnel")
 	export_shock_barrel_shrapnel(depsgraph, graph, file)
+	file.begin_section("oil_slicks")
 	export_oil_slicks(depsgraph, graph, file)
 
-	file.close()
+	profiler.finish(file)
+
+	with profiler.stage("save"):
+		file.save(operator.filepath, container.CODECS[operator.compression])
+
 	print("Exported", operator.filepath)
+	profiler.write_report(operator.filepath, os.path.getsize(operator.filepath))
 	return {'FINISHED'}
 
-def export_shock_barrel_shrapnel(depsgraph: Depsgraph, graph, file):
+def export_shock_barrel_shrapnel(depsgraph: Depsgraph, graph: SceneGraph, file):
 	print("--- Shock barrel shrapnel ---")
 
-	w_objects = []
-	to_visit = graph.copy()
-
-	while to_visit:
-		w_object: WObject = to_visit.pop(0)
-		to_visit.extend(w_object.children_w_objects)
+	w_objects = graph.of_kg_rta_type('shock_barrel_shrapnel')
 
-		if w_object.object.kg_rta_type == 'shock_barrel_shrapnel':
-			print(w_object.unique_name)
-			w_objects.append(w_object)
+	for w_object in w_objects:
+		print(w_object.unique_name)
 	
 	print()
 	util.write_u32(file, len(w_objects))
@@ -45,12 +60,8 @@ def export_shock_barrel_shrapnel(depsgraph: Depsgraph, graph, file):
 		game_dimensions = util.blender_scale_to_game_scale(object.dimensions)
 		util.write_vec3(file, game_dimensions)
 
-		hull_w_object = None
-
-		for child_w_object in w_object.children_w_objects:
-			if child_w_object.object.kg_rta_type == 'hull':
-				hull_w_object = child_w_object
-		
+		# The last hull child
+		hull_w_object = w_object.rta_hull_w_objects[-1] if w_object.rta_hull_w_objects else None
 		assert(hull_w_object is not None)
 
 		hull_object = hull_w_object.object
@@ -58,19 +69,13 @@ def export_shock_barrel_shrapnel(depsgraph: Depsgraph, graph, file):
 
 		util.write_cursor_check(file)
 
-def export_oil_slicks(depsgraph: Depsgraph, graph, file):
+def export_oil_slicks(depsgraph: Depsgraph, graph: SceneGraph, file):
 	print("--- Oil slicks ---")
 
-	w_objects = []
-	to_visit = graph.copy()
-
-	while to_visit:
-		w_object: WObject = to_visit.pop(0)
-		to_visit.extend(w_object.children_w_objects)
+	w_objects = graph.of_kg_rta_type('oil_slick')
 
-		if w_object.object.kg_rta_type == 'oil_slick':
-			print(w_object.unique_name)
-			w_objects.append(w_object)
+	for w_object in w_objects:
+		print(w_object.unique_name)
 	
 	print()
 	util.write_u32(file, len(w_objects))
@@ -80,12 +85,8 @@ def export_oil_slicks(depsgraph: Depsgraph, graph, file):
 		indices, attributes = util.calculate_indices_local_positions_normals_colors(depsgraph, object)
 		util.write_indices_attributes(file, indices, attributes)
 
-		hull_w_object = None
-
-		for child_w_object in w_object.children_w_objects:
-			if child_w_object.object.kg_rta_type == 'hull':
-				hull_w_object = child_w_object
-		
+		# The last hull child
+		hull_w_object = w_object.rta_hull_w_objects[-1] if w_object.rta_hull_w_objects else None
 		assert(hull_w_object is not None)
 
 		hull_object = hull_w_object.object
@@ -0,0 +1,195 @@
+import collections
+import heapq
+
+# The scene graph the exporters walk, with the collection instances expanded and an index by kg_type
+
+# Shared by every w_object that has no children or hulls, a list is only made for the ones that do
+NO_W_OBJECTS = ()
+
+# Collection instanced tracks can have a huge number of these so they're kept small: slots instead of a dict, no empty
+# lists, and the unique name and final world matrix are only worked out when they're asked for.
+class WObject:
+	__slots__ = (
+		'depth',
+		'parent_w_object',
+		'object',
+		'children_w_objects',
+		'instance_w_object',
+		'bfs_index', # Position in SceneGraph.w_objects
+		'island_w_object', # Outermost rigid body island this is inside of, if any
+		'hull_w_objects', # Children with kg_type 'hull'
+		'rta_hull_w_objects', # Children with kg_rta_type 'hull'
+		'_unique_name',
+		'_final_world_matrix'
+	)
+
+	def __init__(self):
+		self.depth: int = None
+		self.parent_w_object: WObject = None
+		self.object = None
+		self.children_w_objects = NO_W_OBJECTS
+		self.instance_w_object: WObject = None
+		self.bfs_index: int = None
+		self.island_w_object: WObject = None
+		self.hull_w_objects = NO_W_OBJECTS
+		self.rta_hull_w_objects = NO_W_OBJECTS
+		self._unique_name = None
+		self._final_world_matrix = None
+
+	@property
+	def unique_name(self):
+		if self._unique_name is None:
+			if self.instance_w_object is None:
+				self._unique_name = self.object.name_full
+			else:
+				self._unique_name = self.instance_w_object.object.name_full + " -> " + self.object.name_full
+
+		return self._unique_name
+
+	@property
+	def final_world_matrix(self):
+		if self._final_world_matrix is None:
+			if self.instance_w_object is None:
+				self._final_world_matrix = self.object.matrix_world
+			else:
+				self._final_world_matrix = self.instance_w_object.final_world_matrix @ self.object.matrix_world
+
+		return self._final_world_matrix
+
+class SceneGraph:
+	def __init__(self):
+		self.roots = []
+		self.w_objects = [] # Every w_object in breadth first order, the order the exporters have always used
+		self.by_kg_type = {} # kg_type -> w_objects in breadth first order
+		self.by_kg_rta_type = {} # kg_rta_type -> w_objects in breadth first order
+		self.by_name = {} # Object name -> first w_object with it in breadth first order, instancing reuses names
+		self.by_unique_name = None # Made on first use, see find_unique_name
+		self.island_rigid_bodies = {} # Outermost rigid body island -> the rigid bodies inside it in breadth first order
+
+	def of_kg_types(self, *kg_types):
+		# The w_objects with any of the kg_types, still in breadth first order
+		lists = [self.by_kg_type.get(kg_type, []) for kg_type in kg_types]
+
+		if len(lists) == 1:
+			return list(lists[0])
+
+		return list(heapq.merge(*lists, key=lambda w_object: w_object.bfs_index))
+
+	def first_of_kg_type(self, kg_type):
+		w_objects = self.by_kg_type.get(kg_type)
+		return w_objects[0] if w_objects else None
+
+	def of_kg_rta_type(self, kg_rta_type):
+		return list(self.by_kg_rta_type.get(kg_rta_type, []))
+
+	def find_unique_name(self, unique_name):
+		if self.by_unique_name is None:
+			self.by_unique_name = {}
+
+			for w_object in self.w_objects:
+				self.by_unique_name.setdefault(w_object.unique_name, w_object)
+
+		return self.by_unique_name.get(unique_name)
+
+	def islands(self):
+		# Rigid body islands that aren't inside another island
+		return [w_object for w_object in self.by_kg_type.get('rigid_body_island', []) if w_object.island_w_object is None]
+
+def create_scene_graph(depsgraph):
+	graph = SceneGraph()
+
+	# Find root nodes
+	for object in depsgraph.scene.objects:
+		if object.kg_shared_ignore:
+			continue
+
+		if object.parent is None:
+			root_w_object = WObject()
+			root_w_object.depth = 0
+			root_w_object.object = object
+			graph.roots.append(root_w_object)
+
+	# Process root nodes to find the rest of the graph
+	w_objects_to_process = graph.roots.copy()
+
+	while w_objects_to_process:
+		w_object: WObject = w_objects_to_process.pop()
+		object = w_object.object
+
+		# Find the children of this object
+		child_objects = None
+		instance_collection = object.instance_collection
+
+		if instance_collection is None:
+			child_objects = object.children
+		else:
+			child_objects = []
+
+			for child_object in instance_collection.objects:
+				if child_object.parent is None:
+					child_objects.append(child_object)
+
+		# Add each child to the graph
+		for child_object in child_objects:
+			if child_object.kg_shared_ignore:
+					continue
+
+			child_w_object: WObject = WObject()
+			child_w_object.depth = w_object.depth + 1
+			child_w_object.parent_w_object = w_object
+			child_w_object.object = child_object
+
+			if instance_collection is None:
+				child_w_object.instance_w_object = w_object.instance_w_object
+			else:
+				child_w_object.instance_w_object = w_object
+
+			if not w_object.children_w_objects:
+				w_object.children_w_objects = []
+
+			w_object.children_w_objects.append(child_w_object)
+			w_objects_to_process.append(child_w_object)
+
+	index_scene_graph(graph)
+	return graph
+
+def index_scene_graph(graph: SceneGraph):
+	# One breadth first pass over the graph that fills in the index
+	to_visit = collections.deque(graph.roots)
+
+	while to_visit:
+		w_object: WObject = to_visit.popleft()
+		to_visit.extend(w_object.children_w_objects)
+		object = w_object.object
+
+		w_object.bfs_index = len(graph.w_objects)
+		graph.w_objects.append(w_object)
+
+		kg_type = object.kg_type
+		kg_rta_type = object.kg_rta_type
+		graph.by_kg_type.setdefault(kg_type, []).append(w_object)
+		graph.by_kg_rta_type.setdefault(kg_rta_type, []).append(w_object)
+		graph.by_name.setdefault(object.name, w_object)
+
+		parent_w_object = w_object.parent_w_object
+
+		if parent_w_object is not None:
+			if kg_type == 'hull':
+				if not parent_w_object.hull_w_objects:
+					parent_w_object.hull_w_objects = []
+
+				parent_w_object.hull_w_objects.append(w_object)
+
+			if kg_rta_type == 'hull':
+				if not parent_w_object.rta_hull_w_objects:
+					parent_w_object.rta_hull_w_objects = []
+
+				parent_w_object.rta_hull_w_objects.append(w_object)
+
+			if parent_w_object.island_w_object is not None:
+				w_object.island_w_object = parent_w_object.island_w_object
+			elif parent_w_object.object.kg_type == 'rigid_body_island':
+				w_object.island_w_object = parent_w_object
+
+		if kg_type == 'rigid_body' and w_object.island_w_object is not None:
+			graph.island_rigid_bodies.setdefault(w_object.island_w_object, []).append(w_object)
@@ -1,84 +1,17 @@
-import struct
+import numpy as np
 import bpy
 from bpy.types import Depsgraph, Object, Mesh
-
-class WObject:
-	def __init__(self):
-		self.depth: int = None
-		self.parent_w_object: WObject = None
-		self.object: Object = None
-		self.children_w_objects = []
-		self.instance_w_object: WObject = None
-		self.unique_name = None
-		self.final_world_matrix = None
-
-def create_scene_graph(depsgraph: Depsgraph):
-	graph = []
-
-	# Find root nodes
-	for object in depsgraph.scene.objects:
-		if object.kg_shared_ignore:
-			continue
-
-		if object.parent is None:
-			root_w_object = WObject()
-			root_w_object.depth = 0
-			root_w_object.object = object
-			root_w_object.unique_name = object.name_full
-			root_w_object.final_world_matrix = object.matrix_world
-			graph.append(root_w_object)
-	
-	# Process root nodes to find the rest of the graph
-	w_objects_to_process = graph.copy()
-
-	while w_objects_to_process:
-		w_object: WObject = w_objects_to_process.pop()
-		object = w_object.object
-
-		# Find the children of this object
-		child_objects = None
-		instance_collection = object.instance_collection
-
-		if instance_collection is None:
-			child_objects = object.children
-		else:
-			child_objects = []
-
-			for child_object in instance_collection.objects:
-				if child_object.parent is None:
-					child_objects.append(child_object)
-
-		# Add each child to the graph
-		for child_object in child_objects:
-			if child_object.kg_shared_ignore:
-					continue
-			
-			child_w_object: WObject = WObject()
-			child_w_object.depth = w_object.depth + 1
-			child_w_object.parent_w_object = w_object
-			child_w_object.object = child_object
-
-			if instance_collection is None:
-				child_w_object.instance_w_object = w_object.instance_w_object
-			else:
-				child_w_object.instance_w_object = w_object
-			
-			if child_w_object.instance_w_object is None:
-				child_w_object.unique_name = child_object.name_full
-				child_w_object.final_world_matrix = child_object.matrix_world
-			else:
-				child_w_object.unique_name = child_w_object.instance_w_object.object.name_full + " -> " + child_object.name_full
-				child_w_object.final_world_matrix = child_w_object.instance_w_object.final_world_matrix @ child_object.matrix_world
-
-			w_object.children_w_objects.append(child_w_object)
-			w_objects_to_process.append(child_w_object)
-	
-	return graph
+from . import weld
+from .scene_graph import WObject, SceneGraph, create_scene_graph
+from .binary import (
+	write_b8, write_u16, write_u32, write_f32, write_string, write_cursor_check, write_vec3, write_quat, write_pos_ori_scale,
+	write_indices_attributes, write_f32_array, write_padding
+)
 
 # properties: 0 for level, 1 for runtime assets
-def print_graph(graph, properties: int):
+def print_graph(graph: SceneGraph, properties: int):
 	print("--- Graph ---")
-	to_visit = graph.copy()
+	to_visit = graph.roots.copy()
 
 	while to_visit:
 		w_object: WObject = to_visit.pop()
@@ -99,9 +32,9 @@ def print_graph(graph, properties: int):
 	
 	print()
 
-def debug_export_graph(graph, filepath):
+def debug_export_graph(graph: SceneGraph, filepath):
 	file = open(filepath + ".txt", 'w')
-	to_visit = graph.copy()
+	to_visit = graph.roots.copy()
 
 	while to_visit:
 		w_object: WObject = to_visit.pop()
@@ -114,32 +47,17 @@ def debug_export_graph(graph, filepath):
 
 	file.close()
 
-def search_graph_one(graph, func):
-	w_object = None
-	to_visit = graph.copy()
-
-	while to_visit:
-		current_w_object: WObject = to_visit.pop(0)
-		to_visit.extend(current_w_object.children_w_objects)
-
-		if func(current_w_object):
-			w_object = current_w_object
-			break
-	
-	return w_object
-
-def search_graph_many(graph, func):
-	w_objects = []
-	to_visit = graph.copy()
+# The searches go through the w_objects in breadth first order. Prefer the index in SceneGraph when looking for a
+# kg_type or name.
+def search_graph_one(graph: SceneGraph, func):
+	for w_object in graph.w_objects:
+		if func(w_object):
+			return w_object
 
-	while to_visit:
-		w_object: WObject = to_visit.pop(0)
-		to_visit.extend(w_object.children_w_objects)
+	return None
 
-		if func(w_object):
-			w_objects.append(w_object)
-	
-	return w_objects
+def search_graph_many(graph: SceneGraph, func):
+	return [w_object for w_object in graph.w_objects if func(w_object)]
 
 def blender_position_to_game_position(pos):
 	return (pos[0], pos[2], -pos[1])
@@ -150,204 +68,87 @@ def blender_orientation_to_game_orientation(ori):
 def blender_scale_to_game_scale(scale):
 	return (scale[0], scale[2], scale[1])
 
-def write_b8(file, v):
-	file.write(struct.pack("<?", v))
-
-def write_u16(file, v):
-	file.write(struct.pack("<H", v))
-
-def write_u32(file, v):
-	file.write(struct.pack("<I", v))
-
-def write_f32(file, v):
-	file.write(struct.pack("<f", v))
-
-def write_string(file, v):
-	s = bytes(v, 'utf-8')
-	file.write(struct.pack("<I%ds" % len(s), len(s), s))
-
-def write_cursor_check(file):
-	file.write(struct.pack("<I", 0b10101010_10101010_10101010_10101010))
-
-def write_vec3(file, vec):
-	write_f32(file, vec[0])
-	write_f32(file, vec[1])
-	write_f32(file, vec[2])
-
-def write_quat(file, quat):
-	write_f32(file, quat[0])
-	write_f32(file, quat[1])
-	write_f32(file, quat[2])
-	write_f32(file, quat[3])
-
 def write_game_pos_ori_scale_from_blender_matrix(file, matrix):
 	game_pos = blender_position_to_game_position(matrix.to_translation())
 	game_ori = blender_orientation_to_game_orientation(matrix.to_quaternion())
 	game_scale = blender_scale_to_game_scale(matrix.to_scale())
 
-	write_vec3(file, game_pos)
-	write_quat(file, game_ori)
-	write_vec3(file, game_scale)
-
-def write_indices_attributes(file, indices, attributes):
-	write_u32(file, len(indices))
-
-	for index in indices:
-		write_u16(file, index)
-	
-	write_u32(file, len(attributes))
+	write_pos_ori_scale(file, game_pos, game_ori, game_scale)
 
-	for attribute in attributes:
-		write_f32(file, attribute)
-
-def calculate_indices_global_positions(matrix, depsgraph: Depsgraph, object: Object):
+# Pulls everything the exporters need out of the evaluated mesh with foreach_get, which is far faster than walking
+# loop_triangles in Python. The welding itself is done on the arrays in weld.py.
+def extract_mesh_arrays(depsgraph: Depsgraph, object: Object, colors: bool):
 	eval_object = object.evaluated_get(depsgraph)
 	eval_mesh: Mesh = bpy.data.meshes.new_from_object(eval_object)
 	eval_mesh.calc_loop_triangles()
 
-	vertex_map = {}
-	next_index = 0
-	indices = []
+	mesh_arrays = weld.MeshArrays()
+	mesh_arrays.name = eval_mesh.name_full
 
-	for triangle in eval_mesh.loop_triangles:
-		for i in range(3):
-			vertex_index = triangle.vertices[i]
-			vertex = matrix @ eval_mesh.vertices[vertex_index].co
-			vertex_game = blender_position_to_game_position(vertex)
+	vertices_count = len(eval_mesh.vertices)
+	triangles_count = len(eval_mesh.loop_triangles)
 
-			if vertex_game in vertex_map:
-				index = vertex_map[vertex_game]
-				indices.append(index)
-			else:
-				vertex_map[vertex_game] = next_index
-				indices.append(next_index)
-				next_index += 1
-	
-	positions = []
-
-	for vertex in vertex_map.keys():
-		for coord in vertex:
-			positions.append(coord)
-	
-	return indices, positions
-
-def calculate_indices_local_positions(depsgraph: Depsgraph, object: Object):
-	eval_object = object.evaluated_get(depsgraph)
-	eval_mesh: Mesh = bpy.data.meshes.new_from_object(eval_object)
-	eval_mesh.calc_loop_triangles()
+	mesh_arrays.vertex_positions = np.empty(vertices_count * 3, dtype=np.float32)
+	eval_mesh.vertices.foreach_get("co", mesh_arrays.vertex_positions)
+	mesh_arrays.vertex_positions.shape = (vertices_count, 3)
 
-	vertex_map = {}
-	next_index = 0
-	indices = []
+	mesh_arrays.triangle_vertices = np.empty(triangles_count * 3, dtype=np.int32)
+	eval_mesh.loop_triangles.foreach_get("vertices", mesh_arrays.triangle_vertices)
 
-	for triangle in eval_mesh.loop_triangles:
-		for i in range(3):
-			vertex_index = triangle.vertices[i]
-			vertex = eval_mesh.vertices[vertex_index].co
-			vertex_game = blender_position_to_game_position(vertex)
+	if not colors:
+		return mesh_arrays
 
-			if vertex_game in vertex_map:
-				index = vertex_map[vertex_game]
-				indices.append(index)
-			else:
-				vertex_map[vertex_game] = next_index
-				indices.append(next_index)
-				next_index += 1
-	
-	positions = []
+	mesh_arrays.triangle_loops = np.empty(triangles_count * 3, dtype=np.int32)
+	eval_mesh.loop_triangles.foreach_get("loops", mesh_arrays.triangle_loops)
 
-	for vertex in vertex_map.keys():
-		for coord in vertex:
-			positions.append(coord)
-	
-	return indices, positions
+	mesh_arrays.triangle_normals = np.empty(triangles_count * 3, dtype=np.float32)
+	eval_mesh.loop_triangles.foreach_get("normal", mesh_arrays.triangle_normals)
+	mesh_arrays.triangle_normals.shape = (triangles_count, 3)
 
-def calculate_indices_local_positions_normals_colors_new_2(depsgraph: Depsgraph, object: Object):
-	print(object.name_full)
-	eval_object = object.evaluated_get(depsgraph)
-	eval_mesh: Mesh = bpy.data.meshes.new_from_object(eval_object)
-	eval_mesh.calc_loop_triangles()
+	color_attribute = eval_mesh.color_attributes.active_color
+	if color_attribute is not None:
+		assert color_attribute.domain == 'CORNER', "Cannot export vertex colors of color attribute " + color_attribute.name + " for mesh " + eval_mesh.name_full + " because it is not a face corner color attribute"
 
-	emissive_attribute = None
+		mesh_arrays.corner_colors = np.empty(len(color_attribute.data) * 4, dtype=np.float32)
+		color_attribute.data.foreach_get("color", mesh_arrays.corner_colors)
+		mesh_arrays.corner_colors.shape = (len(color_attribute.data), 4)
 
 	for attribute in eval_mesh.attributes:
 		if attribute.name == "kg_emissive":
 			assert attribute.domain == 'FACE'
 			assert attribute.data_type == 'BOOLEAN'
 
-			emissive_attribute = attribute
-			break
-	
-	vertex_colors = None
-	color_attribute = eval_mesh.color_attributes.active_color
-	if color_attribute is not None:
-		assert color_attribute.domain == 'CORNER', "Cannot export vertex colors of color attribute " + color_attribute.name + " for mesh " + eval_mesh.name_full + " because it is not a face corner color attribute"
+			face_emissive = np.empty(len(attribute.data), dtype=bool)
+			attribute.data.foreach_get("value", face_emissive)
 
-		vertex_colors = color_attribute.data
-	
-	emissive_vertex_map = {}
-	emissive_next_index = 0
-	emissive_indices = []
+			triangle_polygons = np.empty(triangles_count, dtype=np.int32)
+			eval_mesh.loop_triangles.foreach_get("polygon_index", triangle_polygons)
 
-	non_emissive_vertex_map = {}
-	non_emissive_next_index = 0
-	non_emissive_indices = []
-	
-	for triangle in eval_mesh.loop_triangles:
-		emissive = False
-
-		if emissive_attribute is not None:
-			face_index = triangle.polygon_index
-			emissive = emissive_attribute.data[face_index].value
-
-		norm = triangle.normal
-		norm_game = [norm[0], norm[2], -norm[1]]
-
-		for i in range(3):
-			vertex_index = triangle.vertices[i]
-			vertex = eval_mesh.vertices[vertex_index]
-			pos = vertex.co
-			pos_game = [pos[0], pos[2], -pos[1]]
-
-			if emissive:
-				v = (pos_game[0], pos_game[1], pos_game[2])
-
-				if v in emissive_vertex_map:
-					index = emissive_vertex_map[v]
-					emissive_indices.append(index)
-				else:
-					emissive_vertex_map[v] = emissive_next_index
-					emissive_indices.append(emissive_next_index)
-					emissive_next_index += 1
-				
-			else:
-				col = [0.2, 0.2, 0.2]
-				if vertex_colors is not None:
-					col_index = triangle.loops[i]
-					col = vertex_colors[col_index].color
-
-				v = (pos_game[0], pos_game[1], pos_game[2], norm_game[0], norm_game[1], norm_game[2], col[0], col[1], col[2])
+			mesh_arrays.triangle_emissive = face_emissive[triangle_polygons]
+			break
 
-				if v in non_emissive_vertex_map:
-					index = non_emissive_vertex_map[v]
-					non_emissive_indices.append(index)
-				else:
-					non_emissive_vertex_map[v] = non_emissive_next_index
-					non_emissive_indices.append(non_emissive_next_index)
-					non_emissive_next_index += 1
+	return mesh_arrays
 
-	emissive_attributes = []
-	non_emissive_attributes = []
+def calculate_indices_global_positions(matrix, depsgraph: Depsgraph, object: Object):
+	mesh_arrays = extract_mesh_arrays(depsgraph, object, False)
+	return weld.weld_positions(mesh_arrays.vertex_positions, mesh_arrays.triangle_vertices, matrix)
 
-	for v in emissive_vertex_map.keys():
-		for attribute in v:
-			emissive_attributes.append(attribute)
+def calculate_indices_local_positions(depsgraph: Depsgraph, object: Object):
+	mesh_arrays = extract_mesh_arrays(depsgraph, object, False)
+	return weld.weld_positions(mesh_arrays.vertex_positions, mesh_arrays.triangle_vertices)
 
-	for v in non_emissive_vertex_map.keys():
-		for attribute in v:
-			non_emissive_attributes.append(attribute)
+def calculate_indices_local_positions_normals_colors_new_2(depsgraph: Depsgraph, object: Object):
+	print(object.name_full)
+	mesh_arrays = extract_mesh_arrays(depsgraph, object, True)
 
-	return non_emissive_indices, non_emissive_attributes, emissive_indices, emissive_attributes
+	return weld.weld_positions_normals_colors(
+		mesh_arrays.vertex_positions,
+		mesh_arrays.triangle_vertices,
+		mesh_arrays.triangle_loops,
+		mesh_arrays.triangle_normals,
+		mesh_arrays.corner_colors,
+		mesh_arrays.triangle_emissive
+	)
 
 def calculate_indices_local_positions_normals_colors_new(depsgraph: Depsgraph, object: Object):
 	print(object.name_full)
@@ -435,48 +236,14 @@ def calculate_indices_local_positions_normals_colors_new(depsgraph: Depsgraph, o
 	return non_emissive_indices, non_emissive_attributes, emissive_indices, emissive_attributes
 
 def calculate_indices_local_positions_normals_colors(depsgraph: Depsgraph, object: Object):
-	eval_object = object.evaluated_get(depsgraph)
-	eval_mesh: Mesh = bpy.data.meshes.new_from_object(eval_object)
-	eval_mesh.calc_loop_triangles()
-	vertex_colors = None
+	mesh_arrays = extract_mesh_arrays(depsgraph, object, True)
 
-	color_attribute = eval_mesh.color_attributes.active_color
-	if color_attribute is not None:
-		assert color_attribute.domain == 'CORNER', "Cannot export vertex colors of color attribute " + color_attribute.name + " for mesh " + eval_mesh.name_full + " because it is not a face corner color attribute"
-		vertex_colors = color_attribute.data
-	
-	vertex_map = {}
-	next_index = 0
-	indices = []
-
-	for triangle in eval_mesh.loop_triangles:
-		norm = triangle.normal
-		norm_game = [norm[0], norm[2], -norm[1]]
+	indices, attributes, _, _ = weld.weld_positions_normals_colors(
+		mesh_arrays.vertex_positions,
+		mesh_arrays.triangle_vertices,
+		mesh_arrays.triangle_loops,
+		mesh_arrays.triangle_normals,
+		mesh_arrays.corner_colors
+	)
 
-		for i in range(3):
-			pos_index = triangle.vertices[i]
-			pos = eval_mesh.vertices[pos_index].co
-			pos_game = [pos[0], pos[2], -pos[1]]
-
-			col_index = triangle.loops[i]
-			col = [0.2, 0.2, 0.2]
-			if vertex_colors is not None:
-				col = vertex_colors[col_index].color
-
-			vertex = (pos_game[0], pos_game[1], pos_game[2], norm_game[0], norm_game[1], norm_game[2], col[0], col[1], col[2])
-
-			if vertex in vertex_map:
-				index = vertex_map[vertex]
-				indices.append(index)
-			else:
-				vertex_map[vertex] = next_index
-				indices.append(next_index)
-				next_index += 1
-	
-	attributes = []
-
-	for vertex in vertex_map.keys():
-		for attribute in vertex:
-			attributes.append(attribute)
-	
-	return indices, attributes
\ No newline at end of file
+	return indices, attributes
@@ -0,0 +1,102 @@
+import numpy as np
+from . import binary
+
+# Compact encodings of the level geometry vertices, each geometry's flags say which ones it uses
+
+# Normals are octahedral encoded to 2 snorm16 and colors are stored as RGBA8
+COMPACT_NORMALS_COLORS = 1
+
+# Positions are stored as 3 unorm16 quantized against the chunk's bounding box
+QUANTIZED_POSITIONS = 2
+
+FULL = 0
+COMPACT = COMPACT_NORMALS_COLORS
+COMPACT_QUANTIZED = COMPACT_NORMALS_COLORS | QUANTIZED_POSITIONS
+
+SNORM16_MAX = 32767
+UNORM16_MAX = 65535
+
+def octahedral_encode(normals):
+	# (n, 3) unit vectors -> (n, 2) int16
+	normals = np.asarray(normals, dtype=np.float32).reshape(-1, 3)
+	length = np.maximum(np.abs(normals).sum(axis=1, keepdims=True), np.float32(1e-20))
+	projected = normals / length
+
+	x, y, z = projected[:, 0], projected[:, 1], projected[:, 2]
+	sign_x = np.where(x >= 0, np.float32(1), np.float32(-1))
+	sign_y = np.where(y >= 0, np.float32(1), np.float32(-1))
+
+	# The lower half of the octahedron is folded over the upper half
+	folded_x = np.where(z < 0, (1 - np.abs(y)) * sign_x, x)
+	folded_y = np.where(z < 0, (1 - np.abs(x)) * sign_y, y)
+
+	encoded = np.stack((folded_x, folded_y), axis=1)
+	return np.round(np.clip(encoded, -1, 1) * SNORM16_MAX).astype(np.int16)
+
+def octahedral_decode(encoded):
+	# Same as the game's decode, (n, 2) int16 -> (n, 3) float32
+	encoded = np.asarray(encoded, dtype=np.int16).reshape(-1, 2)
+	x = np.maximum(encoded[:, 0].astype(np.float32) / np.float32(SNORM16_MAX), np.float32(-1))
+	y = np.maximum(encoded[:, 1].astype(np.float32) / np.float32(SNORM16_MAX), np.float32(-1))
+	z = 1 - np.abs(x) - np.abs(y)
+
+	t = np.maximum(-z, np.float32(0))
+	x = np.where(x >= 0, x - t, x + t)
+	y = np.where(y >= 0, y - t, y + t)
+
+	normals = np.stack((x, y, z), axis=1)
+	return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+def encode_colors(colors):
+	# (n, 3) 0-1 -> (n, 4) uint8, the alpha is always opaque
+	colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+	rgba = np.full((len(colors), 4), 255, dtype=np.uint8)
+	rgba[:, :3] = np.round(np.clip(colors, 0, 1) * 255)
+	return rgba
+
+def decode_colors(rgba):
+	return np.asarray(rgba, dtype=np.uint8).reshape(-1, 4)[:, :3].astype(np.float32) / np.float32(255)
+
+def quantize_positions(positions):
+	# Returns the bounding box min and max and the (n, 3) uint16 positions within it
+	positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+
+	if len(positions) == 0:
+		return np.zeros(3, dtype=np.float32), np.zeros(3, dtype=np.float32), np.empty((0, 3), dtype=np.uint16)
+
+	bounds_min = positions.min(axis=0)
+	bounds_max = positions.max(axis=0)
+	extent = (bounds_max - bounds_min).astype(np.float64)
+	safe_extent = np.where(extent > 0, extent, 1)
+
+	quantized = np.round((positions - bounds_min) / safe_extent * UNORM16_MAX)
+	return bounds_min, bounds_max, np.clip(quantized, 0, UNORM16_MAX).astype(np.uint16)
+
+def dequantize_positions(bounds_min, bounds_max, quantized):
+	# Same as the game's decode, done in single precision
+	bounds_min = np.asarray(bounds_min, dtype=np.float32)
+	scale = (np.asarray(bounds_max, dtype=np.float32) - bounds_min) / np.float32(UNORM16_MAX)
+	return bounds_min + np.asarray(quantized, dtype=np.uint16).reshape(-1, 3).astype(np.float32) * scale
+
+def write_vertices(file, rows, vertex_flags: int, alignment=0):
+	# rows is (v, 9) position, normal, color or (v, 3) position. The positions are written as their own array, followed by
+	# the normals and then the colors. Uncompacted normals and colors stay interleaved as 6 f32 per vertex.
+	rows = np.asarray(rows, dtype=np.float32)
+	binary.write_u32(file, len(rows))
+
+	if vertex_flags & QUANTIZED_POSITIONS:
+		bounds_min, bounds_max, quantized = quantize_positions(rows[:, :3])
+		binary.write_vec3(file, bounds_min)
+		binary.write_vec3(file, bounds_max)
+		binary.write_bytes(file, quantized.astype('<u2'), alignment)
+	else:
+		binary.write_bytes(file, np.ascontiguousarray(rows[:, :3], dtype='<f4'), alignment)
+
+	if rows.shape[1] == 3:
+		return
+
+	if vertex_flags & COMPACT_NORMALS_COLORS:
+		binary.write_bytes(file, octahedral_encode(rows[:, 3:6]).astype('<i2'), alignment)
+		binary.write_bytes(file, encode_colors(rows[:, 6:9]), alignment)
+	else:
+		binary.write_bytes(file, np.ascontiguousarray(rows[:, 3:9], dtype='<f4'), alignment)
@@ -0,0 +1,159 @@
+import numpy as np
+
+# Welding and splitting of the meshes on NumPy arrays, numbered the same as the old per corner dict welding
+
+DEFAULT_COLOR = np.array([0.2, 0.2, 0.2], dtype=np.float32)
+
+# The raw arrays pulled out of an evaluated mesh, see util.extract_mesh_arrays
+class MeshArrays:
+	def __init__(self):
+		self.name = None
+		self.vertex_positions = None
+		self.triangle_vertices = None
+		self.triangle_loops = None
+		self.triangle_normals = None
+		self.corner_colors = None
+		self.triangle_emissive = None
+
+def blender_positions_to_game_positions(positions):
+	# (x, y, z) -> (x, z, -y), positions is (n, 3)
+	return np.stack((positions[:, 0], positions[:, 2], -positions[:, 1]), axis=1)
+
+def transform_positions(matrix, positions):
+	# Matches mathutils Matrix @ Vector: the products are done in single precision, summed in double precision, then
+	# rounded back to single precision. The vector is extended with w = 1.
+	matrix = np.asarray(matrix, dtype=np.float32)
+	positions = np.asarray(positions, dtype=np.float32)
+	result = np.empty((len(positions), 3), dtype=np.float32)
+
+	for row in range(3):
+		dot = (matrix[row, 0] * positions[:, 0]).astype(np.float64)
+		dot += (matrix[row, 1] * positions[:, 1]).astype(np.float64)
+		dot += (matrix[row, 2] * positions[:, 2]).astype(np.float64)
+		dot += np.float64(matrix[row, 3])
+		result[:, row] = dot
+
+	return result
+
+def weld(rows):
+	# Deduplicates the rows of a (n, k) float32 array. Returns the index of each row into the unique rows and the unique
+	# rows themselves, in the order they first appear.
+	rows = np.ascontiguousarray(rows, dtype=np.float32)
+	count, width = rows.shape
+
+	if count == 0:
+		return np.empty(0, dtype=np.uint32), np.empty((0, width), dtype=np.float32)
+
+	# Adding zero turns -0.0 into 0.0 so they compare equal, like they do as dict keys
+	keys = np.ascontiguousarray(rows + np.float32(0.0)).view(np.dtype((np.void, width * 4))).reshape(-1)
+	_, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+	inverse = inverse.reshape(-1)
+
+	# np.unique sorts the keys, renumber them by first occurrence
+	order = np.argsort(first, kind='stable')
+	rank = np.empty(len(order), dtype=np.uint32)
+	rank[order] = np.arange(len(order), dtype=np.uint32)
+
+	return rank[inverse], rows[first[order]]
+
+def weld_positions(vertex_positions, triangle_vertices, matrix=None):
+	# vertex_positions: (v, 3) float32, triangle_vertices: (t * 3) vertex index per triangle corner
+	positions = np.asarray(vertex_positions, dtype=np.float32).reshape(-1, 3)
+
+	if matrix is not None:
+		positions = transform_positions(matrix, positions)
+
+	corner_positions = blender_positions_to_game_positions(positions)[np.asarray(triangle_vertices).reshape(-1)]
+	indices, unique_positions = weld(corner_positions)
+
+	return indices, unique_positions.reshape(-1)
+
+def weld_positions_normals_colors(vertex_positions, triangle_vertices, triangle_loops, triangle_normals, corner_colors=None, triangle_emissive=None):
+	# triangle_loops: (t * 3) face corner index per triangle corner, triangle_normals: (t, 3), corner_colors: (l, 4) or
+	# None, triangle_emissive: (t) bool or None. Emissive triangles only keep their positions.
+	positions = np.asarray(vertex_positions, dtype=np.float32).reshape(-1, 3)
+	triangle_vertices = np.asarray(triangle_vertices).reshape(-1)
+	triangle_loops = np.asarray(triangle_loops).reshape(-1)
+	triangle_normals = np.asarray(triangle_normals, dtype=np.float32).reshape(-1, 3)
+	triangles_count = len(triangle_normals)
+
+	corner_positions = blender_positions_to_game_positions(positions)[triangle_vertices]
+	corner_normals = np.repeat(blender_positions_to_game_positions(triangle_normals), 3, axis=0)
+
+	if corner_colors is None:
+		colors = np.broadcast_to(DEFAULT_COLOR, (triangles_count * 3, 3))
+	else:
+		colors = np.asarray(corner_colors, dtype=np.float32).reshape(-1, 4)[triangle_loops, :3]
+
+	if triangle_emissive is None:
+		emissive = np.zeros(triangles_count * 3, dtype=bool)
+	else:
+		emissive = np.repeat(np.asarray(triangle_emissive, dtype=bool), 3)
+
+	non_emissive = ~emissive
+	non_emissive_rows = np.concatenate((corner_positions[non_emissive], corner_normals[non_emissive], colors[non_emissive]), axis=1)
+
+	indices, attributes = weld(non_emissive_rows)
+	emissive_indices, emissive_attributes = weld(corner_positions[emissive])
+
+	return indices, attributes.reshape(-1), emissive_indices, emissive_attributes.reshape(-1)
+
+# u16 indices can address this many vertices
+U16_VERTEX_LIMIT = 0xFFFF + 1
+
+def morton_codes(points):
+	# 30 bit Morton codes of the points quantized to their bounding box, points is (n, 3)
+	points = np.asarray(points, dtype=np.float64)
+	low = points.min(axis=0)
+	extent = np.maximum(points.max(axis=0) - low, 1e-12)
+	quantized = ((points - low) / extent * 1023).astype(np.uint64)
+	codes = np.zeros(len(points), dtype=np.uint64)
+
+	for bit in range(10):
+		for axis in range(3):
+			codes |= ((quantized[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(bit * 3 + axis)
+	
+	return codes
+
+def split_into_u16_chunks(indices, rows):
+	# Splits a welded mesh with more vertices than u16 indices can address into chunks that each fit. rows is (v, k) with
+	# the position in the first three columns. The triangles are ordered along a Morton curve first so each chunk covers
+	# a compact part of the mesh. Meshes that already fit come back untouched as a single chunk. Returns a list of
+	# (indices, rows) with the indices relative to the chunk's rows.
+	rows = np.asarray(rows)
+
+	if len(rows) <= U16_VERTEX_LIMIT:
+		return [(indices, rows)]
+	
+	triangles = np.asarray(indices, dtype=np.int64).reshape(-1, 3)
+	centroids = rows[triangles, :3].astype(np.float64).mean(axis=1)
+	triangles = triangles[np.argsort(morton_codes(centroids), kind='stable')]
+
+	# Greedily fill each chunk until the next triangle would push it over the limit
+	chunk_starts = [0]
+	vertex_chunks = [-1] * len(rows)
+	chunk = 0
+	chunk_vertices_count = 0
+
+	for triangle_index, triangle in enumerate(triangles.tolist()):
+		new_vertices = {v for v in triangle if vertex_chunks[v] != chunk}
+
+		if chunk_vertices_count + len(new_vertices) > U16_VERTEX_LIMIT:
+			chunk += 1
+			chunk_starts.append(triangle_index)
+			chunk_vertices_count = 0
+			new_vertices = set(triangle)
+		
+		for v in new_vertices:
+			vertex_chunks[v] = chunk
+		
+		chunk_vertices_count += len(new_vertices)
+	
+	chunk_starts.append(len(triangles))
+	chunks = []
+
+	for start, end in zip(chunk_starts[:-1], chunk_starts[1:]):
+		chunk_indices, chunk_rows = weld(rows[triangles[start:end].reshape(-1)])
+		chunks.append((chunk_indices, chunk_rows))
+	
+	return chunks
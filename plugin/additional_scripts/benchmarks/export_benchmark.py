@@ -0,0 +1,368 @@
+import sys
+import os
+import io
+import json
+import time
+import random
+import argparse
+import tempfile
+import datetime
+import platform
+import contextlib
+import subprocess
+import numpy as np
+
+# Benchmarks the level exporter on synthetic tracks without Blender, through the bpy stand in in fake_bpy.py. Times the
+# scene graph, the util helpers that pull the meshes out of the objects, each level section exporter on its own and the
+# whole export, and appends the results as a line of JSON to the results file so runs can be compared over time. Each
+# run is compared against the last one in the file with the same parameters.
+#
+#	python export_benchmark.py [--meshes N] [--triangles M] [--props P] [--instancing-depth D] [--instances K] ...
+#
+# See --help for the rest. The exporter's own logging is thrown away while it's being timed.
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIRECTORY)
+sys.path.insert(0, os.path.join(BENCHMARKS_DIRECTORY, "..", "addons"))
+
+import fake_bpy
+fake_bpy.install()
+
+from kart_guys import util, level, container
+
+DEFAULT_RESULTS = os.path.join(BENCHMARKS_DIRECTORY, "export_benchmark_results.jsonl")
+
+HULL_TYPES = ['box', 'cylinder', 'mesh']
+
+# Synthetic track
+
+def grid_triangles(n):
+	# The triangles of an (n + 1) x (n + 1) vertex grid
+	i, j = np.meshgrid(np.arange(n), np.arange(n), indexing='ij')
+	a = (i * (n + 1) + j).reshape(-1)
+	b, c, d = a + 1, a + n + 1, a + n + 2
+	return np.stack((np.stack((a, b, d), axis=1), np.stack((a, d, c), axis=1)), axis=1).reshape(-1, 3)
+
+def rock_mesh(name, triangles_count, rng: np.random.Generator, emissive: bool):
+	# A bumpy sphere with a few color regions, closed so the LODs and convex hulls get something real to work on
+	n = max(int(np.sqrt(triangles_count / 2)), 3)
+	u, v = np.meshgrid(np.linspace(0, 2 * np.pi, n + 1), np.linspace(0.05, np.pi - 0.05, n + 1), indexing='ij')
+	radius = 1 + 0.15 * rng.standard_normal(u.shape)
+	radius[-1] = radius[0] # The seam lines up
+	positions = np.stack((radius * np.sin(v) * np.cos(u), radius * np.sin(v) * np.sin(u), radius * np.cos(v)), axis=-1).reshape(-1, 3)
+	triangles = grid_triangles(n)
+
+	regions = rng.random((4, 4)).astype(np.float32)
+	regions[:, 3] = 1
+	colors = regions[(np.arange(len(triangles) * 3) // (len(triangles) * 3 // 4 + 1)) % 4]
+	face_emissive = rng.random(len(triangles)) < 0.05 if emissive else None
+
+	return fake_bpy.Mesh(name, positions, triangles, colors, face_emissive)
+
+def ground_mesh(name, triangles_count, offset, size, rng: np.random.Generator):
+	n = max(int(np.sqrt(triangles_count / 2)), 1)
+	x, y = np.meshgrid(np.linspace(0, size, n + 1), np.linspace(0, size, n + 1), indexing='ij')
+	z = 2 * np.sin((x + offset[0]) * 0.05) * np.cos((y + offset[1]) * 0.04) + 0.05 * rng.standard_normal(x.shape)
+	positions = np.stack((x, y, z), axis=-1).reshape(-1, 3)
+	return fake_bpy.Mesh(name, positions, grid_triangles(n))
+
+def hull_mesh(name):
+	# A low poly sphere for the mesh hulls
+	n = 8
+	u, v = np.meshgrid(np.linspace(0, 2 * np.pi, n + 1), np.linspace(0.1, np.pi - 0.1, n + 1), indexing='ij')
+	positions = np.stack((np.sin(v) * np.cos(u), np.sin(v) * np.sin(u), np.cos(v)), axis=-1).reshape(-1, 3)
+	return fake_bpy.Mesh(name, positions, grid_triangles(n))
+
+def ai_path_curve(name, radius, curves_count):
+	points = []
+
+	for i in range(curves_count):
+		angle = 2 * np.pi * i / curves_count
+		tangent = np.array((-np.sin(angle), np.cos(angle), 0)) * radius * 0.5 / curves_count * np.pi
+		co = np.array((np.cos(angle), np.sin(angle), 0)) * radius
+		points.append(fake_bpy.BezierPoint(co, co - tangent, co + tangent))
+
+	return fake_bpy.Curve(name, [fake_bpy.Spline(points)])
+
+def random_matrix(rng: random.Random, radius):
+	position = (rng.uniform(-radius, radius), rng.uniform(-radius, radius), 0)
+	scale = rng.uniform(0.5, 2)
+	return fake_bpy.trs_matrix(position, rng.uniform(0, 2 * np.pi), (scale, scale, scale))
+
+def add_hull(parent, hull_type, hull_mesh_data):
+	fake_bpy.Object(parent.name + " hull", 'hull', hull_mesh_data if hull_type == 'mesh' else None, parent, fake_bpy.trs_matrix((0, 0, 0.5)), kg_hull_type=hull_type)
+
+def create_track(arguments):
+	# Returns the depsgraph of a track made from the arguments
+	rng = random.Random(arguments.seed)
+	np_rng = np.random.default_rng(arguments.seed)
+	radius = arguments.track_radius
+	roots = []
+
+	meshes = [rock_mesh("rock_%d" % i, arguments.triangles, np_rng, i % 4 == 0) for i in range(arguments.meshes)]
+	hull_data = hull_mesh("hull_sphere")
+
+	# Ground tiles
+	tiles = max(int(np.sqrt(arguments.ground_meshes)), 1)
+	size = 2 * radius / tiles
+
+	for i in range(tiles * tiles):
+		offset = (-radius + (i // tiles) * size, -radius + (i % tiles) * size)
+		kg_type = 'ground_collision_mesh_and_inanimate' if i == 0 else 'ground_collision_mesh'
+		data = ground_mesh("ground_%d" % i, arguments.ground_triangles // (tiles * tiles), offset, size, np_rng)
+		roots.append(fake_bpy.Object("ground_%d" % i, kg_type, data, matrix_local=fake_bpy.trs_matrix((offset[0], offset[1], 0))))
+
+	# Props, the ones with hulls become inanimate entities and the rest static instances
+	def prop(name, matrix):
+		object = fake_bpy.Object(name, 'inanimate', rng.choice(meshes), matrix_local=matrix)
+
+		if rng.random() < arguments.hull_fraction:
+			add_hull(object, rng.choice(HULL_TYPES), hull_data)
+
+		return object
+
+	for i in range(arguments.props):
+		roots.append(prop("prop_%d" % i, random_matrix(rng, radius)))
+
+	# Kits of props instanced inside of kits
+	if arguments.instancing_depth > 0:
+		collection = fake_bpy.Collection([prop("kit_prop_%d" % i, random_matrix(rng, 10)) for i in range(4)])
+
+		for depth in range(arguments.instancing_depth):
+			instancers = []
+
+			for i in range(arguments.instances):
+				instancer = fake_bpy.Object("kit_%d_%d" % (depth, i), 'none', matrix_local=random_matrix(rng, radius if depth == arguments.instancing_depth - 1 else 20))
+				instancer.instance_collection = collection
+				instancers.append(instancer)
+
+			collection = fake_bpy.Collection(instancers)
+
+		roots.extend(collection.objects)
+
+	# Rigid body islands
+	for i in range(arguments.rigid_bodies):
+		island = fake_bpy.Object("island_%d" % i, 'rigid_body_island', matrix_local=random_matrix(rng, radius))
+
+		for j in range(3):
+			body = fake_bpy.Object("body_%d_%d" % (i, j), 'rigid_body', meshes[j % len(meshes)], island, fake_bpy.trs_matrix((j * 2, 0, 1)), kg_rigid_body_mass=rng.uniform(1, 10))
+			add_hull(body, HULL_TYPES[(i + j) % len(HULL_TYPES)], hull_data)
+
+		roots.append(island)
+
+	for i in range(arguments.specials):
+		oil_slick = fake_bpy.Object("oil_slick_%d" % i, 'oil_slick', meshes[0], matrix_local=random_matrix(rng, radius))
+		add_hull(oil_slick, 'mesh', hull_data)
+		bumper = fake_bpy.Object("bumper_%d" % i, 'bumper', meshes[0], matrix_local=random_matrix(rng, radius))
+		add_hull(bumper, 'cylinder', hull_data)
+		boost_jet = fake_bpy.Object("boost_jet_%d" % i, 'boost_jet', meshes[0], matrix_local=random_matrix(rng, radius))
+		add_hull(boost_jet, 'box', hull_data)
+		roots.extend((oil_slick, bumper, boost_jet))
+
+	roots.append(fake_bpy.Object("spawn", 'spawn_point', matrix_local=fake_bpy.trs_matrix((0, -radius * 0.8, 1))))
+	roots.append(fake_bpy.Object("ai_left", 'ai_path_left', ai_path_curve("ai_left", radius * 0.75, arguments.ai_curves)))
+	roots.append(fake_bpy.Object("ai_right", 'ai_path_right', ai_path_curve("ai_right", radius * 0.85, arguments.ai_curves)))
+
+	for i in range(4):
+		roots.append(fake_bpy.Object("ai_spawn_%d" % i, 'ai_spawn_point', matrix_local=fake_bpy.trs_matrix((i * 2, -radius * 0.8, 1))))
+
+	# Every object in the scene, the instanced kits' objects are only in their collections
+	objects = []
+	to_visit = list(roots)
+
+	while to_visit:
+		object = to_visit.pop()
+		objects.append(object)
+		to_visit.extend(object.children)
+
+	return fake_bpy.Depsgraph(objects)
+
+# Timing
+
+def timed(repeat, func):
+	# Runs func repeat times with its output thrown away, returns the last result and the times
+	times = []
+	result = None
+
+	for _ in range(repeat):
+		with contextlib.redirect_stdout(io.StringIO()):
+			start = time.perf_counter()
+			result = func()
+			times.append(time.perf_counter() - start)
+
+	return result, times
+
+def result_entry(times, bytes_count=None):
+	entry = { 'min_s': min(times), 'median_s': float(np.median(times)) }
+
+	if bytes_count is not None:
+		entry['bytes'] = bytes_count
+
+	return entry
+
+def section_bytes(func):
+	# Runs a section exporter into a file of its own, returns its size
+	def run():
+		file = container.SectionedFile()
+		file.begin_section("benchmark")
+		func(file)
+		return len(file.getvalue())
+
+	return run
+
+def run_benchmarks(arguments, depsgraph):
+	results = {}
+	repeat = arguments.repeat
+
+	graph, times = timed(repeat, lambda: util.create_scene_graph(depsgraph))
+	results['util.create_scene_graph'] = result_entry(times)
+
+	# The helpers that pull the mesh data out of the objects
+	mesh_w_objects = list({w_object.object.data.name_full: w_object for w_object in graph.of_kg_types('inanimate', 'rigid_body', 'oil_slick', 'bumper', 'boost_jet')}.values())
+	hull_w_objects = [w_object for w_object in graph.of_kg_types('hull') if w_object.object.kg_hull_type == 'mesh']
+
+	_, times = timed(repeat, lambda: [util.extract_mesh_arrays(depsgraph, w_object.object, True) for w_object in mesh_w_objects])
+	results['util.extract_mesh_arrays'] = result_entry(times)
+
+	_, times = timed(repeat, lambda: [util.calculate_indices_local_positions(depsgraph, w_object.object) for w_object in hull_w_objects])
+	results['util.calculate_indices_local_positions'] = result_entry(times)
+
+	_, times = timed(repeat, lambda: [util.calculate_indices_local_positions_normals_colors(depsgraph, w_object.object) for w_object in mesh_w_objects])
+	results['util.calculate_indices_local_positions_normals_colors'] = result_entry(times)
+
+	# Each level section on its own, the ones after the geometries need the geometry indices
+	vertex_flags = level.VERTEX_FORMATS[arguments.vertex_format]
+	geometries = lambda file: level.export_geometries(depsgraph, graph, file, None, None, False, vertex_flags, False, arguments.lod_levels)
+	mesh_name_to_index_map, *_ = timed(1, lambda: geometries(io.BytesIO()))[0]
+
+	sections = [
+		("spawn_point", lambda file: level.export_spawn_point(graph, file)),
+		("ground_collision_mesh", lambda file: level.export_ground_collision_meshes(depsgraph, graph, file, None, None)),
+		("geometries", geometries),
+		("inanimate_entities", lambda file: level.export_inanimate_entities(depsgraph, graph, file, mesh_name_to_index_map)),
+		("static_instances", lambda file: level.export_static_instances(graph, file, mesh_name_to_index_map, None, set())),
+		("rigid_bodies", lambda file: level.export_rigid_bodies(depsgraph, graph, file, mesh_name_to_index_map)),
+		("oil_slicks", lambda file: level.export_oil_slicks(depsgraph, graph, file, mesh_name_to_index_map)),
+		("bumpers", lambda file: level.export_bumpers(depsgraph, graph, file, mesh_name_to_index_map)),
+		("boost_jets", lambda file: level.export_boost_jets(depsgraph, graph, file, mesh_name_to_index_map)),
+		("ai_paths", lambda file: level.export_ai_paths(depsgraph, graph, file)),
+		("ai_spawn_points", lambda file: level.export_ai_spawn_points(depsgraph, graph, file))
+	]
+
+	for name, func in sections:
+		bytes_count, times = timed(repeat, section_bytes(func))
+		results['level.' + name] = result_entry(times, bytes_count)
+
+	# The whole export, the way the operator runs it
+	with tempfile.TemporaryDirectory() as directory:
+		filepath = os.path.join(directory, "benchmark.kgl")
+		options = level.ExportOptions(
+			filepath,
+			use_cache=arguments.cache,
+			use_parallel=arguments.parallel,
+			vertex_format=arguments.vertex_format,
+			lod_levels=arguments.lod_levels,
+			compression=arguments.compression,
+			array_alignment=arguments.array_alignment
+		)
+
+		_, times = timed(repeat, lambda: level.export(options, fake_bpy.Context(depsgraph)))
+		results['level.export'] = result_entry(times, os.path.getsize(filepath))
+
+	scene = {
+		'objects': len(depsgraph.scene.objects),
+		'w_objects': len(graph.w_objects),
+		'unique_meshes': len(mesh_w_objects),
+		'triangles': sum(len(w_object.object.data.loop_triangles) for w_object in mesh_w_objects)
+	}
+
+	return scene, results
+
+def git_commit():
+	try:
+		return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCHMARKS_DIRECTORY, capture_output=True, text=True, check=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+def previous_run(results_path, parameters):
+	# The last run in the results file with the same parameters
+	if not os.path.exists(results_path):
+		return None
+
+	previous = None
+
+	with open(results_path, 'r') as file:
+		for line in file:
+			if line.strip():
+				run = json.loads(line)
+
+				if run.get('parameters') == parameters:
+					previous = run
+
+	return previous
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmarks the level exporter on a synthetic track")
+	parser.add_argument("--meshes", type=int, default=32, help="Unique prop meshes")
+	parser.add_argument("--triangles", type=int, default=2000, help="Triangles per prop mesh")
+	parser.add_argument("--props", type=int, default=500, help="Props placed directly in the scene")
+	parser.add_argument("--hull-fraction", type=float, default=0.25, help="Fraction of the props with a hull")
+	parser.add_argument("--instancing-depth", type=int, default=2, help="Levels of kits instanced inside of kits")
+	parser.add_argument("--instances", type=int, default=8, help="Instances of the kit below on each level")
+	parser.add_argument("--ground-meshes", type=int, default=4)
+	parser.add_argument("--ground-triangles", type=int, default=50000, help="Triangles of all the ground meshes together")
+	parser.add_argument("--rigid-bodies", type=int, default=10, help="Rigid body islands, 3 bodies each")
+	parser.add_argument("--specials", type=int, default=4, help="Oil slicks, bumpers and boost jets of each")
+	parser.add_argument("--ai-curves", type=int, default=16)
+	parser.add_argument("--track-radius", type=float, default=200.0)
+	parser.add_argument("--vertex-format", default='full', choices=list(level.VERTEX_FORMATS))
+	parser.add_argument("--lod-levels", type=int, default=0)
+	parser.add_argument("--compression", default='none', choices=list(container.CODECS))
+	parser.add_argument("--array-alignment", type=int, default=0, help="Array alignment of the whole export")
+	parser.add_argument("--cache", action='store_true', help="Use the mesh cache in the whole export")
+	parser.add_argument("--parallel", action='store_true', help="Encode in worker processes in the whole export")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--repeat", type=int, default=3)
+	parser.add_argument("--output", default=DEFAULT_RESULTS, help="JSON lines file the results are appended to")
+	parser.add_argument("--label", default=None, help="Note stored with the results")
+	arguments = parser.parse_args()
+
+	parameters = { name: value for name, value in vars(arguments).items() if name not in ('repeat', 'output', 'label') }
+	depsgraph = create_track(arguments)
+	scene, results = run_benchmarks(arguments, depsgraph)
+
+	run = {
+		'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+		'commit': git_commit(),
+		'label': arguments.label,
+		'python': platform.python_version(),
+		'numpy': np.__version__,
+		'machine': platform.machine(),
+		'repeat': arguments.repeat,
+		'parameters': parameters,
+		'scene': scene,
+		'results': results
+	}
+
+	previous = previous_run(arguments.output, parameters)
+
+	with open(arguments.output, 'a') as file:
+		file.write(json.dumps(run) + "\n")
+
+	print("Scene:", ", ".join("%s %d" % item for item in scene.items()))
+	print()
+	print("%-56s %10s %12s %10s" % ("Benchmark", "Min", "Bytes", "vs last"))
+
+	for name, entry in results.items():
+		change = ""
+
+		if previous is not None and name in previous['results']:
+			change = "%+.1f%%" % (100 * (entry['min_s'] / previous['results'][name]['min_s'] - 1))
+
+		print("%-56s %9.4fs %12s %10s" % (name, entry['min_s'], entry.get('bytes', ""), change))
+
+	print()
+	print("Appended to", arguments.output)
+
+if __name__ == '__main__':
+	main()
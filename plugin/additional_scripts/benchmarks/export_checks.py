@@ -0,0 +1,369 @@
+import sys
+import os
+import io
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+
+# Checks of the exporter against a plain reference, run on the synthetic tracks and meshes of export_benchmark.py without
+# Blender. Each check prints what it compared and fails with an AssertionError on the first difference.
+#
+# weld: welds fake meshes with -0.0 in them, with and without vertex colors and with emissive triangles through
+# util.extract_mesh_arrays and weld.py, and compares the bytes with the per corner dict welding they replaced.
+#
+# parallel: exports the same track with the encoding done in worker processes and serially, the files have to be the
+# same byte for byte.
+#
+# ground_grid: bins random ground triangles, walls lined up with the cell boundaries and triangles on the edges of the
+# grid into the ground grid cells and compares them with a straight port of how the game used to bin them on load.
+#
+# nearest_segment: looks up random points, on and far off the path, in the AI path segment grid and compares the
+# nearest segment it finds with a brute force search over every segment.
+#
+#	python export_checks.py [check ...]
+#
+# With no checks given all of them are run.
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIRECTORY)
+
+import export_benchmark # Installs fake_bpy
+import fake_bpy
+from kart_guys import level, ai_path, ground, util, binary
+
+# The per corner dict welding of the level geometries before weld.py, walking the mesh one element at a time. The
+# default color, -0.0 and first vertex wins behaviour all come from here.
+def dict_weld_positions_normals_colors(eval_mesh):
+	emissive_attribute = None
+
+	for attribute in eval_mesh.attributes:
+		if attribute.name == "kg_emissive":
+			emissive_attribute = attribute
+			break
+
+	vertex_colors = None
+	color_attribute = eval_mesh.color_attributes.active_color
+	if color_attribute is not None:
+		vertex_colors = color_attribute.data
+
+	emissive_vertex_map = {}
+	emissive_indices = []
+	non_emissive_vertex_map = {}
+	non_emissive_indices = []
+
+	for triangle in eval_mesh.loop_triangles:
+		emissive = False
+
+		if emissive_attribute is not None:
+			emissive = emissive_attribute.data[triangle.polygon_index].value
+
+		norm = triangle.normal
+		norm_game = [norm[0], norm[2], -norm[1]]
+
+		for i in range(3):
+			pos = eval_mesh.vertices[triangle.vertices[i]].co
+			pos_game = [pos[0], pos[2], -pos[1]]
+
+			if emissive:
+				v = (pos_game[0], pos_game[1], pos_game[2])
+				emissive_indices.append(emissive_vertex_map.setdefault(v, len(emissive_vertex_map)))
+			else:
+				col = [0.2, 0.2, 0.2]
+				if vertex_colors is not None:
+					col = vertex_colors[triangle.loops[i]].color
+
+				v = (pos_game[0], pos_game[1], pos_game[2], norm_game[0], norm_game[1], norm_game[2], col[0], col[1], col[2])
+				non_emissive_indices.append(non_emissive_vertex_map.setdefault(v, len(non_emissive_vertex_map)))
+
+	emissive_attributes = [attribute for v in emissive_vertex_map.keys() for attribute in v]
+	non_emissive_attributes = [attribute for v in non_emissive_vertex_map.keys() for attribute in v]
+
+	return non_emissive_indices, non_emissive_attributes, emissive_indices, emissive_attributes
+
+def welded_bytes(indices, attributes, emissive_indices, emissive_attributes):
+	file = io.BytesIO()
+	binary.write_indices_attributes(file, indices, attributes)
+	binary.write_indices_attributes(file, emissive_indices, emissive_attributes)
+	return file.getvalue()
+
+def weld_test_meshes(rng: np.random.Generator):
+	meshes = []
+
+	# A bumpy grid lying on y = 0 so half the positions have a 0.0 that turns into -0.0 in game space, with flat parts
+	# whose normals have zeros too, and colors picked from a few so the corners of a vertex often match
+	n = 24
+	x, y = np.meshgrid(np.arange(n + 1, dtype=np.float32), np.arange(n + 1, dtype=np.float32), indexing='ij')
+	z = np.where(rng.random(x.shape) < 0.5, 0.0, rng.normal(0, 0.5, x.shape)).astype(np.float32)
+	positions = np.stack((x - n / 2, y * 0, z), axis=-1).reshape(-1, 3)
+	positions[::3, 1] = -0.0
+	triangles = export_benchmark.grid_triangles(n)
+	palette = rng.random((4, 4)).astype(np.float32)
+	colors = palette[rng.integers(0, len(palette), triangles.size)]
+	emissive = rng.random(len(triangles)) < 0.3
+
+	meshes.append(fake_bpy.Mesh("colors", positions, triangles, colors))
+	meshes.append(fake_bpy.Mesh("default color", positions, triangles))
+	meshes.append(fake_bpy.Mesh("emissive", positions, triangles, colors, emissive))
+	meshes.append(fake_bpy.Mesh("emissive default color", positions, triangles, None, emissive))
+	meshes.append(fake_bpy.Mesh("all emissive", positions, triangles, colors, np.ones(len(triangles), dtype=bool)))
+
+	# A closed rock with smooth random positions, nothing welds but the shared vertices of a triangle fan
+	rock = export_benchmark.rock_mesh("rock", 400, rng, True)
+	meshes.append(rock)
+
+	return meshes
+
+def check_weld():
+	rng = np.random.default_rng(0)
+	depsgraph = fake_bpy.Depsgraph([])
+
+	for mesh in weld_test_meshes(rng):
+		object = fake_bpy.Object(mesh.name, 'inanimate', mesh)
+
+		with quiet():
+			welded = util.calculate_indices_local_positions_normals_colors_new_2(depsgraph, object)
+			reference = dict_weld_positions_normals_colors(mesh)
+
+		assert welded_bytes(*welded) == welded_bytes(*reference), "Welding " + mesh.name + " differs from the dict welding"
+
+		# The helpers without emissive triangles weld the same way
+		if not mesh.attributes:
+			with quiet():
+				indices, attributes = util.calculate_indices_local_positions_normals_colors(depsgraph, object)
+
+				# The vertex group version, which has its results the other way around
+				_, _, group_indices, group_attributes = util.calculate_indices_local_positions_normals_colors_new(depsgraph, object)
+
+			assert welded_bytes(indices, attributes, [], []) == welded_bytes(*reference), "Welding " + mesh.name + " without emissive differs from the dict welding"
+			assert welded_bytes(group_indices, group_attributes, [], []) == welded_bytes(*reference), "Welding " + mesh.name + " differs from the vertex group dict welding"
+
+		print("weld: same as the dict welding for", mesh.name + ",", len(reference[0]) // 3, "triangles,", len(reference[1]) // 9, "vertices,", len(reference[3]) // 3, "emissive vertices")
+
+def small_track(seed):
+	# A track with a bit of everything that's still quick to export
+	arguments = argparse.Namespace(
+		meshes=6,
+		triangles=600,
+		props=60,
+		hull_fraction=0.25,
+		instancing_depth=1,
+		instances=3,
+		ground_meshes=4,
+		ground_triangles=4000,
+		rigid_bodies=2,
+		specials=1,
+		ai_curves=4,
+		track_radius=150.0,
+		seed=seed
+	)
+
+	return export_benchmark.create_track(arguments)
+
+@contextlib.contextmanager
+def quiet():
+	# Throws away the exporter's own logging, the worker processes' too since they print straight to the file descriptor
+	sys.stdout.flush()
+	stdout = os.dup(1)
+	devnull = os.open(os.devnull, os.O_WRONLY)
+	os.dup2(devnull, 1)
+
+	try:
+		with contextlib.redirect_stdout(io.StringIO()):
+			yield
+	finally:
+		os.dup2(stdout, 1)
+		os.close(stdout)
+		os.close(devnull)
+
+def export_bytes(depsgraph, directory, name, **options):
+	filepath = os.path.join(directory, name + ".kgl")
+
+	with quiet():
+		level.export(level.ExportOptions(filepath, use_cache=False, **options), fake_bpy.Context(depsgraph))
+
+	with open(filepath, 'rb') as file:
+		return file.read()
+
+def check_parallel():
+	option_sets = [
+		{},
+		{ 'optimize_vertex_cache': True, 'vertex_format': 'compact_quantized', 'lod_levels': 2, 'static_batching': True, 'array_alignment': 16 }
+	]
+
+	depsgraph = small_track(0)
+
+	with tempfile.TemporaryDirectory() as directory:
+		for options in option_sets:
+			serial = export_bytes(depsgraph, directory, "serial", use_parallel=False, **options)
+			parallel = export_bytes(depsgraph, directory, "parallel", use_parallel=True, **options)
+			assert serial == parallel, "Parallel and serial exports differ with options " + str(options)
+			print("parallel: same", len(serial), "bytes with options", options)
+
+# Port of ground_grid_reset, insert_into_ground_grid and bounds_to_grid_cells as the game had them before the cells were
+# baked into the level, one triangle at a time in single precision
+def odin_bounds_to_grid_cells(half_cell_count, cell_size, bounds_min, bounds_max):
+	half_cell_count_f32 = np.float32(half_cell_count)
+	cell_count = half_cell_count * 2
+	cell_count_f32 = np.float32(cell_count)
+
+	min_x = int(max(np.floor(bounds_min[0] / cell_size + half_cell_count_f32), np.float32(0)))
+	min_y = int(max(np.floor(bounds_min[2] / cell_size + half_cell_count_f32), np.float32(0)))
+	max_x = int(min(np.ceil(bounds_max[0] / cell_size + half_cell_count_f32), cell_count_f32))
+	max_y = int(min(np.ceil(bounds_max[2] / cell_size + half_cell_count_f32), cell_count_f32))
+
+	if max_x < 0 or max_y < 0 or min_x >= cell_count or min_y >= cell_count:
+		return 0, 0, 0, 0, False
+
+	if min_x == max_x:
+		if max_x == cell_count - 1:
+			min_x -= 1
+		else:
+			max_x += 1
+
+	if min_y == max_y:
+		if max_y == cell_count - 1:
+			min_y -= 1
+		else:
+			max_y += 1
+
+	return min_x, min_y, max_x, max_y, True
+
+def odin_ground_grid(half_size, positions, triangles):
+	half_cell_count = int(max(np.ceil(np.float32(half_size) / ground.CELL_SIZE), np.float32(5.0)))
+	cell_count = half_cell_count * 2
+	grid = [[[] for _ in range(cell_count)] for _ in range(cell_count)]
+	positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+
+	for triangle_index, (a, b, c) in enumerate(np.asarray(triangles)[:, :3].tolist()):
+		bounds_min = np.minimum(np.minimum(positions[a], positions[b]), positions[c])
+		bounds_max = np.maximum(np.maximum(positions[a], positions[b]), positions[c])
+		min_x, min_y, max_x, max_y, ok = odin_bounds_to_grid_cells(half_cell_count, ground.CELL_SIZE, bounds_min, bounds_max)
+		assert ok
+
+		for x in range(min_x, max_x):
+			for y in range(min_y, max_y):
+				grid[x][y].append(triangle_index)
+
+	return half_cell_count, grid
+
+def ground_test_meshes(rng: np.random.Generator):
+	# (indices, positions) meshes in game space like encode.weld_ground_collision_mesh makes them
+	cell_size = float(ground.CELL_SIZE)
+	meshes = []
+
+	# Bumpy terrain
+	n = 40
+	x, z = np.meshgrid(np.linspace(-300, 300, n + 1), np.linspace(-250, 310, n + 1), indexing='ij')
+	y = rng.uniform(-2, 2, x.shape)
+	meshes.append((export_benchmark.grid_triangles(n).reshape(-1), np.stack((x, y, z), axis=-1).reshape(-1)))
+
+	# Random triangles of every size, some of them tiny
+	centers = rng.uniform(-250, 250, (400, 3))
+	sizes = 10.0 ** rng.uniform(-3, 1.6, (400, 1, 1))
+	corners = (centers[:, None, :] + rng.uniform(-1, 1, (400, 3, 3)) * sizes).reshape(-1, 3)
+	meshes.append((np.arange(len(corners)), corners.reshape(-1)))
+
+	# Vertical walls lined up with the cell boundaries in x and in z, 300 is the start of the last cell
+	walls = []
+	grid_end = 320.0 # Everything is within 320 so the half cell count is 16
+
+	for boundary in np.arange(-300, 301, cell_size):
+		walls.append(((boundary, 0, boundary + 1), (boundary, 5, boundary + 7), (boundary, 0, boundary + 15)))
+		walls.append(((boundary + 1, 0, boundary), (boundary + 15, 0, boundary), (boundary + 7, 5, boundary)))
+
+	walls = np.array(walls, dtype=np.float32).reshape(-1, 3)
+	meshes.append((np.arange(len(walls)), walls.reshape(-1)))
+
+	# Triangles right at the edges of the grid
+	edges = np.array([
+		((grid_end - 1, 0, 0), (grid_end, 0, 3), (grid_end - 2, 0, 6)),
+		((0, 0, -grid_end), (3, 0, -grid_end + 1), (6, 0, -grid_end)),
+		((-grid_end, 0, -grid_end), (-grid_end + 1, 0, -grid_end), (-grid_end, 0, -grid_end + 1))
+	], dtype=np.float32).reshape(-1, 3)
+	meshes.append((np.arange(len(edges)), edges.reshape(-1)))
+
+	return meshes
+
+def check_ground_grid():
+	rng = np.random.default_rng(0)
+	positions, triangles = ground.build_triangles(ground_test_meshes(rng))
+
+	half_size = ground.grid_half_size(positions)
+	half_cell_count = ground.half_cell_count(half_size)
+	bounds_min, bounds_max = ground.triangle_bounds(positions, triangles)
+	cell_offsets, cell_triangles = ground.bin_triangles(half_cell_count, bounds_min, bounds_max)
+
+	odin_half_cell_count, grid = odin_ground_grid(half_size, positions, triangles)
+	assert half_cell_count == odin_half_cell_count, "Half cell count " + str(half_cell_count) + " but the game had " + str(odin_half_cell_count)
+
+	cell_count = half_cell_count * 2
+	assert len(cell_offsets) == cell_count * cell_count + 1
+
+	for x in range(cell_count):
+		for y in range(cell_count):
+			c = x * cell_count + y
+			cell = cell_triangles[cell_offsets[c] : cell_offsets[c + 1]].tolist()
+			assert cell == grid[x][y], "Cell " + str((x, y)) + " has triangles " + str(cell) + " but the game had " + str(grid[x][y])
+
+	print("ground_grid: same cells as the game for", len(triangles), "triangles,", cell_count, "x", cell_count, "cells,", len(cell_triangles), "entries")
+
+def wobbly_loop_curves(rng: np.random.Generator, curves_count, radius):
+	# A closed loop of Bezier curves in game space whose radius goes in and out, (n, 4, 3)
+	angles = 2 * np.pi * np.arange(curves_count) / curves_count
+	radii = radius * rng.uniform(0.6, 1.4, curves_count)
+	points = np.stack((np.cos(angles) * radii, rng.uniform(-5, 5, curves_count), np.sin(angles) * radii), axis=1)
+	handles = (np.roll(points, -1, axis=0) - np.roll(points, 1, axis=0)) / 6
+
+	return np.stack((points, points + handles, np.roll(points - handles, -1, axis=0), np.roll(points, -1, axis=0)), axis=1)
+
+def check_nearest_segment():
+	rng = np.random.default_rng(0)
+
+	# Curves, radius and how many points near the path, anywhere in and around the grid and far outside of it. The
+	# points away from the path search a lot of empty cells, there are only a few of them on the big grids.
+	cases = [
+		(4, 20.0, 1000, 200, 20),
+		(16, 150.0, 1000, 200, 20),
+		(64, 400.0, 1000, 100, 10),
+		(128, 2000.0, 1000, 10, 2)
+	]
+
+	for curves_count, radius, near_count, anywhere_count, far_count in cases:
+		_, positions = ai_path.sample_path(wobbly_loop_curves(rng, curves_count, radius))
+		grid = ai_path.build_segment_grid(positions)
+
+		near = positions[rng.integers(0, len(positions), near_count)] + rng.normal(0, radius * 0.05, (near_count, 3))
+		anywhere = rng.uniform(-radius * 2, radius * 2, (anywhere_count, 3))
+		far = rng.uniform(-radius * 20, radius * 20, (far_count, 3))
+		points = np.concatenate((near, anywhere, far)).astype(np.float32)
+
+		for point in points:
+			segment, _, distance_sq = ai_path.nearest_segment(grid, positions, point)
+			brute_segment, _, brute_distance_sq = ai_path.brute_force_nearest_segment(positions, point)
+
+			# Segments that share the closest sample can tie, only the distance has to match then
+			assert segment == brute_segment or abs(distance_sq - brute_distance_sq) <= 1e-5 * max(brute_distance_sq, 1.0), \
+				"Nearest segment of " + str(point) + " is " + str(segment) + " at " + str(distance_sq) + " but brute force found " + str(brute_segment) + " at " + str(brute_distance_sq)
+
+		print("nearest_segment: same as brute force for", len(points), "points,", len(positions) - 1, "segments,", grid.cells_x, "x", grid.cells_z, "cells")
+
+CHECKS = {
+	'weld': check_weld,
+	'parallel': check_parallel,
+	'ground_grid': check_ground_grid,
+	'nearest_segment': check_nearest_segment
+}
+
+def main():
+	names = sys.argv[1:] or list(CHECKS)
+
+	for name in names:
+		assert name in CHECKS, "Unknown check " + name + ", one of " + ", ".join(CHECKS)
+		CHECKS[name]()
+
+	print("All passed")
+
+# The worker processes import this module again, only the main process runs the checks
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,267 @@
+import sys
+import types
+import numpy as np
+
+# A stand in for the parts of bpy, bpy_extras and mathutils the exporter touches, so the level exporter can run in a
+# plain Python for benchmarking. install() puts the fake modules in sys.modules, it has to be called before kart_guys is
+# imported. The objects only have what the exporter reads: the kg_ properties, parent and children, collection
+# instancing, matrix_world and matrix_local, and mesh data with loop_triangles, color_attributes and the kg_emissive
+# attribute that foreach_get fills the same way Blender does. Nothing is evaluated, evaluated_get returns the object
+# itself.
+
+class Matrix:
+	# 4x4 like mathutils.Matrix, row major
+	def __init__(self, rows=None):
+		self.rows = np.identity(4) if rows is None else np.array(rows, dtype=np.float64).reshape(4, 4)
+
+	def __matmul__(self, other):
+		if isinstance(other, Matrix):
+			return Matrix(self.rows @ other.rows)
+
+		# A 3d point, extended with w = 1
+		return Vector(self.rows[:3, :3] @ np.asarray(other, dtype=np.float64) + self.rows[:3, 3])
+
+	def __array__(self, dtype=None, copy=None):
+		return self.rows.astype(dtype) if dtype is not None else self.rows
+
+	def __getitem__(self, i):
+		return self.rows[i]
+
+	def __len__(self):
+		return 4
+
+	def to_translation(self):
+		return Vector(self.rows[:3, 3])
+
+	def to_scale(self):
+		return Vector(np.linalg.norm(self.rows[:3, :3], axis=0))
+
+	def to_quaternion(self):
+		# w, x, y, z like mathutils.Quaternion
+		m = self.rows[:3, :3] / self.to_scale()
+		trace = m[0, 0] + m[1, 1] + m[2, 2]
+
+		if trace > 0:
+			s = np.sqrt(trace + 1.0) * 2
+			return (s / 4, (m[2, 1] - m[1, 2]) / s, (m[0, 2] - m[2, 0]) / s, (m[1, 0] - m[0, 1]) / s)
+		elif m[0, 0] > m[1, 1] and m[0, 0] > m[2, 2]:
+			s = np.sqrt(1.0 + m[0, 0] - m[1, 1] - m[2, 2]) * 2
+			return ((m[2, 1] - m[1, 2]) / s, s / 4, (m[0, 1] + m[1, 0]) / s, (m[0, 2] + m[2, 0]) / s)
+		elif m[1, 1] > m[2, 2]:
+			s = np.sqrt(1.0 + m[1, 1] - m[0, 0] - m[2, 2]) * 2
+			return ((m[0, 2] - m[2, 0]) / s, (m[0, 1] + m[1, 0]) / s, s / 4, (m[1, 2] + m[2, 1]) / s)
+		else:
+			s = np.sqrt(1.0 + m[2, 2] - m[0, 0] - m[1, 1]) * 2
+			return ((m[1, 0] - m[0, 1]) / s, (m[0, 2] + m[2, 0]) / s, (m[1, 2] + m[2, 1]) / s, s / 4)
+
+def trs_matrix(position=(0, 0, 0), angle_z=0.0, scale=(1, 1, 1)):
+	c, s = np.cos(angle_z), np.sin(angle_z)
+	rows = np.identity(4)
+	rows[:3, :3] = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]]) @ np.diag(scale)
+	rows[:3, 3] = position
+	return Matrix(rows)
+
+class Vector(tuple):
+	def __new__(cls, values):
+		return super().__new__(cls, (float(v) for v in values))
+
+	@property
+	def x(self):
+		return self[0]
+
+	@property
+	def y(self):
+		return self[1]
+
+	@property
+	def z(self):
+		return self[2]
+
+class PropertyArray:
+	# A bpy_prop_collection that does len, foreach_get and, slowly, indexing and iterating like the old per element code
+	# did. Float vector properties of the elements are Vectors, int ones tuples and the rest plain Python values.
+	def __init__(self, length, values):
+		self.length = length
+		self.values = values # name -> array with length rows
+
+	def __len__(self):
+		return self.length
+
+	def __getitem__(self, i):
+		if not 0 <= i < self.length:
+			raise IndexError(i)
+
+		element = types.SimpleNamespace()
+
+		for name, values in self.values.items():
+			value = np.asarray(values)[i]
+
+			if value.ndim == 0:
+				value = value.item()
+			elif value.dtype.kind == 'f':
+				value = Vector(value)
+			else:
+				value = tuple(value.tolist())
+
+			setattr(element, name, value)
+
+		return element
+
+	def __iter__(self):
+		return (self[i] for i in range(self.length))
+
+	def foreach_get(self, name, out):
+		out[...] = np.asarray(self.values[name]).reshape(out.shape)
+
+class ColorAttribute:
+	def __init__(self, colors):
+		self.name = "Color"
+		self.domain = 'CORNER'
+		self.data = PropertyArray(len(colors), { 'color': colors })
+
+class ColorAttributes:
+	def __init__(self, active_color):
+		self.active_color = active_color
+
+class BooleanAttribute:
+	def __init__(self, name, values):
+		self.name = name
+		self.domain = 'FACE'
+		self.data_type = 'BOOLEAN'
+		self.data = PropertyArray(len(values), { 'value': values })
+
+class Mesh:
+	# positions is (v, 3), triangles (t, 3). Every triangle is its own polygon and every corner its own loop.
+	def __init__(self, name, positions, triangles, colors=None, emissive=None):
+		positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+		triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+		corners = positions[triangles]
+		normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+		lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+
+		self.name = name
+		self.name_full = name
+		self.vertices = PropertyArray(len(positions), { 'co': positions })
+		self.loop_triangles = PropertyArray(len(triangles), {
+			'vertices': triangles,
+			'loops': np.arange(triangles.size, dtype=np.int32).reshape(-1, 3),
+			'normal': (normals / np.where(lengths > 0, lengths, 1)).astype(np.float32),
+			'polygon_index': np.arange(len(triangles), dtype=np.int32)
+		})
+		self.color_attributes = ColorAttributes(ColorAttribute(colors) if colors is not None else None)
+		self.attributes = [BooleanAttribute("kg_emissive", emissive)] if emissive is not None else []
+
+	def calc_loop_triangles(self):
+		pass
+
+class BezierPoint:
+	def __init__(self, co, handle_left, handle_right):
+		self.co = Vector(co)
+		self.handle_left = Vector(handle_left)
+		self.handle_right = Vector(handle_right)
+
+class Spline:
+	def __init__(self, bezier_points):
+		self.bezier_points = bezier_points
+
+class Curve:
+	def __init__(self, name, splines):
+		self.name = name
+		self.name_full = name
+		self.splines = splines
+
+class Object:
+	def __init__(self, name, kg_type='none', data=None, parent=None, matrix_local=None, **properties):
+		self.name = name
+		self.name_full = name
+		self.data = data
+		self.kg_type = kg_type
+		self.kg_rta_type = 'none'
+		self.kg_shared_ignore = False
+		self.kg_hull_type = 'box'
+		self.kg_rigid_body_mass = 1.0
+		self.kg_rigid_body_collision_exclude = False
+		self.kg_rigid_body_status_effect = 'none'
+		self.kg_oil_slick_particles_count = 10
+		self.instance_collection = None
+		self.vertex_groups = []
+		self.parent = parent
+		self.children = []
+		self.matrix_local = matrix_local if matrix_local is not None else Matrix()
+		self.dimensions = Vector((2, 2, 2))
+
+		for property_name, value in properties.items():
+			assert hasattr(self, property_name), "Unknown object property " + property_name
+			setattr(self, property_name, value)
+
+		if parent is not None:
+			parent.children.append(self)
+
+	@property
+	def matrix_world(self):
+		if self.parent is None:
+			return self.matrix_local
+
+		return self.parent.matrix_world @ self.matrix_local
+
+	def evaluated_get(self, depsgraph):
+		return self
+
+class Collection:
+	def __init__(self, objects):
+		self.objects = objects
+
+class Scene:
+	def __init__(self, objects):
+		self.objects = objects
+
+class Depsgraph:
+	def __init__(self, objects):
+		self.scene = Scene(objects)
+
+class Context:
+	def __init__(self, depsgraph: Depsgraph):
+		self.depsgraph = depsgraph
+
+	def evaluated_depsgraph_get(self):
+		return self.depsgraph
+
+class Meshes:
+	def new_from_object(self, object: Object):
+		return object.data
+
+def placeholder_module(name):
+	# Any name looked up in it is a new empty class, made once, like the bpy.types the addon only uses for annotations
+	# and base classes
+	module = types.ModuleType(name)
+	classes = {}
+
+	def __getattr__(attribute):
+		if attribute.startswith("__"):
+			raise AttributeError(attribute)
+
+		return classes.setdefault(attribute, type(attribute, (), {}))
+
+	module.__getattr__ = __getattr__
+	return module
+
+def install():
+	bpy = types.ModuleType("bpy")
+	bpy.types = placeholder_module("bpy.types")
+	bpy.props = types.ModuleType("bpy.props")
+	bpy.data = types.SimpleNamespace(meshes=Meshes())
+	bpy.utils = types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None)
+
+	# The operator properties are just evaluated when the addon's classes are made
+	for property_type in ("BoolProperty", "IntProperty", "FloatProperty", "StringProperty", "EnumProperty"):
+		setattr(bpy.props, property_type, lambda **kwargs: None)
+
+	bpy_extras = types.ModuleType("bpy_extras")
+	bpy_extras.io_utils = types.ModuleType("bpy_extras.io_utils")
+	bpy_extras.io_utils.ExportHelper = type("ExportHelper", (), {})
+
+	sys.modules["bpy"] = bpy
+	sys.modules["bpy.types"] = bpy.types
+	sys.modules["bpy.props"] = bpy.props
+	sys.modules["bpy_extras"] = bpy_extras
+	sys.modules["bpy_extras.io_utils"] = bpy_extras.io_utils
@@ -0,0 +1,253 @@
+import sys
+import os
+import time
+import random
+import tracemalloc
+import numpy as np
+
+# Benchmarks for the scene graph on synthetic scenes made of the fake Blender objects in fake_bpy.py.
+#
+# index: times building the scene graph index against the old way of every exporter section doing its own breadth
+# first search with list.pop(0). Checks both find the same w_objects.
+#
+# instancing: measures the time and memory to build the graph of a track made of kits instanced inside of kits,
+# against the old dict backed WObject that worked out every unique name and final world matrix up front.
+#
+#	python scene_graph_benchmark.py index [nodes count]
+#	python scene_graph_benchmark.py instancing [depth] [instances per level]
+
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIRECTORY)
+sys.path.insert(0, os.path.join(BENCHMARKS_DIRECTORY, "..", "addons"))
+
+import fake_bpy
+from kart_guys import scene_graph
+
+KG_TYPES = ['none', 'inanimate', 'ground_collision_mesh', 'ground_collision_mesh_and_inanimate', 'oil_slick', 'bumper', 'boost_jet', 'ai_spawn_point']
+
+def create_objects(nodes_count):
+	# A few hundred roots with props, hulls and rigid body islands hanging off of them
+	rng = random.Random(0)
+	objects = []
+	parents = []
+
+	while len(objects) < nodes_count:
+		i = len(objects)
+		parent = rng.choice(parents) if parents and rng.random() < 0.9 else None
+
+		if rng.random() < 0.02:
+			kg_type = 'rigid_body_island'
+		elif parent is not None and parent.kg_type == 'rigid_body_island':
+			kg_type = 'rigid_body'
+		elif parent is not None and rng.random() < 0.3:
+			kg_type = 'hull'
+		else:
+			kg_type = rng.choice(KG_TYPES)
+
+		object = fake_bpy.Object("object_" + str(i), kg_type, parent=parent)
+		objects.append(object)
+
+		if kg_type != 'hull':
+			parents.append(object)
+	
+	return objects
+
+def old_search_many(roots, kg_types):
+	w_objects = []
+	to_visit = roots.copy()
+
+	while to_visit:
+		w_object = to_visit.pop(0)
+		to_visit.extend(w_object.children_w_objects)
+
+		if w_object.object.kg_type in kg_types:
+			w_objects.append(w_object)
+	
+	return w_objects
+
+def old_islands(roots):
+	islands = []
+	to_visit = roots.copy()
+
+	while to_visit:
+		w_object = to_visit.pop(0)
+
+		if w_object.object.kg_type == 'rigid_body_island':
+			rigid_bodies = []
+			to_visit_in_island = list(w_object.children_w_objects)
+
+			while to_visit_in_island:
+				w_object_in_island = to_visit_in_island.pop(0)
+				to_visit_in_island.extend(w_object_in_island.children_w_objects)
+
+				if w_object_in_island.object.kg_type == 'rigid_body':
+					rigid_bodies.append(w_object_in_island)
+			
+			islands.append(rigid_bodies)
+		else:
+			to_visit.extend(w_object.children_w_objects)
+	
+	return islands
+
+# The kg_types each level exporter section looks for
+SECTIONS = [
+	('spawn_point',),
+	('ground_collision_mesh', 'ground_collision_mesh_and_inanimate'),
+	('inanimate', 'rigid_body', 'oil_slick', 'bumper', 'boost_jet', 'ground_collision_mesh_and_inanimate'),
+	('inanimate', 'ground_collision_mesh_and_inanimate'),
+	('oil_slick',),
+	('bumper',),
+	('boost_jet',),
+	('ai_path_left',),
+	('ai_path_right',),
+	('ai_spawn_point',)
+]
+
+def benchmark_index(nodes_count):
+	depsgraph = fake_bpy.Depsgraph(create_objects(nodes_count))
+
+	start = time.perf_counter()
+	graph = scene_graph.create_scene_graph(depsgraph)
+	build_time = time.perf_counter() - start
+
+	start = time.perf_counter()
+	new_results = [graph.of_kg_types(*kg_types) for kg_types in SECTIONS]
+	new_islands = [graph.island_rigid_bodies.get(island, []) for island in graph.islands()]
+	query_time = time.perf_counter() - start
+
+	start = time.perf_counter()
+	old_results = [old_search_many(graph.roots, kg_types) for kg_types in SECTIONS]
+	old_island_results = old_islands(graph.roots)
+	old_time = time.perf_counter() - start
+
+	assert new_results == old_results
+	assert new_islands == old_island_results
+
+	print("Nodes:", len(graph.w_objects))
+	print("Build graph and index: %.3f s" % build_time)
+	print("Indexed queries:       %.3f s" % query_time)
+	print("Old pop(0) searches:   %.3f s" % old_time)
+
+def create_instancing_scene(depth, instances_per_level):
+	# A kit of a few props, instanced instances_per_level times by a bigger kit, and so on depth times
+	objects = [fake_bpy.Object("prop_%d" % i, 'inanimate') for i in range(4)]
+	collection = fake_bpy.Collection(objects)
+
+	for level in range(depth):
+		instancers = []
+
+		for i in range(instances_per_level):
+			instancer = fake_bpy.Object("kit_%d_%d" % (level, i), 'none', matrix_local=fake_bpy.trs_matrix((i, 0, 0)), instance_collection=collection)
+			instancers.append(instancer)
+		
+		collection = fake_bpy.Collection(instancers + [fake_bpy.Object("kit_%d_floor" % level, 'inanimate')])
+	
+	return fake_bpy.Depsgraph(collection.objects)
+
+# The WObject from before, every name and matrix worked out as the graph is built
+class OldWObject:
+	def __init__(self):
+		self.depth = None
+		self.parent_w_object = None
+		self.object = None
+		self.children_w_objects = []
+		self.instance_w_object = None
+		self.unique_name = None
+		self.final_world_matrix = None
+
+def old_create_scene_graph(depsgraph):
+	graph = []
+
+	for object in depsgraph.scene.objects:
+		if object.parent is None:
+			root_w_object = OldWObject()
+			root_w_object.depth = 0
+			root_w_object.object = object
+			root_w_object.unique_name = object.name_full
+			root_w_object.final_world_matrix = object.matrix_world
+			graph.append(root_w_object)
+	
+	w_objects_to_process = graph.copy()
+
+	while w_objects_to_process:
+		w_object = w_objects_to_process.pop()
+		object = w_object.object
+		instance_collection = object.instance_collection
+
+		if instance_collection is None:
+			child_objects = object.children
+		else:
+			child_objects = [child_object for child_object in instance_collection.objects if child_object.parent is None]
+
+		for child_object in child_objects:
+			child_w_object = OldWObject()
+			child_w_object.depth = w_object.depth + 1
+			child_w_object.parent_w_object = w_object
+			child_w_object.object = child_object
+
+			if instance_collection is None:
+				child_w_object.instance_w_object = w_object.instance_w_object
+			else:
+				child_w_object.instance_w_object = w_object
+			
+			if child_w_object.instance_w_object is None:
+				child_w_object.unique_name = child_object.name_full
+				child_w_object.final_world_matrix = child_object.matrix_world
+			else:
+				child_w_object.unique_name = child_w_object.instance_w_object.object.name_full + " -> " + child_object.name_full
+				child_w_object.final_world_matrix = child_w_object.instance_w_object.final_world_matrix @ child_object.matrix_world
+
+			w_object.children_w_objects.append(child_w_object)
+			w_objects_to_process.append(child_w_object)
+	
+	return graph
+
+def measure(func, *args):
+	tracemalloc.start()
+	start = time.perf_counter()
+	result = func(*args)
+	elapsed = time.perf_counter() - start
+	_, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return result, elapsed, peak
+
+def benchmark_instancing(depth, instances_per_level):
+	depsgraph = create_instancing_scene(depth, instances_per_level)
+
+	old_graph, old_time, old_peak = measure(old_create_scene_graph, depsgraph)
+	old_graph = None
+
+	graph, new_time, new_peak = measure(scene_graph.create_scene_graph, depsgraph)
+	nodes_count = len(graph.w_objects)
+
+	# What an export pays for the w_objects that actually get written
+	inanimate = graph.of_kg_types('inanimate')
+	_, matrices_time, matrices_peak = measure(lambda: [(w_object.unique_name, w_object.final_world_matrix) for w_object in inanimate])
+
+	# The lazy names and matrices come out the same as the ones worked out up front
+	pairs = list(zip(old_create_scene_graph(depsgraph), graph.roots))
+
+	while pairs:
+		old_w_object, w_object = pairs.pop()
+		assert old_w_object.unique_name == w_object.unique_name
+		assert np.array_equal(old_w_object.final_world_matrix, w_object.final_world_matrix)
+		assert len(old_w_object.children_w_objects) == len(w_object.children_w_objects)
+		pairs.extend(zip(old_w_object.children_w_objects, w_object.children_w_objects))
+
+	print("Nodes:", nodes_count)
+	print("Old graph:                 %.3f s, %.1f MB peak, %d bytes per node" % (old_time, old_peak / 1e6, old_peak // nodes_count))
+	print("New graph and index:       %.3f s, %.1f MB peak, %d bytes per node" % (new_time, new_peak / 1e6, new_peak // nodes_count))
+	print("Names and matrices of %d inanimate: %.3f s, %.1f MB" % (len(inanimate), matrices_time, matrices_peak / 1e6))
+
+def main():
+	mode = sys.argv[1] if len(sys.argv) > 1 else 'index'
+
+	if mode == 'index':
+		benchmark_index(int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
+	elif mode == 'instancing':
+		benchmark_instancing(int(sys.argv[2]) if len(sys.argv) > 2 else 4, int(sys.argv[3]) if len(sys.argv) > 3 else 16)
+	else:
+		assert False, "Unknown benchmark " + mode
+
+if __name__ == '__main__':
+	main()
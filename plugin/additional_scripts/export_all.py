@@ -0,0 +1,269 @@
+import sys
+import os
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+import concurrent.futures
+
+# Exports every track, the runtime assets and the car without opening Blender's UI. Reads a manifest of blend file ->
+# output jobs, runs each job in its own background Blender process, a few at a time, and skips the jobs whose outputs are
+# up to date. Run it with Blender, or with a plain Python as long as it can find Blender:
+#
+#	blender --background --python export_all.py -- [manifest] [--jobs N] [--force] [--only NAME ...]
+#	python export_all.py [manifest] --blender path/to/blender
+#
+# The manifest is JSON, the paths are relative to the manifest:
+#
+#	{ "jobs": [ { "blend": "track_1.blend", "output": "../res/tracks/track_1.kgl", "type": "level", "options": { ... } } ] }
+#
+# type is level, runtime_assets or car. options are the same as the exporter operator's, see the ExportOptions in
+# level.py, runtime_assets.py and car.py. depends is an optional list of other files the job reads, like linked
+# libraries, that make it out of date when they change.
+#
+# A job is up to date when its output exists and the hash of its blend file, its depends, its options and the exporter's
+# source all match the last successful export, which are kept in the stamps file next to the manifest. The hashes are
+# only worked out again for the files whose size or modification time changed.
+
+SCRIPT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+ADDONS_DIRECTORY = os.path.join(SCRIPT_DIRECTORY, "addons")
+EXPORTER_DIRECTORY = os.path.join(ADDONS_DIRECTORY, "kart_guys")
+DEFAULT_MANIFEST = os.path.join(SCRIPT_DIRECTORY, "..", "..", "blender", "export_manifest.json")
+
+JOB_TYPES = ['level', 'runtime_assets', 'car']
+
+# The worker prints this followed by a JSON result as its last line of output
+RESULT_MARKER = "KART_GUYS_EXPORT_RESULT "
+
+try:
+	import bpy
+except ModuleNotFoundError:
+	bpy = None
+
+def script_arguments():
+	# Blender passes everything after -- on to the script
+	if "--" in sys.argv:
+		return sys.argv[sys.argv.index("--") + 1:]
+
+	return [] if bpy is not None else sys.argv[1:]
+
+# Worker, runs inside the background Blender that has the job's blend file open
+
+def run_worker(job):
+	sys.path.insert(0, ADDONS_DIRECTORY)
+	import kart_guys
+	from kart_guys import level, runtime_assets, car
+
+	# The kg_ properties of the objects are only there once the addon is registered
+	kart_guys.register()
+
+	module = { 'level': level, 'runtime_assets': runtime_assets, 'car': car }[job['type']]
+	options = module.ExportOptions(job['output'], **job.get('options', {}))
+
+	start = time.perf_counter()
+	module.export(options, bpy.context)
+	export_time = time.perf_counter() - start
+
+	print(RESULT_MARKER + json.dumps({ 'export_time': export_time }), flush=True)
+
+# Coordinator
+
+class Job:
+	def __init__(self, manifest_directory, entry):
+		assert entry.get('type') in JOB_TYPES, "Unknown job type " + str(entry.get('type'))
+		self.type = entry['type']
+		self.blend = os.path.normpath(os.path.join(manifest_directory, entry['blend']))
+		self.output = os.path.normpath(os.path.join(manifest_directory, entry['output']))
+		self.options = entry.get('options', {})
+		self.depends = [os.path.normpath(os.path.join(manifest_directory, path)) for path in entry.get('depends', [])]
+		self.name = entry.get('name', os.path.basename(self.output))
+
+def read_manifest(path):
+	with open(path, 'r') as file:
+		manifest = json.load(file)
+
+	directory = os.path.dirname(os.path.abspath(path))
+	jobs = [Job(directory, entry) for entry in manifest['jobs']]
+	names = [job.name for job in jobs]
+	assert len(set(names)) == len(names), "Job names have to be unique"
+
+	return jobs
+
+class Hasher:
+	# Hashes files, reusing the hashes from the stamps file for the files whose size and modification time haven't changed
+	def __init__(self, known):
+		self.known = known # path -> [size, mtime_ns, hash]
+		self.hashes = {}
+
+	def file_hash(self, path):
+		if path in self.hashes:
+			return self.hashes[path][2]
+
+		stat = os.stat(path)
+		known = self.known.get(path)
+
+		if known is not None and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+			digest = known[2]
+		else:
+			sha = hashlib.sha256()
+
+			with open(path, 'rb') as file:
+				for block in iter(lambda: file.read(1 << 20), b""):
+					sha.update(block)
+
+			digest = sha.hexdigest()
+
+		self.hashes[path] = [stat.st_size, stat.st_mtime_ns, digest]
+		return digest
+
+	def exporter_hash(self):
+		sha = hashlib.sha256()
+
+		for name in sorted(os.listdir(EXPORTER_DIRECTORY)):
+			if name.endswith(".py"):
+				sha.update(name.encode('utf-8'))
+				sha.update(self.file_hash(os.path.join(EXPORTER_DIRECTORY, name)).encode('utf-8'))
+
+		return sha.hexdigest()
+
+	def job_key(self, job: Job, exporter_hash):
+		sha = hashlib.sha256()
+		sha.update(exporter_hash.encode('utf-8'))
+		sha.update(job.type.encode('utf-8'))
+		sha.update(json.dumps(job.options, sort_keys=True).encode('utf-8'))
+
+		for path in [job.blend] + job.depends:
+			sha.update(self.file_hash(path).encode('utf-8'))
+
+		return sha.hexdigest()
+
+def read_stamps(path):
+	if not os.path.exists(path):
+		return { 'files': {}, 'jobs': {} }
+
+	with open(path, 'r') as file:
+		return json.load(file)
+
+def write_stamps(path, stamps):
+	with open(path + ".tmp", 'w') as file:
+		json.dump(stamps, file, indent='\t', sort_keys=True)
+
+	os.replace(path + ".tmp", path)
+
+def find_blender(argument):
+	if argument is not None:
+		return argument
+
+	if bpy is not None:
+		return bpy.app.binary_path
+
+	return "blender"
+
+def run_job(blender, job: Job, use_parallel):
+	# Starts a background Blender with the blend file open that runs this script as a worker
+	worker_job = { 'type': job.type, 'output': job.output, 'options': dict(job.options) }
+
+	# The workers already run side by side, another process pool in each of them would just fight over the cores
+	if not use_parallel and job.type == 'level':
+		worker_job['options'].setdefault('use_parallel', False)
+
+	command = [blender, "--background", "--factory-startup", job.blend, "--python-exit-code", "1", "--python", os.path.abspath(__file__), "--", "--worker", json.dumps(worker_job)]
+
+	start = time.perf_counter()
+	process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors='replace')
+	total_time = time.perf_counter() - start
+
+	result = None
+
+	for line in process.stdout.splitlines():
+		if line.startswith(RESULT_MARKER):
+			result = json.loads(line[len(RESULT_MARKER):])
+
+	# The result line is what says the export got to the end
+	ok = process.returncode == 0 and result is not None
+	export_time = result['export_time'] if result is not None else None
+
+	return ok, total_time, export_time, process.stdout
+
+def coordinate(arguments):
+	manifest_path = os.path.abspath(arguments.manifest)
+	stamps_path = manifest_path + ".stamps"
+	jobs = read_manifest(manifest_path)
+
+	if arguments.only:
+		jobs = [job for job in jobs if job.name in arguments.only]
+
+	stamps = read_stamps(stamps_path)
+	hasher = Hasher(stamps['files'])
+	exporter_hash = hasher.exporter_hash()
+
+	to_run = []
+	keys = {}
+
+	for job in jobs:
+		keys[job.name] = hasher.job_key(job, exporter_hash)
+
+		if not arguments.force and os.path.exists(job.output) and stamps['jobs'].get(job.name) == keys[job.name]:
+			print("Up to date:", job.name)
+		else:
+			to_run.append(job)
+
+	blender = find_blender(arguments.blender)
+	results = []
+	start = time.perf_counter()
+
+	with concurrent.futures.ThreadPoolExecutor(max_workers=max(arguments.jobs, 1)) as executor:
+		futures = { executor.submit(run_job, blender, job, arguments.jobs <= 1): job for job in to_run }
+
+		for future in concurrent.futures.as_completed(futures):
+			job = futures[future]
+			ok, total_time, export_time, output = future.result()
+			results.append((job, ok, total_time, export_time))
+
+			if ok:
+				print("Exported %s in %.2f s" % (job.name, total_time))
+				stamps['jobs'][job.name] = keys[job.name]
+			else:
+				print("FAILED %s after %.2f s, the end of its output:" % (job.name, total_time))
+				print("\n".join(output.splitlines()[-40:]))
+
+	wall_time = time.perf_counter() - start
+
+	# Merged so an --only run keeps the hashes of the files it didn't look at
+	stamps['files'].update(hasher.hashes)
+	write_stamps(stamps_path, stamps)
+
+	print()
+	print("%-28s %-8s %10s %10s" % ("Job", "Result", "Total", "Export"))
+
+	for job, ok, total_time, export_time in sorted(results, key=lambda result: result[0].name):
+		export_text = "%9.2fs" % export_time if export_time is not None else "-"
+		print("%-28s %-8s %9.2fs %10s" % (job.name, "ok" if ok else "FAILED", total_time, export_text))
+
+	skipped = len(jobs) - len(to_run)
+	failed = sum(1 for result in results if not result[1])
+	print("%d exported, %d up to date, %d failed in %.2f s with %d workers" % (len(results) - failed, skipped, failed, wall_time, arguments.jobs))
+
+	return failed == 0
+
+def main():
+	parser = argparse.ArgumentParser(prog="export_all.py", description="Exports the Kart Guys tracks, runtime assets and car headlessly")
+	parser.add_argument("manifest", nargs='?', default=DEFAULT_MANIFEST)
+	parser.add_argument("--jobs", "-j", type=int, default=max((os.cpu_count() or 2) // 2, 1), help="Blender processes to run at once")
+	parser.add_argument("--force", action='store_true', help="Export every job even if it's up to date")
+	parser.add_argument("--only", nargs='+', help="Only the jobs with these names")
+	parser.add_argument("--blender", help="Blender executable for the workers, defaults to the one running this")
+	parser.add_argument("--worker", help=argparse.SUPPRESS)
+	arguments = parser.parse_args(script_arguments())
+
+	if arguments.worker is not None:
+		assert bpy is not None, "Workers have to run inside Blender"
+		run_worker(json.loads(arguments.worker))
+		return
+
+	ok = coordinate(arguments)
+	sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+	main()
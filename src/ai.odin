@@ -15,11 +15,32 @@ AI :: struct {
 	elapsed_time: f32,
 	left_path: [dynamic]Curve,
 	right_path: [dynamic]Curve,
+	left_table: Path_Table,
+	right_table: Path_Table,
 }
 
 Curve :: struct {
 	p0, p1, p2, p3: linalg.Vector3f32,
-	length: f32,
+}
+
+// Arc length parameterization of a path baked by the exporter, see ai_path.py. Each curve is sampled at
+// samples_per_curve evenly spaced t's, sample k is at curve k / samples_per_curve and t = (k % samples_per_curve) /
+// samples_per_curve. The last sample is the end of the last curve.
+Path_Table :: struct {
+	samples_per_curve: int,
+	lengths: [dynamic]f32, // Length along the path up to each sample
+	positions: [dynamic]linalg.Vector3f32,
+	grid: Path_Grid,
+}
+
+// Uniform grid over the xz bounds of the segments between the samples, segment k goes from sample k to k + 1. The
+// segments in cell (x, z) are cell_segments[cell_offsets[c]:cell_offsets[c + 1]] where c = z * cells_x + x.
+Path_Grid :: struct {
+	origin: [2]f32, // Min x and z
+	cell_size: f32,
+	cells_x, cells_z: int,
+	cell_offsets: [dynamic]u32,
+	cell_segments: [dynamic]u32,
 }
 
 Zone :: struct {
@@ -30,23 +51,44 @@ Zone :: struct {
 
 RAY_COUNT :: 8;
 
-calculate_curve_lengths :: proc(curves: []Curve) {
-	INC :: 100;
+// Length along the path at t on the curve
+path_length_at :: proc(table: ^Path_Table, curve_index: int, t: f32) -> f32 {
+	k := (f32(curve_index) + t) * f32(table.samples_per_curve);
+	k = clamp(k, 0, f32(len(table.lengths) - 1));
+	i := min(int(k), len(table.lengths) - 2);
+	fraction := k - f32(i);
 
-	for &curve in curves {
-		total_len: f32 = 0;
-		p0 := curve.p0;
-		p1: linalg.Vector3f32;
+	return table.lengths[i] + (table.lengths[i + 1] - table.lengths[i]) * fraction;
+}
 
-		for i in 1..<INC {
-			t := f32(i) / (INC - 1);
-			p1 = find_point_on_curve(&curve, t);
-			total_len += linalg.length(p1 - p0);
-			p0 = p1;
-		}
+// Curve and t at a length along the path with a binary search. The path is a loop so the length wraps around.
+path_param_at_length :: proc(table: ^Path_Table, length: f32) -> (int, f32) {
+	total_length := table.lengths[len(table.lengths) - 1];
+	s := math.mod(length, total_length);
 
-		curve.length = total_len;
+	if s < 0 {
+		s += total_length;
+	}
+
+	// Last sample with a length <= s
+	low, high := 0, len(table.lengths) - 2;
+
+	for low < high {
+		mid := (low + high + 1) / 2;
+
+		if table.lengths[mid] <= s {
+			low = mid;
+		} else {
+			high = mid - 1;
+		}
 	}
+
+	interval := table.lengths[low + 1] - table.lengths[low];
+	fraction := interval > 0 ? (s - table.lengths[low]) / interval : 0;
+	u := (f32(low) + fraction) / f32(table.samples_per_curve);
+	curve_index := min(int(u), len(table.lengths) / table.samples_per_curve - 1);
+
+	return curve_index, u - f32(curve_index);
 }
 
 ai_signal_update_if_ready :: proc(ai: ^AI, dt: f32) {
@@ -70,6 +112,15 @@ ai_debug_cleanup :: proc(ai: ^AI) {
 	
 	delete(ai.left_path);
 	delete(ai.right_path);
+	delete_path_table(&ai.left_table);
+	delete_path_table(&ai.right_table);
+}
+
+delete_path_table :: proc(table: ^Path_Table) {
+	delete(table.lengths);
+	delete(table.positions);
+	delete(table.grid.cell_offsets);
+	delete(table.grid.cell_segments);
 }
 
 ai_update_players :: proc(scene: rawptr) {
@@ -80,13 +131,13 @@ ai_update_players :: proc(scene: rawptr) {
 		sync.sema_wait(&ai.semaphore);
 		
 		for lookup in scene.all_players[1:] {
-			update_player(lookup, ai.left_path[:], ai.right_path[:], &scene.entity_grid);
+			update_player(lookup, ai, &scene.entity_grid);
 		}
 	}
 }
 
 @(private = "file")
-update_player :: proc(player_lookup: Entity_Lookup, left_path, right_path: []Curve, entity_grid: ^Entity_Grid) {
+update_player :: proc(player_lookup: Entity_Lookup, ai: ^AI, entity_grid: ^Entity_Grid) {
 	car := get_entity(player_lookup).variant.(^Car_Entity);
 
 	if car.surface_normal == 0 {
@@ -100,7 +151,7 @@ update_player :: proc(player_lookup: Entity_Lookup, left_path, right_path: []Cur
 	car.origin = origin;
 
 	// Find extended point
-	target_point, sharpness := find_target_point_on_path(origin, left_path, right_path, car);
+	target_point, sharpness := find_target_point_on_path(origin, ai, car);
 
 	MAX_ANGLE :: 0.8;
 	
@@ -439,15 +490,18 @@ ai_show_helpers :: proc(ai_players: []Entity_Lookup) {
 }
 
 @(private = "file")
-find_target_point_on_path :: proc(origin: linalg.Vector3f32, left_path, right_path: []Curve, player: ^Car_Entity) -> (linalg.Vector3f32, f32) {
-	closest_left_curve_index, closest_left_t, closest_left_point := find_closest_point_on_curve(origin, left_path, player.left_segment);
-	closest_right_curve_index, closest_right_t, closest_right_point := find_closest_point_on_curve(origin, right_path, player.right_segment);
+find_target_point_on_path :: proc(origin: linalg.Vector3f32, ai: ^AI, player: ^Car_Entity) -> (linalg.Vector3f32, f32) {
+	left_path, right_path := ai.left_path[:], ai.right_path[:];
+	left_table, right_table := &ai.left_table, &ai.right_table;
+
+	closest_left_curve_index, closest_left_t, closest_left_point, closest_left_segment := find_closest_point_on_curve(origin, left_table, player.left_segment);
+	closest_right_curve_index, closest_right_t, closest_right_point, closest_right_segment := find_closest_point_on_curve(origin, right_table, player.right_segment);
 
-	player.left_segment = closest_left_curve_index;
-	player.right_segment = closest_right_curve_index;
+	player.left_segment = closest_left_segment;
+	player.right_segment = closest_right_segment;
 
-	extended_left_curve_index, extended_left_t, extended_left_point := move_point_down_path(left_path, closest_left_curve_index, closest_left_t, 15);
-	extended_right_curve_index, extended_right_t, extended_right_point := move_point_down_path(right_path, closest_right_curve_index, closest_right_t, 15);
+	extended_left_curve_index, extended_left_t, extended_left_point := move_point_down_path(left_path, left_table, closest_left_curve_index, closest_left_t, 15);
+	extended_right_curve_index, extended_right_t, extended_right_point := move_point_down_path(right_path, right_table, closest_right_curve_index, closest_right_t, 15);
 
 	// Calculate the target point
 	target_point := extended_left_point + (extended_right_point - extended_left_point) * player.center_multiplier;
@@ -456,8 +510,8 @@ find_target_point_on_path :: proc(origin: linalg.Vector3f32, left_path, right_pa
 	sharpness: f32;
 
 	{
-		_, _, end_left_point := move_point_down_path(left_path, closest_left_curve_index, closest_left_t, 30);
-		_, _, end_right_point := move_point_down_path(right_path, closest_right_curve_index, closest_right_t, 30);
+		_, _, end_left_point := move_point_down_path(left_path, left_table, closest_left_curve_index, closest_left_t, 30);
+		_, _, end_right_point := move_point_down_path(right_path, right_table, closest_right_curve_index, closest_right_t, 30);
 
 		closest_dir := linalg.normalize(closest_right_point - closest_left_point);
 		end_dir := linalg.normalize(end_right_point - end_left_point);
@@ -477,57 +531,117 @@ find_target_point_on_path :: proc(origin: linalg.Vector3f32, left_path, right_pa
 	return target_point, sharpness;
 }
 
-// #todo: Make this more efficient
-// We'll want to be careful with this prev_segment stuff. It makes finding the closest point no long a global search which
-// may be an issue when players get knocked out of bounds.
-find_closest_point_on_curve :: proc(origin: linalg.Vector3f32, path: []Curve, prev_segment: int) -> (int, f32, linalg.Vector3f32) {
-	closest_curve_index: int;
-	closest_t: f32;
+// How far around the car's previous segment the closest point is looked for, and how close that has to be to be used
+AI_PATH_HINT_SEGMENTS_BEHIND :: 2;
+AI_PATH_HINT_SEGMENTS_AHEAD :: 32;
+AI_PATH_HINT_MAX_DISTANCE :: 10;
+
+// Finds the closest point on the path to origin, returns its curve, t, point and segment. With a previous segment it
+// looks forward from it first so the car keeps following the same part of the track where it crosses or passes close
+// to another part. The grid search is only used without one (spawn, respawn) or when the car is too far from it, like
+// after getting knocked off the track.
+find_closest_point_on_curve :: proc(origin: linalg.Vector3f32, table: ^Path_Table, prev_segment: Maybe(int)) -> (int, f32, linalg.Vector3f32, int) {
+	closest_segment := -1;
+	closest_fraction: f32;
 	closest_point: linalg.Vector3f32;
 	closest_dist_sq := max(f32);
-	INC :: 50;
 
-	for i in prev_segment..<prev_segment + 3 {
-		curve_index := i % len(path);
-		curve := &path[curve_index];
-		
-		for j in 0..<INC {
-			t := f32(j) * 1 / (INC - 1);
-			p := find_point_on_curve(curve, t);
-			d_sq := linalg.length2(origin - p);
-			
+	if prev, ok := prev_segment.?; ok {
+		segments_count := len(table.positions) - 1;
+
+		for i in -AI_PATH_HINT_SEGMENTS_BEHIND..=AI_PATH_HINT_SEGMENTS_AHEAD {
+			segment := (prev + i) %% segments_count;
+			fraction, p, d_sq := closest_point_on_segment(origin, table, segment);
+
 			if d_sq < closest_dist_sq {
-				closest_t = t;
+				closest_segment = segment;
+				closest_fraction = fraction;
 				closest_point = p;
 				closest_dist_sq = d_sq;
-				closest_curve_index = curve_index;
 			}
 		}
+
+		if closest_dist_sq > AI_PATH_HINT_MAX_DISTANCE * AI_PATH_HINT_MAX_DISTANCE {
+			closest_segment = -1;
+		}
 	}
 
-	return closest_curve_index, closest_t, closest_point;
+	if closest_segment < 0 {
+		closest_segment, closest_fraction, closest_point = find_closest_segment_in_grid(origin, table);
+	}
+
+	closest_curve_index := closest_segment / table.samples_per_curve;
+	closest_t := (f32(closest_segment % table.samples_per_curve) + closest_fraction) / f32(table.samples_per_curve);
+
+	return closest_curve_index, closest_t, closest_point, closest_segment;
 }
 
-move_point_down_path :: proc(path: []Curve, curve_index: int, t, dist: f32) -> (int, f32, linalg.Vector3f32) {
-	curve := &path[curve_index];
-	extended_curve_index := curve_index;
-	extended_t := t + dist / curve.length;
+// Global search with the path's grid. Looks through rings of cells around origin's cell until the closest segment found
+// is nearer than any cell that hasn't been looked at, so it only checks a handful of segments.
+@(private = "file")
+find_closest_segment_in_grid :: proc(origin: linalg.Vector3f32, table: ^Path_Table) -> (int, f32, linalg.Vector3f32) {
+	grid := &table.grid;
+	cell_x := clamp(int(math.floor((origin.x - grid.origin[0]) / grid.cell_size)), 0, grid.cells_x - 1);
+	cell_z := clamp(int(math.floor((origin.z - grid.origin[1]) / grid.cell_size)), 0, grid.cells_z - 1);
+
+	closest_segment := -1;
+	closest_fraction: f32;
+	closest_point: linalg.Vector3f32;
+	closest_dist_sq := max(f32);
+
+	for ring in 0..<max(grid.cells_x, grid.cells_z) {
+		for z in cell_z - ring..=cell_z + ring {
+			for x in cell_x - ring..=cell_x + ring {
+				on_ring := abs(x - cell_x) == ring || abs(z - cell_z) == ring;
+
+				if !on_ring || x < 0 || x >= grid.cells_x || z < 0 || z >= grid.cells_z {
+					continue;
+				}
+
+				c := z * grid.cells_x + x;
 
-	if extended_t > 1 {
-		remaining_t := extended_t - 1;
-		remaining_len := remaining_t * curve.length;
+				for segment in grid.cell_segments[grid.cell_offsets[c]:grid.cell_offsets[c + 1]] {
+					fraction, p, d_sq := closest_point_on_segment(origin, table, int(segment));
 
-		next_curve_index := (extended_curve_index + 1) % len(path);
-		next_curve := &path[next_curve_index];
-		next_t := remaining_len / next_curve.length;
-		// assert(next_t <= 1); #todo
+					if d_sq < closest_dist_sq {
+						closest_segment = int(segment);
+						closest_fraction = fraction;
+						closest_point = p;
+						closest_dist_sq = d_sq;
+					}
+				}
+			}
+		}
+
+		// Anything in the cells further out is at least this far away
+		reach := f32(ring) * grid.cell_size;
 
-		extended_curve_index = next_curve_index;
-		extended_t = next_t;
+		if closest_segment >= 0 && closest_dist_sq <= reach * reach {
+			break;
+		}
 	}
 
-	extended_curve := &path[extended_curve_index];
-	extended_point := find_point_on_curve(extended_curve, extended_t);
+	assert(closest_segment >= 0);
+	return closest_segment, closest_fraction, closest_point;
+}
+
+// Fraction along the segment, point and squared distance of the point on the segment closest to origin
+@(private = "file")
+closest_point_on_segment :: proc(origin: linalg.Vector3f32, table: ^Path_Table, segment: int) -> (f32, linalg.Vector3f32, f32) {
+	a := table.positions[segment];
+	ab := table.positions[segment + 1] - a;
+	length_sq := linalg.length2(ab);
+	fraction := length_sq > 0 ? clamp(linalg.dot(origin - a, ab) / length_sq, 0, 1) : 0;
+	p := a + ab * fraction;
+
+	return fraction, p, linalg.length2(origin - p);
+}
+
+// Moves dist along the path using the baked lengths
+move_point_down_path :: proc(path: []Curve, table: ^Path_Table, curve_index: int, t, dist: f32) -> (int, f32, linalg.Vector3f32) {
+	length := path_length_at(table, curve_index, t) + dist;
+	extended_curve_index, extended_t := path_param_at_length(table, length);
+	extended_point := find_point_on_curve(&path[extended_curve_index], extended_t);
 
 	return extended_curve_index, extended_t, extended_point;
 }
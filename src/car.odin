@@ -480,4 +480,8 @@ respawn_player :: proc(car: ^Car_Entity, position: linalg.Vector3f32, orientatio
 
 	car.velocity = VEC3_ZERO;
 	car.angular_velocity = VEC3_ZERO;
+
+	// The AI path search starts over from wherever the car is now
+	car.left_segment = nil;
+	car.right_segment = nil;
 }
\ No newline at end of file
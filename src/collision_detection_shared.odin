@@ -60,6 +60,11 @@ furthest_point_hull :: proc(hull: ^Collision_Hull, direction: linalg.Vector3f32)
 
 		case .Mesh:
 			unimplemented();
+
+		case .Convex:
+			// The support of the transformed hull in a direction is the transformed support of the local hull in the transposed direction. The orientation
+			// alone isn't enough here because a non uniform scale changes which vertex is furthest.
+			point = convex_hull_support(&hull.convex, math2.matrix4_transform_direction(linalg.transpose(hull.global_transform), direction));
 	}
 
 	return math2.matrix4_transform_point(hull.global_transform, point);
@@ -327,6 +332,9 @@ find_plane_normal_and_polygon :: proc(hull: ^Collision_Hull, collision_normal: l
 
 		case .Mesh:
 			unimplemented();
+
+		case .Convex:
+			return convex_hull_find_face(hull, collision_normal);
 	}
 
 	plane_normal = linalg.normalize(math2.matrix4_transform_direction(hull.global_transform, plane_normal));
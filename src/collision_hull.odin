@@ -16,9 +16,31 @@ Collision_Hull :: struct {
 	global_bounds: math2.Box3f32,
 	indices: [dynamic]u16,
 	positions: [dynamic]f32,
+	convex: Convex_Hull,
 }
 
-Hull_Kind :: enum { Box, Cylinder, Sphere, Mesh }
+// Mesh is the triangle soup of the oil slicks, Convex is the convex hull of a mesh hull worked out by the exporter
+Hull_Kind :: enum { Box, Cylinder, Sphere, Mesh, Convex }
+
+// Everything is in the hull's local space. The vertices of face i are face_vertices[face_offsets[i]:face_offsets[i + 1]], counter clockwise looking at the
+// outside of the face. The vertices sharing an edge with vertex i are adjacency[adjacency_offsets[i]:adjacency_offsets[i + 1]].
+Convex_Hull :: struct {
+	vertices:          [dynamic]linalg.Vector3f32,
+	planes:            [dynamic]linalg.Vector4f32, // Normal and offset, a point is inside when dot(normal, point) <= offset
+	face_offsets:      [dynamic]u32,
+	face_vertices:     [dynamic]u32,
+	adjacency_offsets: [dynamic]u32,
+	adjacency:         [dynamic]u32,
+}
+
+delete_convex_hull :: proc(convex: ^Convex_Hull) {
+	delete(convex.vertices);
+	delete(convex.planes);
+	delete(convex.face_offsets);
+	delete(convex.face_vertices);
+	delete(convex.adjacency_offsets);
+	delete(convex.adjacency);
+}
 
 init_collision_hull :: proc(
 	local_position:    linalg.Vector3f32,
@@ -27,6 +49,7 @@ init_collision_hull :: proc(
 	kind:              Hull_Kind,
 	maybe_indices:     Maybe([dynamic]u16) = nil,
 	maybe_positions:   Maybe([dynamic]f32) = nil,
+	maybe_convex:      Maybe(Convex_Hull) = nil,
 ) -> Collision_Hull {
 	hull: Collision_Hull;
 	hull.local_orientation = local_orientation;
@@ -57,6 +80,22 @@ init_collision_hull :: proc(
 		hull.local_bounds = math2.Box3f32 { local_bounds_min, local_bounds_max };
 		hull.indices = indices;
 		hull.positions = positions;
+
+	case .Convex:
+		convex, convex_ok := maybe_convex.?;
+		assert(convex_ok);
+		assert(len(convex.vertices) > 0);
+
+		local_bounds_min := VEC3_INF;
+		local_bounds_max := VEC3_NEG_INF;
+
+		for vertex in convex.vertices {
+			local_bounds_min = linalg.min(local_bounds_min, vertex);
+			local_bounds_max = linalg.max(local_bounds_max, vertex);
+		}
+
+		hull.local_bounds = math2.Box3f32 { local_bounds_min, local_bounds_max };
+		hull.convex = convex;
 	}
 
 	return hull;
@@ -146,7 +185,7 @@ update_entity_hull_helpers :: proc(hull_helpers: ^Hull_Helpers) {
 				geometry_lookup = hull_helpers.cylinder_helper_geo_lookup;
 			case .Sphere:
 				geometry_lookup = hull_helpers.sphere_helper_geo_lookup;
-			case .Mesh:
+			case .Mesh, .Convex:
 				// We would want to create a wireframe triangle geometry here using the indices and positions. This would be a good thing to do on laptop.
 				// We actually wouldn't want to use a [dynamic]linalg.Vector3f32 for the positions in this case.
 				continue;
@@ -297,6 +336,11 @@ ray_intersects_hull :: proc(hull: ^Collision_Hull, origin, direction: linalg.Vec
 
 	case .Mesh:
 		unimplemented();
+
+	case .Convex:
+		normal, t, ok := convex_hull_ray_intersection(&hull.convex, local_origin, local_direction, length);
+		if !ok do return nil;
+		return Ray_Hull_Contact { t, convex_hull_global_normal(hull, normal) };
 	}
 
 	if contact_length == max(f32) {
@@ -305,4 +349,97 @@ ray_intersects_hull :: proc(hull: ^Collision_Hull, origin, direction: linalg.Vec
 		global_normal := linalg.normalize(math2.matrix4_transform_direction(hull.global_transform, local_contact_normal));
 		return Ray_Hull_Contact { contact_length, global_normal };
 	}
-}
\ No newline at end of file
+}
+// Hill climbs over the vertex adjacency to the vertex furthest in the local direction. On a convex hull a vertex that none of its neighbours beat is the furthest
+// one overall, so only the vertices along the way are looked at.
+convex_hull_support :: proc(convex: ^Convex_Hull, local_direction: linalg.Vector3f32) -> linalg.Vector3f32 {
+	vertex := 0;
+	best := linalg.dot(convex.vertices[vertex], local_direction);
+
+	for {
+		improved := false;
+
+		for neighbour in convex.adjacency[convex.adjacency_offsets[vertex]:convex.adjacency_offsets[vertex + 1]] {
+			dot := linalg.dot(convex.vertices[neighbour], local_direction);
+
+			if dot > best {
+				best = dot;
+				vertex = int(neighbour);
+				improved = true;
+			}
+		}
+
+		if !improved do break;
+	}
+
+	return convex.vertices[vertex];
+}
+
+// Clips the ray against the half spaces of the faces, all in the hull's local space. The ray hits where it enters the last face it has to cross to get
+// inside. A ray that starts inside doesn't hit anything, like the box which ignores the backsides of its faces.
+convex_hull_ray_intersection :: proc(convex: ^Convex_Hull, local_origin, local_direction: linalg.Vector3f32, length: f32) -> (normal: linalg.Vector3f32, t: f32, ok: bool) {
+	t_enter: f32 = 0;
+	t_exit := length;
+	entered := false;
+
+	for plane in convex.planes {
+		plane_normal := plane.xyz;
+		denominator := linalg.dot(plane_normal, local_direction);
+		distance := plane.w - linalg.dot(plane_normal, local_origin);
+
+		if denominator == 0 {
+			// Parallel to the face, the ray is either always in front of it or always behind it
+			if distance < 0 do return;
+			continue;
+		}
+
+		plane_t := distance / denominator;
+
+		if denominator < 0 {
+			if plane_t > t_enter {
+				t_enter = plane_t;
+				normal = plane_normal;
+				entered = true;
+			}
+		} else {
+			t_exit = min(t_exit, plane_t);
+		}
+
+		if t_enter > t_exit do return;
+	}
+
+	if !entered do return;
+	return normal, t_enter, true;
+}
+
+// Normals go from local to global space with the inverse transpose. The other kinds get away with the global transform because their normals are along the
+// local axes, the faces of a convex hull can face any way so they'd lean over with a non uniform scale.
+convex_hull_global_normal :: proc(hull: ^Collision_Hull, local_normal: linalg.Vector3f32) -> linalg.Vector3f32 {
+	return linalg.normalize(math2.matrix4_transform_direction(linalg.transpose(hull.inv_global_transform), local_normal));
+}
+
+// The face whose global normal is closest to the global direction, returned in global space
+convex_hull_find_face :: proc(hull: ^Collision_Hull, direction: linalg.Vector3f32) -> (plane_normal: linalg.Vector3f32, polygon: [dynamic]linalg.Vector3f32) {
+	convex := &hull.convex;
+	polygon = make([dynamic]linalg.Vector3f32, context.temp_allocator);
+
+	best_face := 0;
+	best_dot := -max(f32);
+
+	for plane, face in convex.planes {
+		global_normal := convex_hull_global_normal(hull, plane.xyz);
+		dot := linalg.dot(global_normal, direction);
+
+		if dot > best_dot {
+			best_dot = dot;
+			best_face = face;
+			plane_normal = global_normal;
+		}
+	}
+
+	for vertex in convex.face_vertices[convex.face_offsets[best_face]:convex.face_offsets[best_face + 1]] {
+		append(&polygon, math2.matrix4_transform_point(hull.global_transform, convex.vertices[vertex]));
+	}
+
+	return;
+}
@@ -26,6 +26,7 @@ Config :: struct {
 	init_sleeping_islands: bool,
 	explosion_helpers: bool,
 	verbose_logging: bool,
+	verify_level_checksums: bool,
 	ai_helpers: bool,
 	camera_follow_first_ai: bool,
 }
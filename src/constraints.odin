@@ -243,7 +243,7 @@ add_car_movable_constraint_set :: proc(constraints: ^Constraints, car: ^Car_Enti
 		ra := contact.position_a - car.tentative_position;
 		raxn := linalg.cross(ra, n);
 
-		rb := contact.position_b - rigid_body_b.tentative_position;
+		rb := contact.position_b - rigid_body_b.tentative_center_of_mass;
 		rbxn := linalg.cross(rb, n);
 
 		contact_velocity_a := car.velocity + linalg.cross(car.angular_velocity, ra);
@@ -331,7 +331,7 @@ add_fixed_constraint_set :: proc(constraints: ^Constraints, rigid_body: ^Rigid_B
 		n = n,
 		t1 = t1,
 		t2 = t2,
-		constraints = calculate_fixed_constraints(n, t1, t2, rigid_body.mass, rigid_body.tentative_position, rigid_body.tentative_inv_global_inertia_tensor, &manifold.contacts, dt),
+		constraints = calculate_fixed_constraints(n, t1, t2, rigid_body.mass, rigid_body.tentative_center_of_mass, rigid_body.tentative_inv_global_inertia_tensor, &manifold.contacts, dt),
 	};
 
 	append(&constraints.fixed_constraint_sets, constraint_set);
@@ -388,12 +388,12 @@ add_movable_constraint_set :: proc(constraints: ^Constraints, rigid_body_a, rigi
 	inverse_mass_b := 1.0 / rigid_body_b.mass;
 
 	for contact in small_array.slice(&manifold.contacts) {
-		ra := contact.position_a - rigid_body_a.tentative_position;
+		ra := contact.position_a - rigid_body_a.tentative_center_of_mass;
 		raxn := linalg.cross(ra, n);
 		raxt1 := linalg.cross(ra, t1);
 		raxt2 := linalg.cross(ra, t2);
 
-		rb := contact.position_b - rigid_body_b.tentative_position;
+		rb := contact.position_b - rigid_body_b.tentative_center_of_mass;
 		rbxn := linalg.cross(rb, n);
 		rbxt1 := linalg.cross(rb, t1);
 		rbxt2 := linalg.cross(rb, t2);
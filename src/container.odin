@@ -0,0 +1,94 @@
+package main
+
+import "core:os";
+import "core:fmt";
+import "core:bytes";
+import "core:compress/zlib";
+
+// Level and asset files can be exported as a compressed container: a header with a table of the file's top level
+// sections followed by each section compressed on its own. See container.py in the exporter for the layout.
+CONTAINER_MAGIC   :: "KGZC";
+CONTAINER_VERSION :: 1;
+
+Container_Codec :: enum u32 {
+	None,
+	Zlib,
+	Lzma, // Only the exporter tools can decode this
+}
+
+Container_Section :: struct {
+	name: string,
+	offset: int,
+	compressed_size: int,
+	size: int,
+}
+
+// Reads a level or asset file, decompressing it if it's a container. Returns the same bytes either way.
+read_game_file :: proc(path: string, allocator := context.allocator) -> ([]byte, bool) {
+	data, success := os.read_entire_file_from_filename(path, allocator);
+
+	if !success || len(data) < len(CONTAINER_MAGIC) || string(data[:len(CONTAINER_MAGIC)]) != CONTAINER_MAGIC {
+		return data, success;
+	}
+
+	defer delete(data, allocator);
+
+	codec, sections := read_container_sections(&data);
+	size := 0;
+
+	for section in sections {
+		size += section.size;
+	}
+
+	decoded := make([]byte, size, allocator);
+	pos := 0;
+
+	for section in sections {
+		decode_container_section(data, codec, section, decoded[pos : pos + section.size]);
+		pos += section.size;
+	}
+
+	return decoded, true;
+}
+
+// Reads the section table without decompressing anything. The sections are allocated with the temp allocator.
+read_container_sections :: proc(data: ^[]byte) -> (Container_Codec, []Container_Section) {
+	pos := len(CONTAINER_MAGIC);
+	version := read_u32(data, &pos);
+	assert(version == CONTAINER_VERSION, fmt.tprintf("[container] Required version %v but found %v.", CONTAINER_VERSION, version));
+
+	codec := cast(Container_Codec) read_u32(data, &pos);
+	sections := make([]Container_Section, read_u32(data, &pos), context.temp_allocator);
+
+	for &section in sections {
+		section.name = read_string(data, &pos);
+		section.offset = cast(int) read_u32(data, &pos);
+		section.compressed_size = cast(int) read_u32(data, &pos);
+		section.size = cast(int) read_u32(data, &pos);
+	}
+
+	return codec, sections;
+}
+
+// Decompresses one section into output, which must be section.size bytes
+decode_container_section :: proc(data: []byte, codec: Container_Codec, section: Container_Section, output: []byte) {
+	assert(len(output) == section.size);
+	compressed := data[section.offset : section.offset + section.compressed_size];
+
+	switch codec {
+	case .None:
+		copy(output, compressed);
+	case .Zlib:
+		buffer: bytes.Buffer;
+		defer bytes.buffer_destroy(&buffer);
+
+		error := zlib.inflate(compressed, &buffer, expected_output_size = section.size);
+		assert(error == nil, fmt.tprintf("[container] Failed to inflate section '%s': %v", section.name, error));
+
+		decompressed := bytes.buffer_to_bytes(&buffer);
+		assert(len(decompressed) == section.size, fmt.tprintf("[container] Section '%s' inflated to the wrong size.", section.name));
+		copy(output, decompressed);
+	case .Lzma:
+		assert(false, fmt.tprintf("[container] Section '%s' is LZMA compressed, re-export it with zlib.", section.name));
+	}
+}
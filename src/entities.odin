@@ -45,7 +45,9 @@ Rigid_Body_Entity :: struct {
 	using entity: Entity,
 	checked_collision: bool,
 	mass: f32,
+	center_of_mass: linalg.Vector3f32, // Relative to the position, turns with the orientation
 	tentative_position: linalg.Vector3f32,
+	tentative_center_of_mass: linalg.Vector3f32, // Global
 	tentative_transform: linalg.Matrix4f32,
 	inv_local_inertia_tensor: linalg.Matrix3f32,
 	tentative_inv_global_inertia_tensor: linalg.Matrix3f32,
@@ -105,11 +107,10 @@ Car_Entity :: struct {
 	shock_particles: [dynamic]Particle,
 	fire_particles: [dynamic]Particle,
 	surface_type: Surface_Type,
-	left_segment: int,
-	right_segment: int,
 
 	// AI
 	center_multiplier: f32, // [0, 1]
+	left_segment, right_segment: Maybe(int), // Path segments the closest points were on last update, nil after a respawn
 
 	// Helpers
 	forward_helper_geo,
@@ -175,11 +176,35 @@ init_rigid_body_entity :: proc(entity: ^Rigid_Body_Entity, mass: f32, dimensions
 	};
 	
 	entity.mass = mass;
+	entity.center_of_mass = VEC3_ZERO;
 	entity.inv_local_inertia_tensor = inv_local_inertia_tensor;
 	entity.tentative_inv_global_inertia_tensor = linalg.MATRIX3F32_IDENTITY;
 	entity.island_index = -1;
 }
 
+// The mass properties worked out by the exporter from the hulls, see mass_properties.py. The principal orientation turns the principal axes, along which the
+// inertia tensor is diagonal, into the rigid body's space.
+init_rigid_body_entity_from_mass_properties :: proc(entity: ^Rigid_Body_Entity, mass: f32, center_of_mass, principal_moments: linalg.Vector3f32, principal_orientation: linalg.Quaternionf32) {
+	inv_principal_inertia_tensor := linalg.Matrix3f32 {
+		1.0 / principal_moments.x, 0.0, 0.0,
+		0.0, 1.0 / principal_moments.y, 0.0,
+		0.0, 0.0, 1.0 / principal_moments.z,
+	};
+
+	axes := linalg.matrix3_from_quaternion(principal_orientation);
+
+	entity.mass = mass;
+	entity.center_of_mass = center_of_mass;
+	entity.inv_local_inertia_tensor = axes * inv_principal_inertia_tensor * linalg.transpose(axes);
+	entity.tentative_inv_global_inertia_tensor = linalg.MATRIX3F32_IDENTITY;
+	entity.island_index = -1;
+}
+
+// Where the center of mass is with the rigid body at the position and orientation
+rigid_body_global_center_of_mass :: proc(rigid_body: ^Rigid_Body_Entity, position: linalg.Vector3f32, orientation: linalg.Quaternionf32) -> linalg.Vector3f32 {
+	return position + math2.quaternion_transform_direction(orientation, rigid_body.center_of_mass);
+}
+
 CAR_MASS: f32 : 500;
 CAR_K :: CAR_MASS / 12;
 CAR_WIDTH :: 2.0;
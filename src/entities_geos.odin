@@ -31,6 +31,10 @@ create_geometry :: proc(name: string, on_no_entities: On_No_Entities = .Free) ->
 		geometry.name = strings.clone(name);
 		geometry.free = false;
 		geometry.on_no_entities = on_no_entities;
+		clear(&geometry.chunks);
+		clear(&geometry.instance_transforms);
+		clear_geometry_lods(geometry);
+		geometry.upload_once = false;
 	} else {
 		new_geometry := Geometry {
 			name = strings.clone(name),
@@ -95,6 +99,25 @@ remove_scene_associated_entities :: proc() {
 	}
 }
 
+// Clears the static instances loaded with the level and frees the geometries that were only used by them
+remove_static_instances :: proc() {
+	for &geometry, index in entities_geos.geometries {
+		if geometry.free || len(geometry.instance_transforms) == 0 do continue;
+
+		clear(&geometry.instance_transforms);
+
+		if len(geometry.entity_lookups) == 0 && geometry.on_no_entities == .Free {
+			geometry_lookup := Geometry_Lookup { index, geometry.generation };
+
+			geometry.free = true;
+			geometry.generation += 1;
+			append(&entities_geos.free_geometries, index);
+
+			log_verbosef("Removed geometry '%s' %v\n", geometry.name, geometry_lookup);
+		}
+	}
+}
+
 get_geometry :: proc(lookup: Geometry_Lookup) -> ^Geometry {
 	geometry := &entities_geos.geometries[lookup.index];
 	assert(lookup.generation == geometry.generation);
@@ -134,8 +157,8 @@ remove_entity :: proc(entity_lookup: Entity_Lookup) {
 		assert(found);
 		unordered_remove(entity_lookups, removal_index);
 
-		// If we removed the last entity from the geometry, free it if needed
-		if len(entity_lookups) == 0 && geometry.on_no_entities == .Free {
+		// If we removed the last entity from the geometry, free it if needed. The static instances still draw it.
+		if len(entity_lookups) == 0 && len(geometry.instance_transforms) == 0 && geometry.on_no_entities == .Free {
 			geometry.free = true;
 			geometry.generation += 1;
 			append(&entities_geos.free_geometries, geometry_lookup.index);
@@ -149,6 +172,7 @@ remove_entity :: proc(entity_lookup: Entity_Lookup) {
 	for &hull in entity.collision_hulls {
 		delete(hull.indices);
 		delete(hull.positions);
+		delete_convex_hull(&hull.convex);
 	}
 
 	entity_name := strings.clone(entity.name, context.temp_allocator);
@@ -183,12 +207,17 @@ cleanup_entities_geos :: proc() {
 		// Freed or not, we must delete the inner resources
 		delete(geometry.name)
 		delete(geometry.entity_lookups);
+		delete(geometry.instance_transforms);
 		delete(geometry.indices);
 		delete(geometry.attributes);
+		delete(geometry.chunks);
+		clear_geometry_lods(&geometry);
+		delete(geometry.lods);
 
 		if emissive, ok := geometry.emissive.?; ok {
 			delete(emissive.indices);
 			delete(emissive.attributes);
+			delete(emissive.chunks);
 		}
 	}
 
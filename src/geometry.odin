@@ -17,11 +17,52 @@ Geometry :: struct {
 	free: bool,
 	generation: u32,
 	entity_lookups: [dynamic]Entity_Lookup,
+	instance_transforms: [dynamic]linalg.Matrix4f32, // Static instances that have no entity, drawn along with the entities
 	on_no_entities: On_No_Entities,
 	indices: [dynamic]u16,
 	attributes: [dynamic]f32,
+	chunks: [dynamic]Geometry_Chunk,
 	pipeline: Pipeline,
 	emissive: Maybe(Emissive),
+	lods: [dynamic]Geometry_Lod, // Simplified levels, further away each time
+	lod_center: linalg.Vector3f32, // Where the switch distances are measured from, in the geometry's space
+	upload_once: bool, // Loaded from a file and never changed, so upload_static_geometries puts it in the static geometry buffer
+	uploaded: bool, // The arrays are in the static geometry buffer at static_arrays, instead of copied every frame
+	static_arrays: Static_Arrays,
+}
+
+// Where a geometry's index and attribute arrays start in the static geometry buffer
+Static_Arrays :: struct {
+	index_offset, attribute_offset: int,
+}
+
+// A simplified version of the geometry's non emissive triangles that's drawn for the instances at least switch_distance
+// away from the camera
+Geometry_Lod :: struct {
+	switch_distance: f32,
+	indices: [dynamic]u16,
+	attributes: [dynamic]f32,
+	chunks: [dynamic]Geometry_Chunk,
+	static_arrays: Static_Arrays,
+}
+
+clear_geometry_lods :: proc(geo: ^Geometry) {
+	for &lod in geo.lods {
+		delete(lod.indices);
+		delete(lod.attributes);
+		delete(lod.chunks);
+	}
+
+	clear(&geo.lods);
+	geo.lod_center = {};
+	geo.uploaded = false;
+}
+
+// Meshes with more vertices than u16 indices can address are split into chunks which are drawn one after the other. Each
+// chunk's indices are relative to its first vertex. No chunks means the indices cover all the attributes.
+Geometry_Chunk :: struct {
+	index_count: u32,
+	vertex_offset: i32,
 }
 
 On_No_Entities :: enum {
@@ -35,6 +76,8 @@ Pipeline :: enum { Line, Basic, Lambert, LambertTwoSided }
 Emissive :: struct {
 	indices: [dynamic]u16,
 	attributes: [dynamic]f32,
+	chunks: [dynamic]Geometry_Chunk,
+	static_arrays: Static_Arrays,
 }
 
 geometry_make_triangle_mesh :: proc(geo: ^Geometry, indices: []u16, attributes: []f32, pipeline: Pipeline) {
@@ -42,8 +85,10 @@ geometry_make_triangle_mesh :: proc(geo: ^Geometry, indices: []u16, attributes:
 	assert(len(attributes) % 9 == 0);
 	assert(pipeline != .Line);
 
+	geo.uploaded = false;
 	clear(&geo.indices);
 	clear(&geo.attributes);
+	clear(&geo.chunks);
 
 	append(&geo.indices, ..indices);
 	append(&geo.attributes, ..attributes);
@@ -55,6 +100,7 @@ geometry_make_line_mesh :: proc(geo: ^Geometry, indices: []u16, attributes: []f3
 	assert(len(indices) % 2 == 0);
 	assert(len(attributes) % 6 == 0);
 	
+	geo.uploaded = false;
 	clear(&geo.indices);
 	clear(&geo.attributes);
 
@@ -67,6 +113,7 @@ geometry_make_line_mesh :: proc(geo: ^Geometry, indices: []u16, attributes: []f3
 geometry_make_box :: proc(geo: ^Geometry, color: [3]f32 = GREY, pipeline: Pipeline) {
 	assert(pipeline != .Line);
 
+	geo.uploaded = false;
 	clear(&geo.indices);
 	clear(&geo.attributes);
 	geo.pipeline = pipeline;
@@ -124,6 +171,7 @@ geometry_make_line_helper_origin_vector :: proc(geo: ^Geometry, origin, vector:
 }
 
 geometry_make_line_helper_start_end :: proc(geo: ^Geometry, start, end: linalg.Vector3f32, color: [3]f32 = YELLOW) {
+	geo.uploaded = false;
 	clear(&geo.indices);
 	clear(&geo.attributes);
 	geo.pipeline = .Line;
@@ -141,6 +189,7 @@ geometry_make_line_helper_start_end :: proc(geo: ^Geometry, start, end: linalg.V
 }
 
 geometry_make_line_helper_points_strip :: proc(geo: ^Geometry, points: []f32, color := YELLOW) {
+	geo.uploaded = false;
 	clear(&geo.indices);
 	clear(&geo.attributes);
 	geo.pipeline = .Line;
@@ -164,6 +213,7 @@ geometry_make_line_helper_points_strip :: proc(geo: ^Geometry, points: []f32, co
 }
 
 geometry_make_box_helper :: proc(geo: ^Geometry, min, max: linalg.Vector3f32, color: [3]f32 = YELLOW) {
+	geo.uploaded = false;
 	clear(&geo.indices);
 	clear(&geo.attributes);
 	geo.pipeline = .Line;
@@ -191,6 +241,7 @@ geometry_make_box_helper :: proc(geo: ^Geometry, min, max: linalg.Vector3f32, co
 }
 
 geometry_make_cylinder_helper :: proc(geo: ^Geometry, color: [3]f32 = YELLOW) {
+	geo.uploaded = false;
 	clear(&geo.indices);
 	clear(&geo.attributes);
 	geo.pipeline = .Line;
@@ -219,6 +270,7 @@ geometry_make_cylinder_helper :: proc(geo: ^Geometry, color: [3]f32 = YELLOW) {
 }
 
 geometry_make_sphere_helper :: proc(geo: ^Geometry, center: linalg.Vector3f32, radius: f32, color: [3]f32 = YELLOW) {
+	geo.uploaded = false;
 	clear(&geo.indices);
 	clear(&geo.attributes);
 	geo.pipeline = .Line;
@@ -275,6 +327,8 @@ geometry_set_color :: proc(geo: ^Geometry, color: [3]f32) {
 		unimplemented();
 	}
 
+	geo.uploaded = false;
+
 	for vert_index in 0..<(len(geo.attributes) / 9) {
 		geo.attributes[vert_index * 9 + 6] = color[0];
 		geo.attributes[vert_index * 9 + 7] = color[1];
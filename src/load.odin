@@ -1,11 +1,13 @@
 package main
 
 import "core:os";
+import "core:mem";
 import "core:math/linalg";
 import "core:math/rand";
 import "core:fmt";
 import "core:strings";
 import "core:slice";
+import "core:hash";
 
 POSITION_CHECK_VALUE :: 0b10101010_10101010_10101010_10101010;
 
@@ -55,32 +57,215 @@ read_quat :: proc(bytes: ^[]byte, pos: ^int) -> linalg.Quaternionf32 {
 	return cast(linalg.Quaternionf32) quaternion(w = w, x = x, y = y, z = z);
 }
 
-read_indices_attributes :: proc(bytes: ^[]byte, pos: ^int) -> ([dynamic]u16, [dynamic]f32) {
-	indices_count := read_u32(bytes, pos);
-	indices := make([dynamic]u16, indices_count);
+// Skips the zeros before an array in a level exported with an array alignment, see format_level.txt
+skip_array_padding :: proc(pos: ^int, alignment: int) {
+	if alignment > 1 {
+		pos^ = (pos^ + alignment - 1) / alignment * alignment;
+	}
+}
+
+// Reads a u32 count followed by that many T's with a single copy
+read_array :: proc(bytes: ^[]byte, pos: ^int, array: ^[dynamic]$T, alignment := 0) {
+	count := cast(int) read_u32(bytes, pos);
+	resize(array, count);
+	skip_array_padding(pos, alignment);
+
+	size := count * size_of(T);
+	mem.copy(raw_data(array^), raw_data(bytes[pos^:]), size);
+	pos^ += size;
+}
+
+// The convex hull of a mesh hull, see convex_hull.py in the exporter
+read_convex_hull :: proc(bytes: ^[]byte, pos: ^int, alignment := 0) -> Convex_Hull {
+	convex: Convex_Hull;
+	read_array(bytes, pos, &convex.vertices, alignment);
+	read_array(bytes, pos, &convex.planes, alignment);
+	read_array(bytes, pos, &convex.face_offsets, alignment);
+	read_array(bytes, pos, &convex.face_vertices, alignment);
+	read_array(bytes, pos, &convex.adjacency_offsets, alignment);
+	read_array(bytes, pos, &convex.adjacency, alignment);
+
+	assert(len(convex.face_offsets) == len(convex.planes) + 1);
+	assert(len(convex.adjacency_offsets) == len(convex.vertices) + 1);
+	return convex;
+}
+
+read_indices_attributes :: proc(bytes: ^[]byte, pos: ^int, alignment := 0) -> ([dynamic]u16, [dynamic]f32) {
+	indices: [dynamic]u16;
+	attributes: [dynamic]f32;
+	read_array(bytes, pos, &indices, alignment);
+	read_array(bytes, pos, &attributes, alignment);
+	return indices, attributes;
+}
 
-	for i in 0..<indices_count {
-		index := cast(u16) (cast(^u16le) raw_data(bytes[pos^:]))^;
-		pos^ += 2;
-		indices[i] = index;
+// Vertex format flags of the level geometries, see vertex_format.py in the exporter
+VERTEX_FORMAT_COMPACT_NORMALS_COLORS :: 1; // Octahedral encoded 2 x snorm16 normals and RGBA8 colors
+VERTEX_FORMAT_QUANTIZED_POSITIONS    :: 2; // 3 x unorm16 positions within the chunk's bounding box
+
+// Reads the indices and the vertices of a geometry exported with a compact vertex format, the vertices are decoded back
+// to the usual f32 attributes. vertex_size is 9 for position, normal, color or 3 for just the position.
+read_compact_indices_attributes :: proc(bytes: ^[]byte, pos: ^int, vertex_format: u32, vertex_size: int, alignment := 0) -> ([dynamic]u16, [dynamic]f32) {
+	indices: [dynamic]u16;
+	read_array(bytes, pos, &indices, alignment);
+
+	vertex_count := cast(int) read_u32(bytes, pos);
+	attributes := make([dynamic]f32, vertex_count * vertex_size);
+
+	if vertex_format & VERTEX_FORMAT_QUANTIZED_POSITIONS != 0 {
+		bounds_min := read_vec3(bytes, pos);
+		bounds_max := read_vec3(bytes, pos);
+		scale := (bounds_max - bounds_min) / 65535;
+		skip_array_padding(pos, alignment);
+
+		for i in 0..<vertex_count {
+			for axis in 0..<3 {
+				q := cast(f32) (cast(^u16le) raw_data(bytes[pos^:]))^;
+				pos^ += 2;
+				attributes[i * vertex_size + axis] = bounds_min[axis] + q * scale[axis];
+			}
+		}
+	} else {
+		skip_array_padding(pos, alignment);
+
+		for i in 0..<vertex_count {
+			for axis in 0..<3 {
+				attributes[i * vertex_size + axis] = read_f32(bytes, pos);
+			}
+		}
 	}
 
-	attributes_count := read_u32(bytes, pos);
-	attributes := make([dynamic]f32, attributes_count);
+	if vertex_size == 3 {
+		return indices, attributes;
+	}
+
+	if vertex_format & VERTEX_FORMAT_COMPACT_NORMALS_COLORS != 0 {
+		skip_array_padding(pos, alignment);
+
+		for i in 0..<vertex_count {
+			x := max(cast(f32) (cast(^i16le) raw_data(bytes[pos^:]))^ / 32767, -1);
+			y := max(cast(f32) (cast(^i16le) raw_data(bytes[pos^ + 2:]))^ / 32767, -1);
+			pos^ += 4;
+
+			// Unfold the lower half of the octahedron
+			normal := linalg.Vector3f32 { x, y, 1 - abs(x) - abs(y) };
+			t := max(-normal.z, 0);
+			normal.x += normal.x >= 0 ? -t : t;
+			normal.y += normal.y >= 0 ? -t : t;
+			normal = linalg.normalize(normal);
+
+			attributes[i * vertex_size + 3] = normal.x;
+			attributes[i * vertex_size + 4] = normal.y;
+			attributes[i * vertex_size + 5] = normal.z;
+		}
+
+		skip_array_padding(pos, alignment);
+
+		for i in 0..<vertex_count {
+			for channel in 0..<3 {
+				attributes[i * vertex_size + 6 + channel] = cast(f32) bytes[pos^ + channel] / 255;
+			}
+
+			pos^ += 4;
+		}
+	} else {
+		skip_array_padding(pos, alignment);
 
-	for i in 0..<attributes_count {
-		attribute := cast(f32) (cast(^f32le) raw_data(bytes[pos^:]))^;
-		pos^ += 4;
-		attributes[i] = attribute;
+		for i in 0..<vertex_count {
+			for j in 3..<9 {
+				attributes[i * vertex_size + j] = read_f32(bytes, pos);
+			}
+		}
 	}
 
 	return indices, attributes;
 }
 
+// Geometries too big for u16 indices are exported as multiple chunks. The chunks' indices and attributes are appended
+// together, with each chunk's indices left relative to its first vertex.
+read_chunked_indices_attributes :: proc(bytes: ^[]byte, pos: ^int, vertex_format: u32, vertex_size: int, alignment := 0) -> (indices: [dynamic]u16, attributes: [dynamic]f32, chunks: [dynamic]Geometry_Chunk) {
+	chunks_count := read_u32(bytes, pos);
+
+	for _ in 0..<chunks_count {
+		chunk_indices: [dynamic]u16;
+		chunk_attributes: [dynamic]f32;
+
+		if vertex_format == 0 {
+			chunk_indices, chunk_attributes = read_indices_attributes(bytes, pos, alignment);
+		} else {
+			chunk_indices, chunk_attributes = read_compact_indices_attributes(bytes, pos, vertex_format, vertex_size, alignment);
+		}
+
+		vertex_offset := len(attributes) / vertex_size;
+
+		append(&indices, ..chunk_indices[:]);
+		append(&attributes, ..chunk_attributes[:]);
+		append(&chunks, Geometry_Chunk { cast(u32) len(chunk_indices), cast(i32) vertex_offset });
+
+		delete(chunk_indices);
+		delete(chunk_attributes);
+	}
+
+	// A single chunk is drawn the normal way
+	if len(chunks) == 1 {
+		clear(&chunks);
+	}
+
+	return;
+}
+
+// The level's table of contents after the version, see toc_bytes in the exporter's container.py. The offsets are from
+// the start of the uncompressed file.
+Level_Toc :: struct {
+	alignment: int, // Of the sections and the arrays in them, 0 if they aren't aligned
+	sections: []Level_Section,
+}
+
+Level_Section :: struct {
+	name: string,
+	offset: int,
+	size: int,
+	crc32: u32,
+}
+
+// The sections are allocated with the temp allocator
+read_level_toc :: proc(bytes: ^[]byte, pos: ^int) -> Level_Toc {
+	toc: Level_Toc;
+	toc.alignment = cast(int) read_u32(bytes, pos);
+	toc.sections = make([]Level_Section, read_u32(bytes, pos), context.temp_allocator);
+
+	for &section in toc.sections {
+		section.name = read_string(bytes, pos);
+		section.offset = cast(int) read_u32(bytes, pos);
+		section.size = cast(int) read_u32(bytes, pos);
+		section.crc32 = read_u32(bytes, pos);
+		assert(section.offset + section.size <= len(bytes), fmt.tprintf("[level loading] Section '%s' runs off the end of the file.", section.name));
+		assert(toc.alignment <= 1 || section.offset % toc.alignment == 0, fmt.tprintf("[level loading] Section '%s' isn't aligned.", section.name));
+	}
+
+	return toc;
+}
+
+// Finds a section to seek to, checking its CRC32 first if config.verify_level_checksums is on
+level_section :: proc(bytes: []byte, toc: Level_Toc, name: string) -> Level_Section {
+	for section in toc.sections {
+		if section.name != name do continue;
+
+		if config.verify_level_checksums {
+			crc := hash.crc32(bytes[section.offset : section.offset + section.size]);
+			assert(crc == section.crc32, fmt.tprintf("[level loading] Checksum failed in section '%s'.", name));
+		}
+
+		return section;
+	}
+
+	assert(false, fmt.tprintf("[level loading] No section '%s' in the table of contents.", name));
+	return {};
+}
+
 load_car_data:: proc(scene: ^Scene) {
 	REQUIRED_VERSION :: 2;
 
-	bytes, success := os.read_entire_file_from_filename("res/car.kgc");
+	bytes, success := read_game_file("res/car.kgc");
 	assert(success);
 	defer delete(bytes);
 
@@ -98,6 +283,7 @@ load_car_data:: proc(scene: ^Scene) {
 
 		geometry, geometry_lookup := create_geometry("car");
 		geometry_make_triangle_mesh(geometry, indices[:], attributes[:], .Lambert);
+		geometry.upload_once = true;
 		car_loaded_data.car_geometry_lookup = geometry_lookup;
 
 		delete(indices);
@@ -115,6 +301,7 @@ load_car_data:: proc(scene: ^Scene) {
 
 		geometry, geometry_lookup := create_geometry("wheel");
 		geometry_make_triangle_mesh(geometry, indices[:], attributes[:], .Lambert);
+		geometry.upload_once = true;
 		car_loaded_data.wheel_geometry_lookup = geometry_lookup;
 
 		delete(indices);
@@ -137,12 +324,13 @@ load_scene :: proc(scene: ^Scene) {
 		clear(&scene.bumpers);
 		clear(&scene.boost_jets);
 
+		remove_static_instances();
 		remove_scene_associated_entities();
 	}
 
-	REQUIRED_VERSION :: 8;
+	REQUIRED_VERSION :: 22;
 
-	bytes, success := os.read_entire_file_from_filename(scene.file_path, context.temp_allocator);
+	bytes, success := read_game_file(scene.file_path, context.temp_allocator);
 	assert(success, fmt.tprintf("Failed to load level file %s", scene.file_path));
 
 	pos := 0;
@@ -150,57 +338,104 @@ load_scene :: proc(scene: ^Scene) {
 	version := read_u32(&bytes, &pos);
 	assert(REQUIRED_VERSION == version, fmt.tprintf("[level loading] Required version %v but found %v.", REQUIRED_VERSION, version));
 
+	// Each section below seeks to where the table of contents says it starts and checks that it ends where it should
+	toc := read_level_toc(&bytes, &pos);
+	alignment := toc.alignment;
+	section: Level_Section;
+
 	{ // Spawn position & orientation
+		section = level_section(bytes, toc, "spawn_point");
+		pos = section.offset;
 		scene.spawn_position = read_vec3(&bytes, &pos);
 		scene.spawn_orientation = read_quat(&bytes, &pos);
+		assert(pos == section.offset + section.size);
 	}
 
+	section = level_section(bytes, toc, "ground_collision_mesh");
+	pos = section.offset;
+
 	// Reset grids
 	grid_half_size := read_f32(&bytes, &pos);
+	skip_array_padding(&pos, alignment);
 	ground_grid_reset(&scene.ground_grid, grid_half_size);
 	entity_grid_reset(&scene.entity_grid, grid_half_size);
 
 	{ // Ground grid
-		meshes_count := read_u32(&bytes, &pos);
+		// The exporter has already merged the meshes, found the ghost vertices and binned the triangles into cells
+		ground_grid := &scene.ground_grid;
+		read_array(&bytes, &pos, &ground_grid.positions, alignment);
+		read_array(&bytes, &pos, &ground_grid.triangles, alignment);
+		resize(&ground_grid.query_flags, len(ground_grid.triangles));
 
-		for _ in 0..<meshes_count {
-			indices, positions := read_indices_attributes(&bytes, &pos);
-			insert_into_ground_grid(&scene.ground_grid, indices[:], positions[:]);
+		half_cell_count := cast(int) read_u32(&bytes, &pos);
+		assert(half_cell_count == ground_grid.half_cell_count, fmt.tprintf("[level loading] Ground grid has %v half cells but the level was exported with %v.", ground_grid.half_cell_count, half_cell_count));
 
-			delete(indices);
-			delete(positions);
-
-			assert(read_u32(&bytes, &pos) == POSITION_CHECK_VALUE);
-		}
+		read_array(&bytes, &pos, &ground_grid.cell_offsets, alignment);
+		read_array(&bytes, &pos, &ground_grid.cell_triangles, alignment);
+		assert(read_u32(&bytes, &pos) == POSITION_CHECK_VALUE);
+		assert(pos == section.offset + section.size);
 	}
 
 	// Geometries
+	section = level_section(bytes, toc, "geometries");
+	pos = section.offset;
 	geometries_count := read_u32(&bytes, &pos);
 	geometry_lookups := make([dynamic]Geometry_Lookup, 0, geometries_count, context.temp_allocator);
 
 	for i in 0..<geometries_count {
 		name := read_string(&bytes, &pos);
-		indices, attributes := read_indices_attributes(&bytes, &pos);
-		emissive_indices, emissive_attributes := read_indices_attributes(&bytes, &pos);
+		skip_array_padding(&pos, alignment);
+		vertex_format := read_u32(&bytes, &pos);
+		indices, attributes, chunks := read_chunked_indices_attributes(&bytes, &pos, vertex_format, 9, alignment);
+		emissive_indices, emissive_attributes, emissive_chunks := read_chunked_indices_attributes(&bytes, &pos, vertex_format, 3, alignment);
+
+		lods_count := read_u32(&bytes, &pos);
+		lods := make([dynamic]Geometry_Lod, 0, lods_count, context.temp_allocator);
+		lod_center: linalg.Vector3f32;
+
+		if lods_count > 0 {
+			lod_center = read_vec3(&bytes, &pos);
+		}
+
+		for _ in 0..<lods_count {
+			switch_distance := read_f32(&bytes, &pos);
+			lod_indices, lod_attributes, lod_chunks := read_chunked_indices_attributes(&bytes, &pos, vertex_format, 9, alignment);
+			append(&lods, Geometry_Lod { switch_distance = switch_distance, indices = lod_indices, attributes = lod_attributes, chunks = lod_chunks });
+		}
+
 		assert(read_u32(&bytes, &pos) == POSITION_CHECK_VALUE);
 
 		geometry, geometry_lookup := create_geometry(name);
 		geometry_make_triangle_mesh(geometry, indices[:], attributes[:], .Lambert); // #todo: should just remove this or take in optional emissive args?
+		append(&geometry.chunks, ..chunks[:]);
+		append(&geometry.lods, ..lods[:]);
+		geometry.lod_center = lod_center;
+		geometry.upload_once = true;
 
 		if len(emissive_indices) > 0 {
 			geometry.emissive = Emissive {
-				emissive_indices,
-				emissive_attributes,
+				indices = emissive_indices,
+				attributes = emissive_attributes,
+				chunks = emissive_chunks,
 			};
+		} else {
+			delete(emissive_indices);
+			delete(emissive_attributes);
+			delete(emissive_chunks);
 		}
 
 		delete(indices);
 		delete(attributes);
+		delete(chunks);
 
 		append(&geometry_lookups, geometry_lookup);
 	}
 
+	assert(pos == section.offset + section.size);
+
 	{ // Inanimate entities
+		section = level_section(bytes, toc, "inanimate_entities");
+		pos = section.offset;
 		entity_count := read_u32(&bytes, &pos);
 
 		for i in 0..<entity_count {
@@ -226,8 +461,11 @@ load_scene :: proc(scene: ^Scene) {
 				local_size := read_vec3(&bytes, &pos);
 				kind := cast(Hull_Kind) read_u32(&bytes, &pos);
 
+				convex: Maybe(Convex_Hull);
+				if kind == .Convex do convex = read_convex_hull(&bytes, &pos, alignment);
+
 				local_transform := linalg.matrix4_from_trs(local_position, local_orientation, local_size);
-				hull := init_collision_hull(local_position, local_orientation, local_size, kind);
+				hull := init_collision_hull(local_position, local_orientation, local_size, kind, maybe_convex = convex);
 				append(&inanimate_entity.collision_hulls, hull);
 			}
 
@@ -238,9 +476,37 @@ load_scene :: proc(scene: ^Scene) {
 
 			assert(read_u32(&bytes, &pos) == POSITION_CHECK_VALUE);
 		}
+
+		assert(pos == section.offset + section.size);
+	}
+
+	{ // Static instances
+		// Inanimate objects without hulls don't get entities, each geometry just draws their transforms
+		section = level_section(bytes, toc, "static_instances");
+		pos = section.offset;
+		batches_count := read_u32(&bytes, &pos);
+
+		for _ in 0..<batches_count {
+			geometry := get_geometry(geometry_lookups[read_u32(&bytes, &pos)]);
+			instances_count := cast(int) read_u32(&bytes, &pos);
+			skip_array_padding(&pos, alignment);
+			reserve(&geometry.instance_transforms, len(geometry.instance_transforms) + instances_count);
+
+			for _ in 0..<instances_count {
+				position := read_vec3(&bytes, &pos);
+				orientation := read_quat(&bytes, &pos);
+				size := read_vec3(&bytes, &pos);
+				append(&geometry.instance_transforms, linalg.matrix4_from_trs(position, orientation, size));
+			}
+		}
+
+		assert(read_u32(&bytes, &pos) == POSITION_CHECK_VALUE);
+		assert(pos == section.offset + section.size);
 	}
 
 	{ // Rigid body islands
+		section = level_section(bytes, toc, "rigid_bodies");
+		pos = section.offset;
 		island_count := read_u32(&bytes, &pos);
 		islands_reset(&scene.islands, island_count);
 
@@ -254,7 +520,9 @@ load_scene :: proc(scene: ^Scene) {
 				size := read_vec3(&bytes, &pos);
 				geometry_index := read_u32(&bytes, &pos);
 				mass := read_f32(&bytes, &pos);
-				dimensions := read_vec3(&bytes, &pos);
+				center_of_mass := read_vec3(&bytes, &pos);
+				principal_moments := read_vec3(&bytes, &pos);
+				principal_orientation := read_quat(&bytes, &pos);
 				collision_exclude := read_bool(&bytes, &pos);
 				status_effect_u32 := read_u32(&bytes, &pos);
 
@@ -281,7 +549,7 @@ load_scene :: proc(scene: ^Scene) {
 				rigid_body.orientation = orientation;
 				rigid_body.size = size;
 				rigid_body.collision_exclude = collision_exclude;
-				init_rigid_body_entity(rigid_body, mass, dimensions);
+				init_rigid_body_entity_from_mass_properties(rigid_body, mass, center_of_mass, principal_moments, principal_orientation);
 				update_entity_transform(rigid_body);
 
 				hull_count := read_u32(&bytes, &pos);
@@ -291,8 +559,11 @@ load_scene :: proc(scene: ^Scene) {
 					local_size := read_vec3(&bytes, &pos);
 					kind := cast(Hull_Kind) read_u32(&bytes, &pos);
 
+					convex: Maybe(Convex_Hull);
+					if kind == .Convex do convex = read_convex_hull(&bytes, &pos, alignment);
+
 					local_transform := linalg.matrix4_from_trs(local_position, local_orientation, local_size);
-					hull := init_collision_hull(local_position, local_orientation, local_size, kind);
+					hull := init_collision_hull(local_position, local_orientation, local_size, kind, maybe_convex = convex);
 					append(&rigid_body.collision_hulls, hull);
 				}
 
@@ -318,9 +589,13 @@ load_scene :: proc(scene: ^Scene) {
 				assert(read_u32(&bytes, &pos) == POSITION_CHECK_VALUE);
 			}
 		}
+
+		assert(pos == section.offset + section.size);
 	}
 
 	{ // Oil slicks
+		section = level_section(bytes, toc, "oil_slicks");
+		pos = section.offset;
 		oil_slicks_count := read_u32(&bytes, &pos);
 
 		for _ in 0..<oil_slicks_count {
@@ -341,16 +616,20 @@ load_scene :: proc(scene: ^Scene) {
 			local_orientation := read_quat(&bytes, &pos);
 			local_size := read_vec3(&bytes, &pos);
 			local_transform := linalg.matrix4_from_trs(local_position, local_orientation, local_size);
-			indices, positions := read_indices_attributes(&bytes, &pos);
+			indices, positions := read_indices_attributes(&bytes, &pos, alignment);
 			hull := init_collision_hull(local_position, local_orientation, local_size, .Mesh, indices, positions);
 			append(&entity.collision_hulls, hull);
 			update_entity_hull_transforms_and_bounds(entity, entity.orientation, entity.transform);
 
 			assert(read_u32(&bytes, &pos) == POSITION_CHECK_VALUE);
 		}
+
+		assert(pos == section.offset + section.size);
 	}
 
 	{ // Bumpers
+		section = level_section(bytes, toc, "bumpers");
+		pos = section.offset;
 		count := read_u32(&bytes, &pos);
 
 		for _ in 0..<count {
@@ -383,9 +662,13 @@ load_scene :: proc(scene: ^Scene) {
 
 			assert(read_u32(&bytes, &pos) == POSITION_CHECK_VALUE);
 		}
+
+		assert(pos == section.offset + section.size);
 	}
 
 	{ // Boost jets
+		section = level_section(bytes, toc, "boost_jets");
+		pos = section.offset;
 		count := read_u32(&bytes, &pos);
 
 		for _ in 0..<count {
@@ -419,6 +702,8 @@ load_scene :: proc(scene: ^Scene) {
 
 			assert(read_u32(&bytes, &pos) == POSITION_CHECK_VALUE);
 		}
+
+		assert(pos == section.offset + section.size);
 	}
 
 	// Ensure we've added an entity to all the geometries
@@ -426,15 +711,16 @@ load_scene :: proc(scene: ^Scene) {
 		for geometry_lookup in geometry_lookups {
 			geometry := get_geometry(geometry_lookup);
 
-			if len(geometry.entity_lookups) == 0 {
-				fmt.printf("[level loading] No entities were added to geometry '%s'.\n", geometry.name);
+			if len(geometry.entity_lookups) == 0 && len(geometry.instance_transforms) == 0 {
+				fmt.printf("[level loading] No entities or static instances were added to geometry '%s'.\n", geometry.name);
 			}
 		}
 	}
 
 	{ // AI paths
-		load_path :: proc(bytes: ^[]byte, pos: ^int, path: ^[dynamic]Curve) {
+		load_path :: proc(bytes: ^[]byte, pos: ^int, path: ^[dynamic]Curve, alignment: int) {
 			curves_count_left := read_u32(bytes, pos);
+			skip_array_padding(pos, alignment);
 
 			for _ in 0..<curves_count_left {
 				p0 := read_vec3(bytes, pos);
@@ -444,27 +730,48 @@ load_scene :: proc(scene: ^Scene) {
 
 				curve := Curve {
 					p0, p1, p2, p3,
-					0,
 				};
 
 				append(path, curve);
 			}
+		}
 
-			// #todo: Do this in exporter
-			calculate_curve_lengths(path[:])
+		load_path_table :: proc(bytes: ^[]byte, pos: ^int, table: ^Path_Table, alignment: int) {
+			table.samples_per_curve = cast(int) read_u32(bytes, pos);
+			read_array(bytes, pos, &table.lengths, alignment);
+			read_array(bytes, pos, &table.positions, alignment);
+
+			grid := &table.grid;
+			grid.origin[0] = read_f32(bytes, pos);
+			grid.origin[1] = read_f32(bytes, pos);
+			grid.cell_size = read_f32(bytes, pos);
+			grid.cells_x = cast(int) read_u32(bytes, pos);
+			grid.cells_z = cast(int) read_u32(bytes, pos);
+			read_array(bytes, pos, &grid.cell_offsets, alignment);
+			read_array(bytes, pos, &grid.cell_segments, alignment);
 		}
 
-		load_path(&bytes, &pos, &scene.ai.left_path);
-		load_path(&bytes, &pos, &scene.ai.right_path);
+		section = level_section(bytes, toc, "ai_paths");
+		pos = section.offset;
+		load_path(&bytes, &pos, &scene.ai.left_path, alignment);
+		load_path(&bytes, &pos, &scene.ai.right_path, alignment);
+		load_path_table(&bytes, &pos, &scene.ai.left_table, alignment);
+		load_path_table(&bytes, &pos, &scene.ai.right_table, alignment);
+
+		assert(len(scene.ai.left_table.lengths) == len(scene.ai.left_path) * scene.ai.left_table.samples_per_curve + 1 || len(scene.ai.left_path) == 0);
+		assert(len(scene.ai.right_table.lengths) == len(scene.ai.right_path) * scene.ai.right_table.samples_per_curve + 1 || len(scene.ai.right_path) == 0);
 	}
 
 	assert(read_u32(&bytes, &pos) == POSITION_CHECK_VALUE);
+	assert(pos == section.offset + section.size);
 
 	// Save a spot for the human player
 	append(&scene.all_players, Entity_Lookup {});
 
 	{ // AI spawn points
 		using scene.car_loaded_data;
+		section = level_section(bytes, toc, "ai_spawn_points");
+		pos = section.offset;
 		count := read_u32(&bytes, &pos);
 
 		for _ in 0..<count {
@@ -494,6 +801,8 @@ load_scene :: proc(scene: ^Scene) {
 			entity.center_multiplier = calculate_center_multiplier(position, &scene.ai);
 			append(&scene.all_players, entity_lookup);
 		}
+
+		assert(pos == section.offset + section.size);
 	}
 
 	{ // Init human player
@@ -528,9 +837,8 @@ load_scene :: proc(scene: ^Scene) {
 
 // Gives a value between 0 and 1. 0 = origin on left curve, 1 = orign on right curve
 calculate_center_multiplier :: proc(origin: linalg.Vector3f32, ai: ^AI) -> f32 {
-	// Assumes the origin falls in segment 0 of both curves
-	_, _, left_point := find_closest_point_on_curve(origin, ai.left_path[:], 0);
-	_, _, right_point := find_closest_point_on_curve(origin, ai.right_path[:], 0);
+	_, _, left_point, _ := find_closest_point_on_curve(origin, &ai.left_table, nil);
+	_, _, right_point, _ := find_closest_point_on_curve(origin, &ai.right_table, nil);
 
 	line := right_point - left_point;
 	proj := linalg.projection(origin - left_point, line);
@@ -547,7 +855,7 @@ calculate_center_multiplier :: proc(origin: linalg.Vector3f32, ai: ^AI) -> f32 {
 load_runtime_assets :: proc(runtime_assets: ^Runtime_Assets) {
 	REQUIRED_VERSION :: 1;
 
-	bytes, success := os.read_entire_file_from_filename("res/runtime_assets.kga");
+	bytes, success := read_game_file("res/runtime_assets.kga");
 	defer delete(bytes);
 	assert(success);
 	pos := 0;
@@ -570,6 +878,7 @@ load_runtime_assets :: proc(runtime_assets: ^Runtime_Assets) {
 
 			geometry, geometry_lookup := create_geometry("shrapnel", .Keep);
 			geometry_make_triangle_mesh(geometry, indices[:], attributes[:], .LambertTwoSided);
+			geometry.upload_once = true;
 
 			delete(indices);
 			delete(attributes);
@@ -605,6 +914,7 @@ load_runtime_assets :: proc(runtime_assets: ^Runtime_Assets) {
 
 			geometry, geometry_lookup := create_geometry("Oil slick asset", .Keep);
 			geometry_make_triangle_mesh(geometry, indices[:], attributes[:], .Lambert);
+			geometry.upload_once = true;
 
 			delete(indices);
 			delete(attributes);
@@ -659,6 +969,7 @@ hot_reload_scene_if_needed :: proc(game: ^Game) {
 
 	if time > scene.load_time {
 		load_scene(scene);
+		upload_static_geometries(&game.vulkan);
 		scene.load_time = time;
 	}
 }
\ No newline at end of file
@@ -97,6 +97,7 @@ init :: proc(game: ^Game) {
 	load_car_data(&game.scene);
 	init_scene(&game.scene);
 	load_runtime_assets(&game.runtime_assets);
+	upload_static_geometries(&game.vulkan);
 
 	ai_init(&game.scene);
 
@@ -238,7 +239,7 @@ update :: proc(game: ^Game, dt: f32) {
 render_game :: proc(game: ^Game) {
 	vulkan := &game.vulkan;
 
-	draw_entities(vulkan);
+	draw_entities(vulkan, game.camera.position);
 
 	scene := &game.scene;
 	draw_shock_entity_particles(vulkan, scene.shock_entities[:]);
@@ -34,9 +34,12 @@ simulate :: proc(scene: ^Scene, runtime_assets: ^Runtime_Assets, dt: f32) {
 		rigid_body := get_entity(lookup).variant.(^Rigid_Body_Entity);
 
 		rigid_body.velocity.y += GRAVITY * dt;
-		rigid_body.tentative_position = rigid_body.position + rigid_body.velocity * dt;
 
+		// The velocity is the center of mass's and the rigid body turns around it, the position follows along
 		tentative_orientation := math2.integrate_angular_velocity(rigid_body.angular_velocity, rigid_body.orientation, dt);
+		rigid_body.tentative_center_of_mass = rigid_body_global_center_of_mass(rigid_body, rigid_body.position, rigid_body.orientation) + rigid_body.velocity * dt;
+		rigid_body.tentative_position = rigid_body.tentative_center_of_mass - math2.quaternion_transform_direction(tentative_orientation, rigid_body.center_of_mass);
+
 		rigid_body.tentative_inv_global_inertia_tensor = math2.calculate_inv_global_inertia_tensor(tentative_orientation, rigid_body.inv_local_inertia_tensor);
 		rigid_body.tentative_transform = linalg.matrix4_from_trs(rigid_body.tentative_position, tentative_orientation, rigid_body.size);
 
@@ -257,9 +260,10 @@ simulate :: proc(scene: ^Scene, runtime_assets: ^Runtime_Assets, dt: f32) {
 
 		old_position := rigid_body.position;
 		old_orientation := rigid_body.orientation;
-		rigid_body.position += (rigid_body.velocity + rigid_body.bias_velocity) * dt;
+		center_of_mass := rigid_body_global_center_of_mass(rigid_body, rigid_body.position, rigid_body.orientation) + (rigid_body.velocity + rigid_body.bias_velocity) * dt;
 
 		rigid_body.orientation = math2.integrate_angular_velocity(rigid_body.angular_velocity + rigid_body.bias_angular_velocity, rigid_body.orientation, dt);
+		rigid_body.position = center_of_mass - math2.quaternion_transform_direction(rigid_body.orientation, rigid_body.center_of_mass);
 
 		rigid_body.bias_velocity = VEC3_ZERO;
 		rigid_body.bias_angular_velocity = VEC3_ZERO;
@@ -616,6 +620,11 @@ spring_intersects_hull :: proc(origin, direction: linalg.Vector3f32, hull: ^Coll
 
 	case .Mesh:
 		unimplemented();
+
+	case .Convex:
+		normal, t, ok := convex_hull_ray_intersection(&hull.convex, local_origin, local_direction, SPRING_MAX_LENGTH);
+		if !ok do return nil;
+		return Spring_Contact_Intermediary { t, convex_hull_global_normal(hull, normal) };
 	}
 
 	if length == max(f32) {
@@ -301,18 +301,26 @@ end_render_frame :: proc(using vulkan: ^Vulkan) -> bool {
 	}
 }
 
-draw_entities :: proc(using vulkan: ^Vulkan) {
+draw_entities :: proc(using vulkan: ^Vulkan, camera_position: la.Vector3f32) {
 	geometry_offset := 0;
 	instance_offset := mesh_resources.per_instance_buffer_instance_block_offset;
+	instance_block_end := instance_offset + INSTANCE_BUFFER_MESH_INSTANCE_BLOCK_SIZE;
 	emissive_instance_offset := bloom_resources.array_offset;
-	per_instance_buffer := frame_resources.per_instance_buffers[logical_frame_index];
+	emissive_block_end := emissive_instance_offset + INSTANCE_BUFFER_EMISSIVE_COLOR_ARRAY_SIZE;
 	per_instance_buffer_ptr := frame_resources.per_instance_buffer_ptr;
 
 	first_instance: u32 = 0;
 	emissive_first_instance: u32 = 0;
 
+	// The blocks of the per instance buffer are checked before anything is copied into them. What doesn't fit isn't
+	// drawn this frame, instead of being written over the next block.
+	skipped_geometries := 0;
+	skipped_instances := 0;
+
 	for &geometry in entities_geos.geometries {
-		if geometry.free || (len(geometry.entity_lookups) == 0 && geometry.on_no_entities == .Keep) {
+		no_instances := len(geometry.entity_lookups) == 0 && len(geometry.instance_transforms) == 0;
+
+		if geometry.free || (no_instances && geometry.on_no_entities == .Keep) {
 			continue;
 		}
 
@@ -320,39 +328,6 @@ draw_entities :: proc(using vulkan: ^Vulkan) {
 			fmt.assertf(len(geometry.indices) > 0, "Could not render geometry '%s', it has no indices", geometry.name);
 		}
 
-		index_array_size := size_of(u16) * len(geometry.indices);
-		attribute_array_size := size_of(f32) * len(geometry.attributes);
-
-		index_array_offset := geometry_offset;
-		attribute_array_offset := mem.align_forward_int(index_array_offset + index_array_size, 4);
-		geometry_offset = attribute_array_offset + attribute_array_size;
-
-		// Copy geometry data
-		mem.copy_non_overlapping(mem.ptr_offset(per_instance_buffer_ptr, index_array_offset), raw_data(geometry.indices), index_array_size);
-		mem.copy_non_overlapping(mem.ptr_offset(per_instance_buffer_ptr, attribute_array_offset), raw_data(geometry.attributes), attribute_array_size);
-
-		instance_count: u32;
-
-		// Copy matrix data
-		if len(geometry.entity_lookups) == 0 {
-			// It must be the .KeepRender case so render this geometry with an identity matrix
-			transform := la.MATRIX4F32_IDENTITY;
-			mem.copy_non_overlapping(mem.ptr_offset(per_instance_buffer_ptr, instance_offset), &transform, size_of(la.Matrix4f32));
-			instance_offset += MESH_INSTANCE_ELEMENT_SIZE;
-			instance_count = 1;
-		} else {
-			for entity_lookup in geometry.entity_lookups {
-				entity := get_entity(entity_lookup);
-				mem.copy_non_overlapping(mem.ptr_offset(per_instance_buffer_ptr, instance_offset), &entity.transform, size_of(la.Matrix4f32));
-				instance_offset += MESH_INSTANCE_ELEMENT_SIZE;
-			}
-
-			instance_count = cast(u32) len(geometry.entity_lookups);
-		}
-
-		// Record draw command
-		attribute_array_offset_device_size := cast(vk.DeviceSize) attribute_array_offset;
-
 		secondary_command_buffer: vk.CommandBuffer;
 		switch geometry.pipeline {
 		case .Line:
@@ -365,29 +340,96 @@ draw_entities :: proc(using vulkan: ^Vulkan) {
 			secondary_command_buffer = mesh_resources.lambert_two_sided_secondary_command_buffers[logical_frame_index];
 		}
 
-		vk.CmdBindIndexBuffer(secondary_command_buffer, per_instance_buffer, cast(vk.DeviceSize) index_array_offset, .UINT16);
-		vk.CmdBindVertexBuffers(secondary_command_buffer, 0, 1, &per_instance_buffer, &attribute_array_offset_device_size);
-		vk.CmdDrawIndexed(secondary_command_buffer, cast(u32) len(geometry.indices), instance_count, 0, 0, first_instance);
+		// Each level of detail is drawn with the instances that are far enough away for it, level 0 is the full geometry
+		for level in 0..=len(geometry.lods) {
+			indices := geometry.indices[:];
+			attributes := geometry.attributes[:];
+			chunks := geometry.chunks[:];
+			static_arrays := geometry.static_arrays;
+
+			if level > 0 {
+				lod := &geometry.lods[level - 1];
+				indices = lod.indices[:];
+				attributes = lod.attributes[:];
+				chunks = lod.chunks[:];
+				static_arrays = lod.static_arrays;
+			}
+
+			instance_count: u32;
+
+			// Copy matrix data
+			if no_instances {
+				if level > 0 do break;
 
-		first_instance += instance_count;
+				// It must be the .KeepRender case so render this geometry with an identity matrix
+				if instance_offset + MESH_INSTANCE_ELEMENT_SIZE > instance_block_end {
+					skipped_instances += 1;
+					continue;
+				}
+
+				transform := la.MATRIX4F32_IDENTITY;
+				mem.copy_non_overlapping(mem.ptr_offset(per_instance_buffer_ptr, instance_offset), &transform, size_of(la.Matrix4f32));
+				instance_offset += MESH_INSTANCE_ELEMENT_SIZE;
+				instance_count = 1;
+			} else {
+				for entity_lookup in geometry.entity_lookups {
+					entity := get_entity(entity_lookup);
+					if geometry_lod_level(&geometry, entity.transform, camera_position) != level do continue;
+
+					if instance_offset + MESH_INSTANCE_ELEMENT_SIZE > instance_block_end {
+						skipped_instances += 1;
+						continue;
+					}
+
+					mem.copy_non_overlapping(mem.ptr_offset(per_instance_buffer_ptr, instance_offset), &entity.transform, size_of(la.Matrix4f32));
+					instance_offset += MESH_INSTANCE_ELEMENT_SIZE;
+					instance_count += 1;
+				}
+
+				for &transform in geometry.instance_transforms {
+					if geometry_lod_level(&geometry, transform, camera_position) != level do continue;
+
+					if instance_offset + MESH_INSTANCE_ELEMENT_SIZE > instance_block_end {
+						skipped_instances += 1;
+						continue;
+					}
+
+					mem.copy_non_overlapping(mem.ptr_offset(per_instance_buffer_ptr, instance_offset), &transform, size_of(la.Matrix4f32));
+					instance_offset += MESH_INSTANCE_ELEMENT_SIZE;
+					instance_count += 1;
+				}
+			}
+
+			if instance_count == 0 do continue;
+
+			// The instances are in the buffer either way, so the next draw's first instance is after them
+			if bind_geometry_arrays(vulkan, secondary_command_buffer, geometry.uploaded, static_arrays, indices, attributes, &geometry_offset) {
+				draw_indexed_chunks(secondary_command_buffer, len(indices), chunks, instance_count, first_instance);
+			} else {
+				skipped_geometries += 1;
+			}
+
+			first_instance += instance_count;
+		}
 
 		if emissive, ok := geometry.emissive.?; ok {
 			when ODIN_DEBUG {
 				assert(len(emissive.indices) > 0);
 			}
 
-			index_array_size = size_of(u16) * len(emissive.indices);
-			attribute_array_size = size_of(f32) * len(emissive.attributes);
+			instance_count := cast(u32) (len(geometry.entity_lookups) + len(geometry.instance_transforms));
 
-			index_array_offset = geometry_offset;
-			attribute_array_offset = mem.align_forward_int(index_array_offset + index_array_size, 4);
-			geometry_offset = attribute_array_offset + attribute_array_size;
+			if emissive_instance_offset + int(instance_count) * EMISSIVE_INSTANCE_ELEMENT_SIZE > emissive_block_end {
+				skipped_instances += int(instance_count);
+				continue;
+			}
 
-			index_array_dst := mem.ptr_offset(per_instance_buffer_ptr, index_array_offset);
-			attribute_array_dst := mem.ptr_offset(per_instance_buffer_ptr, attribute_array_offset);
+			emissive_secondary_command_buffer := bloom_resources.onscreen_color_secondary_command_buffers[logical_frame_index];
 
-			mem.copy_non_overlapping(index_array_dst, raw_data(emissive.indices), index_array_size);
-			mem.copy_non_overlapping(attribute_array_dst, raw_data(emissive.attributes), attribute_array_size);
+			if !bind_geometry_arrays(vulkan, emissive_secondary_command_buffer, geometry.uploaded, emissive.static_arrays, emissive.indices[:], emissive.attributes[:], &geometry_offset) {
+				skipped_geometries += 1;
+				continue;
+			}
 
 			for entity_lookup in geometry.entity_lookups {
 				rigid_body := get_entity(entity_lookup).variant.(^Rigid_Body_Entity);
@@ -401,23 +443,102 @@ draw_entities :: proc(using vulkan: ^Vulkan) {
 				emissive_instance_offset += EMISSIVE_INSTANCE_ELEMENT_SIZE;
 			}
 
-			instance_count = cast(u32) len(geometry.entity_lookups);
+			for &transform in geometry.instance_transforms {
+				transform_dst := mem.ptr_offset(per_instance_buffer_ptr, emissive_instance_offset);
+				mem.copy_non_overlapping(transform_dst, &transform, size_of(la.Matrix4f32));
+
+				emissive_color := [3]f32 {};
+				emissive_color_dst := mem.ptr_offset(per_instance_buffer_ptr, emissive_instance_offset + size_of(la.Matrix4f32));
+				mem.copy_non_overlapping(emissive_color_dst, &emissive_color, 12);
 
-			secondary_command_buffer = bloom_resources.onscreen_color_secondary_command_buffers[logical_frame_index];
-			attribute_array_offset_device_size := cast(vk.DeviceSize) attribute_array_offset;
+				emissive_instance_offset += EMISSIVE_INSTANCE_ELEMENT_SIZE;
+			}
 
-			vk.CmdBindIndexBuffer(secondary_command_buffer, per_instance_buffer, cast(vk.DeviceSize) index_array_offset, .UINT16);
-			vk.CmdBindVertexBuffers(secondary_command_buffer, 0, 1, &per_instance_buffer, &attribute_array_offset_device_size);
-			vk.CmdDrawIndexed(secondary_command_buffer, cast(u32) len(emissive.indices), instance_count, 0, 0, emissive_first_instance);
+			draw_indexed_chunks(emissive_secondary_command_buffer, len(emissive.indices), emissive.chunks[:], instance_count, emissive_first_instance);
 
 			emissive_first_instance += instance_count;
 		}
 	}
 
-	when ODIN_DEBUG {
-		assert(geometry_offset <= INSTANCE_BUFFER_INDICES_ATTRIBUTES_BLOCK_SIZE);
-		assert(instance_offset -  mesh_resources.per_instance_buffer_instance_block_offset <= INSTANCE_BUFFER_MESH_INSTANCE_BLOCK_SIZE);
-		assert(emissive_instance_offset - bloom_resources.array_offset <= INSTANCE_BUFFER_EMISSIVE_COLOR_ARRAY_SIZE);
+	if skipped_geometries > 0 || skipped_instances > 0 {
+		log_verbosef("Out of per instance buffer space, skipped %v geometry draws and %v instances\n", skipped_geometries, skipped_instances);
+	}
+}
+
+// Binds the index and vertex buffers for drawing the arrays. The uploaded ones are already in the static geometry buffer,
+// the rest are copied into this frame's per instance buffer at geometry_offset. Returns false without copying anything
+// when there isn't room left for them in its indices and attributes block.
+bind_geometry_arrays :: proc(using vulkan: ^Vulkan, command_buffer: vk.CommandBuffer, uploaded: bool, static_arrays: Static_Arrays, indices: []u16, attributes: []f32, geometry_offset: ^int) -> bool {
+	buffer: vk.Buffer;
+	index_array_offset, attribute_array_offset: int;
+
+	if uploaded {
+		buffer = static_geometry.buffer;
+		index_array_offset = static_arrays.index_offset;
+		attribute_array_offset = static_arrays.attribute_offset;
+	} else {
+		index_array_size := size_of(u16) * len(indices);
+		attribute_array_size := size_of(f32) * len(attributes);
+
+		index_array_offset = geometry_offset^;
+		attribute_array_offset = mem.align_forward_int(index_array_offset + index_array_size, 4);
+		end := attribute_array_offset + attribute_array_size;
+
+		if end > INSTANCE_BUFFER_INDICES_ATTRIBUTES_BLOCK_SIZE do return false;
+
+		geometry_offset^ = end;
+
+		// Copy geometry data
+		per_instance_buffer_ptr := frame_resources.per_instance_buffer_ptr;
+		mem.copy_non_overlapping(mem.ptr_offset(per_instance_buffer_ptr, index_array_offset), raw_data(indices), index_array_size);
+		mem.copy_non_overlapping(mem.ptr_offset(per_instance_buffer_ptr, attribute_array_offset), raw_data(attributes), attribute_array_size);
+
+		buffer = frame_resources.per_instance_buffers[logical_frame_index];
+	}
+
+	attribute_array_offset_device_size := cast(vk.DeviceSize) attribute_array_offset;
+
+	vk.CmdBindIndexBuffer(command_buffer, buffer, cast(vk.DeviceSize) index_array_offset, .UINT16);
+	vk.CmdBindVertexBuffers(command_buffer, 0, 1, &buffer, &attribute_array_offset_device_size);
+
+	return true;
+}
+
+// The level of detail to draw an instance with, scaled by the instance's size since the switch distances are for the
+// geometry at its original size. The distance is to the geometry's LOD center, not the instance's origin, the static
+// batches are drawn with an identity transform.
+geometry_lod_level :: proc(geometry: ^Geometry, transform: la.Matrix4f32, camera_position: la.Vector3f32) -> int {
+	if len(geometry.lods) == 0 do return 0;
+
+	center := geometry.lod_center;
+	position := (transform * la.Vector4f32 { center.x, center.y, center.z, 1 }).xyz;
+	scale := max(
+		la.length(la.Vector3f32 { transform[0, 0], transform[1, 0], transform[2, 0] }),
+		la.length(la.Vector3f32 { transform[0, 1], transform[1, 1], transform[2, 1] }),
+		la.length(la.Vector3f32 { transform[0, 2], transform[1, 2], transform[2, 2] }),
+	);
+
+	distance := la.length(position - camera_position) / max(scale, 1e-6);
+	level := 0;
+
+	for lod, i in geometry.lods {
+		if distance >= lod.switch_distance do level = i + 1;
+	}
+
+	return level;
+}
+
+draw_indexed_chunks :: proc(command_buffer: vk.CommandBuffer, index_count: int, chunks: []Geometry_Chunk, instance_count, first_instance: u32) {
+	if len(chunks) == 0 {
+		vk.CmdDrawIndexed(command_buffer, cast(u32) index_count, instance_count, 0, 0, first_instance);
+		return;
+	}
+
+	first_index: u32 = 0;
+
+	for chunk in chunks {
+		vk.CmdDrawIndexed(command_buffer, chunk.index_count, instance_count, first_index, chunk.vertex_offset, first_instance);
+		first_index += chunk.index_count;
 	}
 }
 
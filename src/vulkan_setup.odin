@@ -41,6 +41,7 @@ Vulkan :: struct {
 	bloom_resources: Bloom_Resources,
 	particle_resources: Particle_Resources,
 	ui_resources: UI_Resources,
+	static_geometry: Static_Geometry_Resources,
 	logical_frame_index: int,
 	image_index: u32,
 }
@@ -126,6 +127,14 @@ UI_Resources :: struct {
 
 }
 
+// Device local buffer with the indices and attributes of the geometries loaded from files, uploaded once after loading
+// instead of copied into the per instance buffer every frame. See upload_static_geometries.
+Static_Geometry_Resources :: struct {
+	buffer: vk.Buffer,
+	memory: vk.DeviceMemory,
+	size: int,
+}
+
 Frame_Data :: struct #align(4) {
 	projection_mat,
 	view_mat,
@@ -263,6 +272,8 @@ vulkan_cleanup :: proc(using vulkan: ^Vulkan) {
 	vk.DestroyDescriptorSetLayout(logical_device, mesh_resources.instance_descriptor_set_layout, nil);
 	vk.DestroyDescriptorSetLayout(logical_device, frame_resources.descriptor_set_layout, nil);
 
+	destroy_static_geometry_buffer(vulkan);
+
 	for i in 0..<IFFC {
 		vk.FreeMemory(logical_device, frame_resources.per_instance_buffers_memory[i], nil);
 		vk.DestroyBuffer(logical_device, frame_resources.per_instance_buffers[i], nil);
@@ -902,7 +913,7 @@ create_allocate_and_bind_buffer_memory :: proc(physical_device: vk.PhysicalDevic
 	memory_requirements: vk.MemoryRequirements;
 	vk.GetBufferMemoryRequirements(logical_device, buffer, &memory_requirements);
 
-	memory_type_index := find_memory_type_index(physical_device, memory_requirements, {.HOST_VISIBLE});
+	memory_type_index := find_memory_type_index(physical_device, memory_requirements, properties);
 
 	allocate_info := vk.MemoryAllocateInfo {
 		sType = .MEMORY_ALLOCATE_INFO,
@@ -958,6 +969,134 @@ create_per_instance_buffers :: proc(physical_device: vk.PhysicalDevice, logical_
 	return buffers, buffers_memory;
 }
 
+// Copies the indices and attributes of every geometry with upload_once set, their LODs and emissive parts included, into
+// a new device local buffer through a staging buffer. Called after loading, it replaces the buffer of the last load. The
+// geometries that aren't in it, like the helpers, are still copied into the per instance buffer every frame.
+upload_static_geometries :: proc(using vulkan: ^Vulkan) {
+	logical_device := vulkan_context.logical_device;
+	physical_device := vulkan_context.physical_device;
+
+	// The frames in flight may still be drawing from the old buffer
+	vk.DeviceWaitIdle(logical_device);
+	destroy_static_geometry_buffer(vulkan);
+
+	size := 0;
+
+	for &geometry in entities_geos.geometries {
+		geometry.uploaded = false;
+		if geometry.free || !geometry.upload_once do continue;
+
+		geometry.static_arrays = place_static_arrays(&size, len(geometry.indices), len(geometry.attributes));
+
+		for &lod in geometry.lods {
+			lod.static_arrays = place_static_arrays(&size, len(lod.indices), len(lod.attributes));
+		}
+
+		if emissive, ok := geometry.emissive.?; ok {
+			emissive.static_arrays = place_static_arrays(&size, len(emissive.indices), len(emissive.attributes));
+			geometry.emissive = emissive;
+		}
+
+		geometry.uploaded = true;
+	}
+
+	if size == 0 do return;
+
+	staging_buffer, staging_memory := create_allocate_and_bind_buffer_memory(physical_device, logical_device, {.TRANSFER_SRC}, {.HOST_VISIBLE}, cast(vk.DeviceSize) size);
+	defer vk.FreeMemory(logical_device, staging_memory, nil);
+	defer vk.DestroyBuffer(logical_device, staging_buffer, nil);
+
+	{ // Fill the staging buffer
+		staging_rawptr: rawptr;
+		assert(vk.MapMemory(logical_device, staging_memory, 0, cast(vk.DeviceSize) vk.WHOLE_SIZE, {}, &staging_rawptr) == .SUCCESS);
+		staging_ptr := cast(^u8) staging_rawptr;
+
+		for &geometry in entities_geos.geometries {
+			if !geometry.uploaded do continue;
+
+			copy_static_arrays(staging_ptr, geometry.static_arrays, geometry.indices[:], geometry.attributes[:]);
+
+			for &lod in geometry.lods {
+				copy_static_arrays(staging_ptr, lod.static_arrays, lod.indices[:], lod.attributes[:]);
+			}
+
+			if emissive, ok := geometry.emissive.?; ok {
+				copy_static_arrays(staging_ptr, emissive.static_arrays, emissive.indices[:], emissive.attributes[:]);
+			}
+		}
+
+		range := vk.MappedMemoryRange {
+			sType = .MAPPED_MEMORY_RANGE,
+			memory = staging_memory,
+			offset = 0,
+			size = cast(vk.DeviceSize) vk.WHOLE_SIZE,
+		};
+
+		assert(vk.FlushMappedMemoryRanges(logical_device, 1, &range) == .SUCCESS);
+		vk.UnmapMemory(logical_device, staging_memory);
+	}
+
+	static_geometry.buffer, static_geometry.memory = create_allocate_and_bind_buffer_memory(physical_device, logical_device, {.INDEX_BUFFER, .VERTEX_BUFFER, .TRANSFER_DST}, {.DEVICE_LOCAL}, cast(vk.DeviceSize) size);
+	static_geometry.size = size;
+
+	{ // Copy it over and wait for the copy to finish
+		allocate_info := vk.CommandBufferAllocateInfo {
+			sType = .COMMAND_BUFFER_ALLOCATE_INFO,
+			commandPool = command_pool,
+			level = .PRIMARY,
+			commandBufferCount = 1,
+		};
+
+		command_buffer: vk.CommandBuffer;
+		assert(vk.AllocateCommandBuffers(logical_device, &allocate_info, &command_buffer) == .SUCCESS);
+
+		begin_info := vk.CommandBufferBeginInfo {
+			sType = .COMMAND_BUFFER_BEGIN_INFO,
+			flags = {.ONE_TIME_SUBMIT},
+		};
+
+		assert(vk.BeginCommandBuffer(command_buffer, &begin_info) == .SUCCESS);
+		region := vk.BufferCopy { srcOffset = 0, dstOffset = 0, size = cast(vk.DeviceSize) size };
+		vk.CmdCopyBuffer(command_buffer, staging_buffer, static_geometry.buffer, 1, &region);
+		assert(vk.EndCommandBuffer(command_buffer) == .SUCCESS);
+
+		submit_info := vk.SubmitInfo {
+			sType = .SUBMIT_INFO,
+			pCommandBuffers = &command_buffer,
+			commandBufferCount = 1,
+		};
+
+		assert(vk.QueueSubmit(vulkan_context.graphics_queue, 1, &submit_info, {}) == .SUCCESS);
+		assert(vk.QueueWaitIdle(vulkan_context.graphics_queue) == .SUCCESS);
+		vk.FreeCommandBuffers(logical_device, command_pool, 1, &command_buffer);
+	}
+
+	log_verbosef("Uploaded %v bytes of static geometry\n", size);
+}
+
+destroy_static_geometry_buffer :: proc(using vulkan: ^Vulkan) {
+	if static_geometry.buffer == 0 do return;
+
+	logical_device := vulkan_context.logical_device;
+	vk.DestroyBuffer(logical_device, static_geometry.buffer, nil);
+	vk.FreeMemory(logical_device, static_geometry.memory, nil);
+	static_geometry = {};
+}
+
+// Lays out an index array and an attribute array at the end of the static geometry buffer
+place_static_arrays :: proc(size: ^int, index_count, attribute_count: int) -> Static_Arrays {
+	index_offset := mem.align_forward_int(size^, 4);
+	attribute_offset := mem.align_forward_int(index_offset + size_of(u16) * index_count, 4);
+	size^ = attribute_offset + size_of(f32) * attribute_count;
+
+	return Static_Arrays { index_offset, attribute_offset };
+}
+
+copy_static_arrays :: proc(dst: ^u8, arrays: Static_Arrays, indices: []u16, attributes: []f32) {
+	mem.copy_non_overlapping(mem.ptr_offset(dst, arrays.index_offset), raw_data(indices), size_of(u16) * len(indices));
+	mem.copy_non_overlapping(mem.ptr_offset(dst, arrays.attribute_offset), raw_data(attributes), size_of(f32) * len(attributes));
+}
+
 Per_Instance_Buffer_Info :: struct {
 	mesh_instance_block_offset, // Rename? Make more simple, array?
 	emissive_color_array_offset,